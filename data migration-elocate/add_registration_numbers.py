@@ -1,91 +1,121 @@
 """
 Script to add registration numbers to existing recycling facilities
 that don't have one yet.
+
+The whole backfill is a single UPDATE ... FROM statement: facilities are
+numbered per state prefix with ROW_NUMBER() OVER (PARTITION BY ...) in
+created_at order, continuing after the highest number already used for
+that prefix. --dry-run runs the same statement and rolls it back, printing
+the would-be assignments.
 """
 import os
-import psycopg2
+import argparse
+from collections import Counter
 from dotenv import load_dotenv
-from urllib.parse import urlparse, parse_qsl
 
+# Before the local imports: their settings are read from the environment at import time
 load_dotenv()
 
+from db import get_pool, pooled_connection, close_pool
+from facility_cache import bump_version
+
+# REG-<first 3 letters of state>-<NNNN>; numbering is per prefix so that
+# numbers never collide between states that share a prefix.
+BACKFILL_SQL = r"""
+    WITH existing AS (
+        SELECT split_part(registration_number, '-', 2) AS code,
+               MAX(NULLIF(regexp_replace(split_part(registration_number, '-', 3), '\D', '', 'g'), '')::int) AS max_no
+        FROM recycling_facility
+        WHERE registration_number LIKE 'REG-%'
+        GROUP BY 1
+    ),
+    numbered AS (
+        SELECT id,
+               code,
+               ROW_NUMBER() OVER (PARTITION BY code ORDER BY created_at, id) AS rn
+        FROM (
+            SELECT id, created_at,
+                   COALESCE(UPPER(LEFT(NULLIF(TRIM(state), ''), 3)), 'UNK') AS code
+            FROM recycling_facility
+            WHERE registration_number IS NULL
+        ) missing
+    ),
+    assigned AS (
+        SELECT n.id,
+               'REG-' || n.code || '-' ||
+               LPAD((COALESCE(e.max_no, 0) + n.rn)::text,
+                    GREATEST(4, length((COALESCE(e.max_no, 0) + n.rn)::text)), '0') AS reg_number
+        FROM numbered n
+        LEFT JOIN existing e ON e.code = n.code
+    )
+    UPDATE recycling_facility f
+    SET registration_number = a.reg_number
+    FROM assigned a
+    WHERE f.id = a.id
+    RETURNING f.name, f.state, f.registration_number
+"""
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Backfill missing registration numbers")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="show the assignments without saving them")
+    parser.add_argument("--show", type=int, default=50,
+                        help="number of assignments to print (default: 50)")
+    return parser.parse_args()
+
 def main():
-    print("🚀 Adding registration numbers to existing facilities")
-    
-    db_url = os.getenv("DATABASE_URL")
-    if not db_url:
+    args = parse_args()
+    print("🚀 Adding registration numbers to existing facilities"
+          f"{' (dry run)' if args.dry_run else ''}")
+
+    if not os.getenv("DATABASE_URL"):
         print("❌ Error: DATABASE_URL not found in environment")
         return
 
     print("Connecting to database...")
     try:
-        tmpPostgres = urlparse(db_url)
-        conn = psycopg2.connect(
-            host=tmpPostgres.hostname,
-            database=tmpPostgres.path.replace('/', ''),
-            user=tmpPostgres.username,
-            password=tmpPostgres.password,
-            port=tmpPostgres.port or 5432,
-            **dict(parse_qsl(tmpPostgres.query))
-        )
-        cursor = conn.cursor()
+        get_pool()  # opens the pool's first connection, so a bad DATABASE_URL fails here
         print("✅ Connected to database\n")
     except Exception as e:
         print(f"❌ Database connection failed: {e}")
         return
 
-    # Get facilities without registration numbers
-    cursor.execute("""
-        SELECT id, name, state 
-        FROM recycling_facility 
-        WHERE registration_number IS NULL
-        ORDER BY created_at
-    """)
-    
-    facilities = cursor.fetchall()
-    print(f"Found {len(facilities)} facilities without registration numbers\n")
-    
-    if len(facilities) == 0:
+    try:
+        # Commits on exit, rolls back if the backfill fails
+        with pooled_connection() as conn, conn.cursor() as cursor:
+            cursor.execute(BACKFILL_SQL)
+            assigned = cursor.fetchall()
+            if args.dry_run:
+                conn.rollback()
+            elif assigned:
+                bump_version(cursor)
+    except Exception as e:
+        print(f"❌ Backfill failed: {e}")
+        return
+    finally:
+        close_pool()
+
+    if len(assigned) == 0:
         print("✅ All facilities already have registration numbers!")
-        cursor.close()
-        conn.close()
         return
-    
-    updated = 0
-    failed = 0
-    
-    for index, (facility_id, name, state) in enumerate(facilities, 1):
-        # Generate registration number
-        state_code = state[:3].upper() if state else "UNK"
-        reg_number = f"REG-{state_code}-{index:04d}"
-        
-        try:
-            cursor.execute("""
-                UPDATE recycling_facility 
-                SET registration_number = %s 
-                WHERE id = %s
-            """, (reg_number, facility_id))
-            
-            updated += 1
-            print(f"[{index}/{len(facilities)}] ✅ {name[:40]:40} -> {reg_number}")
-            
-        except Exception as e:
-            failed += 1
-            print(f"[{index}/{len(facilities)}] ❌ Failed to update {name[:40]}: {e}")
-            conn.rollback()
-    
-    conn.commit()
-    cursor.close()
-    conn.close()
-    
+
+    print(f"{'Would assign' if args.dry_run else 'Assigned'} {len(assigned)} registration numbers\n")
+    for name, state, reg_number in assigned[:args.show]:
+        print(f"  {(name or '')[:40]:40} {str(state or '')[:15]:15} NULL -> {reg_number}")
+    if len(assigned) > args.show:
+        print(f"  ... and {len(assigned) - args.show} more")
+
+    per_state = Counter(state or "UNKNOWN" for _, state, _ in assigned)
+
     print("\n" + "="*60)
-    print("UPDATE SUMMARY")
+    print("UPDATE SUMMARY" + (" (DRY RUN - nothing saved)" if args.dry_run else ""))
     print("="*60)
-    print(f"Total facilities:  {len(facilities)}")
-    print(f"Updated:           {updated}")
-    print(f"Failed:            {failed}")
+    print(f"Total facilities:  {len(assigned)}")
+    for state, count in per_state.most_common():
+        print(f"  {state[:25]:25} {count}")
     print("="*60)
-    print("\n✅ Registration number update complete!")
+    print("\n✅ Registration number update complete!" if not args.dry_run
+          else "\nℹ️  Re-run without --dry-run to apply.")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,209 @@
+"""
+Migration pipeline benchmark.
+
+Drives full_migration's own pipeline (MigrationRun: stream XLSX ->
+vectorized normalize -> in-memory dedup -> concurrent geocode -> batched
+insert, bounded queues in between, then the deferred retry pass) against a
+synthetic registration list, a stub geocoder with configurable latency, and
+either a throwaway SQLite file or a local PostgreSQL (DATABASE_URL).
+Reports rows/s, peak RSS and busy/idle/blocked time per stage for each
+sheet size.
+
+    python run_benchmark.py --rows 1000 10000 100000
+    python run_benchmark.py --rows 100000 --latency 0.05 --workers 16
+    python run_benchmark.py --rows 10000 --error-rate 0.3     # flaky geocoder
+    python run_benchmark.py --rows 10000 --db postgres --json results.json
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import tempfile
+import argparse
+from dotenv import load_dotenv
+
+# Before the local imports: their settings are read from the environment at import time
+load_dotenv()
+
+# Shared migration helpers live one directory up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from xlsx_reader import read_columns, find_column
+from normalize import NAME_COLUMNS, ADDRESS_COLUMNS, STATE_COLUMNS, EMAIL_COLUMNS
+from facility_dedup import DuplicateFilter
+from facility_writer import FACILITY_COLUMNS, BATCH_SIZE
+from pincode_index import PincodeIndex
+from geocode_scheduler import GeocodeScheduler, Provider
+from migration_checkpoint import MigrationCheckpoint
+from metrics import Metrics
+from full_migration import MigrationRun
+from stub_geocoder import StubGeocoder
+from synthetic_sheet import write_sheet
+
+STAGES = ('read', 'normalize', 'dedup', 'geocode', 'write')
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process, or None where unsupported"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / 2**20
+        except (ImportError, AttributeError):
+            return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+class SqliteFacilityWriter:
+    """Local stand-in for FacilityBatchWriter (same add/close/on_commit interface)"""
+
+    def __init__(self, path, batch_size=BATCH_SIZE, on_commit=None):
+        # Opened here, written from the pipeline's writer thread (one thread at a time)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("DROP TABLE IF EXISTS recycling_facility")
+        self.conn.execute(f"CREATE TABLE recycling_facility ({', '.join(FACILITY_COLUMNS)})")
+        self.insert_sql = (f"INSERT INTO recycling_facility ({', '.join(FACILITY_COLUMNS)}) "
+                           f"VALUES ({', '.join('?' * len(FACILITY_COLUMNS))})")
+        self.batch_size = batch_size
+        self.on_commit = on_commit
+        self.buffer = []
+        self.failed_ids = set()
+        self.stats = {'written': 0, 'failed': 0, 'conflicts': 0}
+
+    def add(self, row):
+        self.buffer.append(row)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.conn.executemany(self.insert_sql, self.buffer)
+            self.conn.commit()
+            self.stats['written'] += len(self.buffer)
+            self.buffer = []
+            if self.on_commit:
+                self.on_commit()
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+
+def make_writer(kind, workdir, on_commit=None):
+    if kind == "postgres":
+        from db import connect
+        from facility_writer import FacilityBatchWriter
+        conn = connect()
+        writer = FacilityBatchWriter(conn, on_commit=on_commit)
+        original_close = writer.close
+
+        def close():
+            original_close()
+            conn.close()
+        writer.close = close
+        return writer
+    return SqliteFacilityWriter(os.path.join(workdir, "benchmark.sqlite"), on_commit=on_commit)
+
+
+def run_pipeline(sheet, args, workdir):
+    """Run full_migration's stages over `sheet`; returns a result dict"""
+    started = time.perf_counter()
+    columns = read_columns(sheet)
+    cols = (find_column(columns, NAME_COLUMNS), find_column(columns, ADDRESS_COLUMNS),
+            find_column(columns, STATE_COLUMNS), find_column(columns, EMAIL_COLUMNS))
+
+    stub = StubGeocoder(latency=args.latency, rate=args.rate, hit_ratio=args.hit_ratio, error_rate=args.error_rate)
+    scheduler = GeocodeScheduler(
+        providers=[Provider(stub)], workers=args.workers,
+        pincode_index=PincodeIndex(path=None) if args.pin_index else None,
+    )
+    checkpoint = MigrationCheckpoint(sheet, path=os.path.join(workdir, "benchmark_checkpoint.sqlite"))
+    checkpoint.reset()
+    writer = make_writer(args.db, workdir, on_commit=lambda: checkpoint.flush(failed_ids=writer.failed_ids))
+    run = MigrationRun(sheet, cols, scheduler, writer, DuplicateFilter(), checkpoint,
+                       Metrics(path=None, prom_path=None), verbose=False)
+    pipeline = run.build_pipeline()
+    run.run(pipeline)
+    writer.close()
+    checkpoint.close()
+
+    elapsed = time.perf_counter() - started
+    stages = {stage.name: {'workers': stage.workers, **stage.stats} for stage in pipeline.stages}
+    return {
+        'rows': run.stats['total'],
+        'new': stages['dedup']['emitted'],
+        'written': writer.stats['written'],
+        'retried': run.stats['retried'],
+        'recovered': run.stats['recovered'],
+        'failed_geocode': run.stats['failed_geocode'],
+        'geocoder_calls': scheduler.stats['network_calls'],
+        'seconds': elapsed,
+        'rows_per_s': run.stats['total'] / elapsed if elapsed else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+        'stages': stages,
+    }
+
+
+def print_result(result):
+    print(f"  Rows:            {result['rows']} ({result['new']} new, {result['written']} written)")
+    print(f"  Geocoder calls:  {result['geocoder_calls']} ({result['failed_geocode']} rows failed, "
+          f"{result['retried']} deferred, {result['recovered']} recovered)")
+    print(f"  Total:           {result['seconds']:.2f}s  ({result['rows_per_s']:.0f} rows/s)")
+    rss = result['peak_rss_mb']
+    print(f"  Peak RSS:        {f'{rss:.0f} MB' if rss is not None else 'n/a'}")
+    for stage in STAGES:
+        s = result['stages'][stage]
+        # Busy time is summed over the stage's workers; per worker it is the stage's share of the run
+        busy = s['busy'] / s['workers']
+        rate = result['rows'] / busy if busy else float('inf')
+        print(f"    {stage:10} x{s['workers']:<3} busy {busy:8.3f}s  idle {s['idle'] / s['workers']:8.3f}s  "
+              f"blocked {s['blocked'] / s['workers']:8.3f}s  {rate:12.0f} rows/s")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the migration pipeline on synthetic sheets")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000],
+                        help="sheet sizes to benchmark (default: 1000 10000)")
+    parser.add_argument("--latency", type=float, default=0.0, help="stub geocoder latency in seconds")
+    parser.add_argument("--rate", type=float, help="stub geocoder rate limit (requests/s)")
+    parser.add_argument("--hit-ratio", type=float, default=0.9, help="share of queries the stub resolves")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="share of stub calls that time out (exercises retries and the deferred retry pass)")
+    parser.add_argument("--workers", type=int, default=8, help="geocoding threads")
+    parser.add_argument("--no-pin-index", dest="pin_index", action="store_false",
+                        help="disable the in-memory PIN centroid index")
+    parser.add_argument("--db", choices=("sqlite", "postgres"), default="sqlite",
+                        help="write target: throwaway SQLite file or DATABASE_URL")
+    parser.add_argument("--workdir", help="where sheets are generated/reused (default: temp dir)")
+    parser.add_argument("--json", help="also write results to this JSON file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    workdir = args.workdir or os.path.join(tempfile.gettempdir(), "elocate_benchmarks")
+    os.makedirs(workdir, exist_ok=True)
+
+    results = []
+    for rows in args.rows:
+        sheet = os.path.join(workdir, f"synthetic_{rows}.xlsx")
+        if not os.path.exists(sheet):
+            print(f"Generating {rows} rows -> {sheet}")
+            write_sheet(sheet, rows)
+
+        print(f"\n🚀 {rows} rows (db={args.db}, latency={args.latency * 1000:g} ms, workers={args.workers})")
+        result = run_pipeline(sheet, args, workdir)
+        print_result(result)
+        results.append({'sheet_rows': rows, **result})
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Results saved to: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
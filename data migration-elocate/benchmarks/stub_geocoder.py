@@ -0,0 +1,37 @@
+"""
+Deterministic stand-in for Nominatim used by the benchmarks.
+
+Answers every query after a configurable latency, with coordinates derived
+from a hash of the query, and misses a configurable fraction of queries so
+the fallback strategies get exercised too. With error_rate it also times
+out on a random share of calls, which drives the retry / circuit breaker /
+deferred retry path.
+"""
+import time
+import zlib
+import random
+from geocoders import Geocoder
+
+
+class StubGeocoder(Geocoder):
+    """Fake geocoding backend with configurable latency, rate and hit ratio"""
+
+    def __init__(self, latency=0.0, rate=None, hit_ratio=0.9, error_rate=0.0, name="stub"):
+        self.latency = latency
+        self.rate = rate
+        self.hit_ratio = hit_ratio
+        self.error_rate = error_rate
+        self.name = f"{name} ({latency * 1000:g} ms)"
+
+    def geocode(self, query):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.error_rate and random.random() < self.error_rate:
+            raise TimeoutError(f"{self.name}: simulated timeout")
+        digest = zlib.crc32(query.encode("utf-8"))
+        if (digest % 1000) / 1000 >= self.hit_ratio:
+            return None, None
+        # Spread results over India's bounding box
+        lat = 8.0 + (digest % 27000) / 1000
+        lon = 68.0 + ((digest >> 12) % 29000) / 1000
+        return lat, lon
@@ -0,0 +1,103 @@
+"""
+Generate synthetic RecyclerRegistrationGrantedList-shaped workbooks.
+
+Rows mimic the CPCB list: same columns, realistic address shapes (plot
+numbers, industrial areas, district + PIN at the end), a configurable share
+of rows without a PIN code, of exact duplicates and of near-duplicates
+(same facility re-typed: casing, spacing, "Pvt Ltd" vs "Private Limited").
+
+    python synthetic_sheet.py --rows 100000 --out synthetic_100k.xlsx
+"""
+import random
+import argparse
+from openpyxl import Workbook
+
+COLUMNS = ['RecyclerID', 'Company Name', 'Status', 'Type', 'Address', 'District', 'State',
+           'Capacity under CTO (MT/Year)']
+
+# (state, [(district, pin prefix)])
+STATES = [
+    ("TAMIL NADU", [("Chennai", "600"), ("Coimbatore", "641"), ("Madurai", "625")]),
+    ("KARNATAKA", [("Bangalore", "560"), ("Mysore", "570"), ("Belgaum", "590")]),
+    ("KERALA", [("Ernakulam", "682"), ("Thiruvananthapuram", "695")]),
+    ("UTTAR PRADESH", [("Bulandshahr", "203"), ("Mathura", "281"), ("Noida", "201")]),
+    ("HARYANA", [("Gurgaon", "122"), ("Faridabad", "121")]),
+    ("MAHARASHTRA", [("Pune", "411"), ("Thane", "400"), ("Nagpur", "440")]),
+    ("GUJARAT", [("Ahmedabad", "380"), ("Surat", "395"), ("Vadodara", "390")]),
+    ("TELANGANA", [("Hyderabad", "500"), ("Medchal", "501")]),
+]
+AREAS = ["Industrial Area", "SIDCO Industrial Estate", "MIDC", "Peenya Industrial Area",
+         "UPSIDC Industrial Area", "GIDC Estate", "IMT Manesar", "Phase II"]
+NAME_WORDS = ["Green", "Eco", "E-Waste", "Recyclers", "Enviro", "Metals", "Solutions", "Tech",
+              "Earth", "Clean", "Circular", "Resource", "Urban", "Mining", "Global"]
+SUFFIXES = ["Pvt Ltd", "Private Limited", "LLP", "Industries", "& Co"]
+
+
+def _retype(row, rng, new_id):
+    """Same facility, typed differently"""
+    name, address = row[1], row[4]
+    for a, b in (("Pvt Ltd", "Private Limited"), ("Private Limited", "Pvt. Ltd."), ("& Co", "and Company")):
+        if a in name:
+            name = name.replace(a, b)
+            break
+    name = name.upper() if rng.random() < 0.5 else name.replace(" ", "  ", 1)
+    address = address.replace(", ", " , ", 1) if rng.random() < 0.5 else address.lower()
+    return [new_id, name, row[2], row[3], address, row[5], row[6], row[7]]
+
+
+def synthetic_rows(rows, missing_pin=0.05, duplicates=0.02, near_duplicates=0.0, seed=42):
+    """Yield rows (lists in COLUMNS order)"""
+    rng = random.Random(seed)
+    previous = []
+    for i in range(rows):
+        if previous and rng.random() < duplicates:
+            yield list(rng.choice(previous))
+            continue
+        if previous and rng.random() < near_duplicates:
+            yield _retype(rng.choice(previous), rng, str(10000 + i))
+            continue
+
+        state, districts = rng.choice(STATES)
+        district, prefix = rng.choice(districts)
+        pincode = f"{prefix}{rng.randint(0, 999):03d}"
+        address = (f"Plot No. {rng.choice('ABCDEFG')}-{rng.randint(1, 400)}, "
+                   f"{rng.choice(AREAS)}, {district}")
+        if rng.random() >= missing_pin:
+            address += f" {pincode}"
+        name = " ".join(rng.sample(NAME_WORDS, rng.randint(2, 3))) + " " + rng.choice(SUFFIXES)
+
+        row = [str(10000 + i), name, None, "Authorization", address, district, state,
+               float(rng.randint(100, 60000))]
+        if len(previous) < 1000:
+            previous.append(row)
+        yield row
+
+
+def write_sheet(path, rows, **kwargs):
+    """Write with openpyxl's write-only mode so 1M rows don't need 1M cells in memory"""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    sheet.append(COLUMNS)
+    for row in synthetic_rows(rows, **kwargs):
+        sheet.append(row)
+    workbook.save(path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic registration list")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--out", default="synthetic_registrations.xlsx")
+    parser.add_argument("--missing-pin", type=float, default=0.05)
+    parser.add_argument("--duplicates", type=float, default=0.02)
+    parser.add_argument("--near-duplicates", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    write_sheet(args.out, args.rows, missing_pin=args.missing_pin,
+                duplicates=args.duplicates, near_duplicates=args.near_duplicates, seed=args.seed)
+    print(f"✅ Wrote {args.rows} rows to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,56 +2,58 @@
 Quick database table check
 """
 import os
-import psycopg2
+import sys
 from dotenv import load_dotenv
-from urllib.parse import urlparse, parse_qsl
 
+# Before the local imports: their settings are read from the environment at import time
 load_dotenv()
-tmpPostgres = urlparse(os.getenv("DATABASE_URL"))
+
+# Shared migration helpers live one directory up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db import pooled_connection, close_pool
+from facility_summary import total_facilities, read_summary, drift_note
 
 try:
-    conn = psycopg2.connect(
-        host=tmpPostgres.hostname,
-        database=tmpPostgres.path.replace('/', ''),
-        user=tmpPostgres.username,
-        password=tmpPostgres.password,
-        port=5432,
-        **dict(parse_qsl(tmpPostgres.query))
-    )
-    
-    cursor = conn.cursor()
+    with pooled_connection() as conn, conn.cursor() as cursor:
+        # List all tables
+        print("All tables in database:")
+        cursor.execute("""
+            SELECT table_schema, table_name 
+            FROM information_schema.tables 
+            WHERE table_type = 'BASE TABLE'
+            AND table_schema NOT IN ('pg_catalog', 'information_schema')
+            ORDER BY table_schema, table_name;
+        """)
+        for schema, table in cursor.fetchall():
+            print(f"  {schema}.{table}")
     
-    # List all tables
-    print("All tables in database:")
-    cursor.execute("""
-        SELECT table_schema, table_name 
-        FROM information_schema.tables 
-        WHERE table_type = 'BASE TABLE'
-        AND table_schema NOT IN ('pg_catalog', 'information_schema')
-        ORDER BY table_schema, table_name;
-    """)
-    for schema, table in cursor.fetchall():
-        print(f"  {schema}.{table}")
-    
-    # Try to query recycling_facility
-    print("\n" + "="*60)
-    try:
-        cursor.execute("SELECT COUNT(*) FROM recycling_facility;")
-        count = cursor.fetchone()[0]
-        print(f"✅ recycling_facility has {count} record(s)")
+        # Try to query recycling_facility
+        print("\n" + "="*60)
+        try:
+            # Precomputed counts (facility_summary.py) instead of scanning the whole table
+            count = total_facilities(cursor)
+            if count is None:
+                cursor.execute("SELECT COUNT(*) FROM recycling_facility;")
+                count = cursor.fetchone()[0]
+                print(f"✅ recycling_facility has {count} record(s)")
+            else:
+                # The summary misses writes made outside the migrators, so it's an estimate
+                print(f"✅ recycling_facility has ~{count} record(s) (estimate from facility_summary)")
+                for state, state_count in read_summary(cursor, "state")[:10]:
+                    print(f"  {state or '(no state)':25} {state_count}")
+                print(drift_note(cursor))
         
-        if count > 0:
-            cursor.execute("SELECT id, name, address FROM recycling_facility LIMIT 1;")
-            rec = cursor.fetchone()
-            print(f"\nFirst record:")
-            print(f"  ID: {rec[0]}")
-            print(f"  Name: {rec[1]}")
-            print(f"  Address: {rec[2]}")
-    except Exception as e:
-        print(f"❌ Error querying recycling_facility: {e}")
-    
-    cursor.close()
-    conn.close()
+            if count > 0:
+                cursor.execute("SELECT id, name, address FROM recycling_facility LIMIT 1;")
+                rec = cursor.fetchone()
+                print(f"\nFirst record:")
+                print(f"  ID: {rec[0]}")
+                print(f"  Name: {rec[1]}")
+                print(f"  Address: {rec[2]}")
+        except Exception as e:
+            print(f"❌ Error querying recycling_facility: {e}")
     
 except Exception as e:
     print(f"Connection error: {e}")
+finally:
+    close_pool()
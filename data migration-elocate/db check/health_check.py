@@ -0,0 +1,235 @@
+"""
+Database health check / pre-flight for the migrations.
+
+Opens a pool with one connection per concurrent probe (db.pooled_connection),
+runs every probe concurrently on a borrowed connection, and reports the
+pool's connect time (TCP + TLS handshake + auth) plus per-probe wait and
+query time:
+
+    connect     TLS protocol/cipher of the session
+    ping        median/max round trip of SELECT 1
+    version     server version
+    tables      recycling_facility plus the migrator side tables
+    rows        row estimates from pg_class.reltuples (no COUNT(*) scans)
+    indexes     primary key and the unique (name, address) index
+
+    python health_check.py                 # table report, exit code 1 if a probe fails
+    python health_check.py --json          # machine readable
+    python health_check.py --sequential    # one probe at a time, for comparison
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+# Before the local imports: their settings are read from the environment at import time
+load_dotenv()
+
+# Shared migration helpers live one directory up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db import get_pool, pooled_connection, close_pool, describe, POOL_MAX
+from facility_dedup import has_unique_index, UNIQUE_INDEX_SQL
+
+TIMEOUT_MS = int(os.getenv("DB_CHECK_TIMEOUT_MS", "5000"))
+PINGS = 5
+
+REQUIRED_TABLES = ('recycling_facility',)
+# Created by the migrators on first use (delta_migration, facility_cache, facility_summary)
+OPTIONAL_TABLES = ('facility_fingerprint', 'facility_data_version_seq', 'facility_summary')
+
+OK, WARN, FAIL = "ok", "warn", "fail"
+ICONS = {OK: "✅", WARN: "⚠️ ", FAIL: "❌"}
+
+
+def probe_connect(conn, cursor):
+    info = conn.info
+    if not info.ssl_in_use:
+        return OK, "no TLS"
+    return OK, f"{info.ssl_attribute('protocol')} {info.ssl_attribute('cipher')}"
+
+
+def probe_ping(conn, cursor):
+    timings = []
+    for _ in range(PINGS):
+        started = time.perf_counter()
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+        timings.append((time.perf_counter() - started) * 1000)
+    return OK, f"median {statistics.median(timings):.1f} ms, max {max(timings):.1f} ms ({PINGS} round trips)"
+
+
+def probe_version(conn, cursor):
+    cursor.execute("SELECT current_setting('server_version'), current_setting('server_version_num')::int")
+    version, number = cursor.fetchone()
+    return (OK if number >= 110000 else WARN), f"PostgreSQL {version}"
+
+
+def probe_tables(conn, cursor):
+    tables = REQUIRED_TABLES + OPTIONAL_TABLES
+    cursor.execute("SELECT t, to_regclass(t) IS NOT NULL FROM unnest(%s::text[]) AS t", (list(tables),))
+    present = dict(cursor.fetchall())
+    missing = [t for t in REQUIRED_TABLES if not present[t]]
+    if missing:
+        return FAIL, f"missing: {', '.join(missing)}"
+    not_yet = [t for t in OPTIONAL_TABLES if not present[t]]
+    return OK, f"{sum(present.values())}/{len(tables)} present" + (
+        f" (not created yet: {', '.join(not_yet)})" if not_yet else "")
+
+
+def probe_rows(conn, cursor):
+    # reltuples is -1 until the first ANALYZE; fall back to the stats collector's live tuples
+    cursor.execute("""
+        SELECT c.relname, c.reltuples::bigint, s.n_live_tup
+        FROM pg_class c
+        LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+        WHERE c.oid = ANY(ARRAY(SELECT to_regclass(t) FROM unnest(%s::text[]) AS t))
+        ORDER BY c.relname
+    """, (list(REQUIRED_TABLES + OPTIONAL_TABLES),))
+    parts, status = [], OK
+    for name, reltuples, live in cursor.fetchall():
+        if reltuples < 0:
+            parts.append(f"{name} ~{live or 0:,} (never analyzed)")
+            if name in REQUIRED_TABLES:
+                status = WARN
+        else:
+            parts.append(f"{name} ~{reltuples:,}")
+    if not parts:
+        return FAIL, "recycling_facility not found"
+    return status, ", ".join(parts)
+
+
+def probe_indexes(conn, cursor):
+    cursor.execute("""
+        SELECT i.relname, x.indisprimary, x.indisunique
+        FROM pg_index x
+        JOIN pg_class t ON t.oid = x.indrelid
+        JOIN pg_class i ON i.oid = x.indexrelid
+        WHERE t.relname = 'recycling_facility'
+        ORDER BY i.relname
+    """)
+    indexes = cursor.fetchall()
+    if not any(primary for _, primary, _ in indexes):
+        return FAIL, "no primary key on recycling_facility"
+    detail = f"{len(indexes)} index(es): {', '.join(name for name, _, _ in indexes)}"
+    if not has_unique_index(conn):
+        return WARN, f"{detail}; no unique (name, address) index, inserts can't use ON CONFLICT"
+    return OK, detail
+
+
+PROBES = [
+    ("connect", probe_connect),
+    ("ping", probe_ping),
+    ("version", probe_version),
+    ("tables", probe_tables),
+    ("rows", probe_rows),
+    ("indexes", probe_indexes),
+]
+
+
+def run_probe(name, func, timeout_ms=TIMEOUT_MS):
+    """Borrow a pooled connection, run one probe, and time both parts"""
+    result = {'probe': name, 'status': FAIL, 'detail': '', 'wait_ms': None, 'query_ms': None}
+    started = time.perf_counter()
+    try:
+        with pooled_connection() as conn:
+            result['wait_ms'] = (time.perf_counter() - started) * 1000
+            started = time.perf_counter()
+            try:
+                with conn.cursor() as cursor:
+                    # LOCAL: ends with the probe's transaction, the pooled session keeps its default
+                    cursor.execute("SET LOCAL statement_timeout = %s", (int(timeout_ms),))
+                    result['status'], result['detail'] = func(conn, cursor)
+            finally:
+                result['query_ms'] = (time.perf_counter() - started) * 1000
+    except Exception as e:
+        if result['wait_ms'] is None:
+            result['wait_ms'] = (time.perf_counter() - started) * 1000
+            result['detail'] = f"connection failed: {str(e).strip()}"
+        else:
+            result['status'] = FAIL
+            result['detail'] = str(e).strip().splitlines()[0]
+    return result
+
+
+def run_checks(sequential=False, timeout_ms=TIMEOUT_MS):
+    """
+    Run every probe (concurrently unless sequential); returns
+    (results, wall seconds, pool connect ms)
+    """
+    started = time.perf_counter()
+    workers = 1 if sequential else len(PROBES)
+    try:
+        # Connections are opened up front, so the probes only wait on the pool, not on handshakes
+        get_pool(minconn=workers, maxconn=max(POOL_MAX, workers))
+    except Exception as e:
+        pool_ms = (time.perf_counter() - started) * 1000
+        detail = f"connection failed: {str(e).strip()}"
+        results = [{'probe': name, 'status': FAIL, 'detail': detail, 'wait_ms': None, 'query_ms': None}
+                   for name, _ in PROBES]
+        return results, time.perf_counter() - started, pool_ms
+    pool_ms = (time.perf_counter() - started) * 1000
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda probe: run_probe(*probe, timeout_ms), PROBES))
+    return results, time.perf_counter() - started, pool_ms
+
+
+def print_report(results, wall, pool_ms):
+    print(f"Pool connect: {pool_ms:.1f} ms\n")
+    print(f"{'Probe':10} {'':3} {'Wait':>10} {'Query':>10}  Detail")
+    print("="*80)
+    for r in results:
+        wait_ms = f"{r['wait_ms']:.1f} ms" if r['wait_ms'] is not None else "-"
+        query_ms = f"{r['query_ms']:.1f} ms" if r['query_ms'] is not None else "-"
+        print(f"{r['probe']:10} {ICONS[r['status']]:3} {wait_ms:>10} {query_ms:>10}  {r['detail']}")
+    print("="*80)
+    busy_ms = sum((r['wait_ms'] or 0) + (r['query_ms'] or 0) for r in results)
+    print(f"Wall time: {wall * 1000:.1f} ms (probes took {busy_ms:.1f} ms in total)")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Concurrent database health check")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--sequential", action="store_true", help="run the probes one after another")
+    parser.add_argument("--timeout-ms", type=int, default=TIMEOUT_MS, help="statement timeout per probe")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if not os.getenv("DATABASE_URL"):
+        print("❌ Error: DATABASE_URL not found in environment")
+        sys.exit(1)
+
+    try:
+        results, wall, pool_ms = run_checks(args.sequential, args.timeout_ms)
+    finally:
+        close_pool()
+    failed = [r for r in results if r['status'] == FAIL]
+
+    if args.json:
+        for r in results:
+            for key in ('wait_ms', 'query_ms'):
+                if r[key] is not None:
+                    r[key] = round(r[key], 3)
+        print(json.dumps({'results': results, 'wall_ms': round(wall * 1000, 3),
+                          'pool_connect_ms': round(pool_ms, 3), 'ok': not failed}, indent=2))
+    else:
+        details = describe()
+        print(f"🔎 Health check: {details['host']}:{details['port']}/{details['database']} "
+              f"({len(PROBES)} probes, {'sequential' if args.sequential else 'concurrent'})\n")
+        print_report(results, wall, pool_ms)
+        if any(r['probe'] == "indexes" and r['status'] == WARN for r in results):
+            print(f"\n💡 Recommended: {' '.join(UNIQUE_INDEX_SQL.split())};")
+        if failed:
+            print(f"\n❌ {len(failed)} probe(s) failed: {', '.join(r['probe'] for r in failed)}")
+        else:
+            print("\n✅ Database ready for migration")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
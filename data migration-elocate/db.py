@@ -0,0 +1,102 @@
+"""
+Shared PostgreSQL connection factory for the migration tools.
+
+Parses DATABASE_URL once (host, port, database, sslmode/channel_binding
+query options), adds TCP keepalives and an optional statement timeout, and
+hands out connections either directly (connect) or from a process-wide
+ThreadedConnectionPool (pooled_connection) so concurrent writers and
+checkers reuse warm TLS sessions instead of handshaking each time.
+"""
+import os
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse, parse_qsl
+import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+
+DEFAULT_PORT = 5432
+POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+POOL_MAX = int(os.getenv("DB_POOL_MAX", "8"))
+STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))  # 0 = server default
+CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "15"))
+
+# Keep idle TLS connections alive through NAT/load balancers
+KEEPALIVES = {
+    'keepalives': 1,
+    'keepalives_idle': int(os.getenv("DB_KEEPALIVES_IDLE", "30")),
+    'keepalives_interval': int(os.getenv("DB_KEEPALIVES_INTERVAL", "10")),
+    'keepalives_count': int(os.getenv("DB_KEEPALIVES_COUNT", "5")),
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def connection_kwargs(db_url=None, statement_timeout_ms=None):
+    """Build psycopg2.connect() keyword arguments from DATABASE_URL"""
+    db_url = db_url or os.getenv("DATABASE_URL")
+    if not db_url:
+        raise RuntimeError("DATABASE_URL not found in environment")
+
+    parsed = urlparse(db_url)
+    kwargs = {
+        'host': parsed.hostname,
+        'database': parsed.path.lstrip('/'),
+        'user': parsed.username,
+        'password': parsed.password,
+        'port': parsed.port or DEFAULT_PORT,
+        'connect_timeout': CONNECT_TIMEOUT,
+        **KEEPALIVES,
+    }
+    kwargs.update(dict(parse_qsl(parsed.query)))  # sslmode, channel_binding, ...
+
+    timeout = STATEMENT_TIMEOUT_MS if statement_timeout_ms is None else statement_timeout_ms
+    if timeout:
+        kwargs['options'] = f"{kwargs.get('options', '')} -c statement_timeout={int(timeout)}".strip()
+    return kwargs
+
+
+def describe(db_url=None):
+    """Connection details safe to print (no password)"""
+    kwargs = connection_kwargs(db_url)
+    return {k: v for k, v in kwargs.items() if k != 'password'}
+
+
+def connect(db_url=None, statement_timeout_ms=None):
+    """Open a new dedicated connection"""
+    return psycopg2.connect(**connection_kwargs(db_url, statement_timeout_ms))
+
+
+def get_pool(minconn=POOL_MIN, maxconn=POOL_MAX):
+    """Process-wide thread-safe pool, created on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.closed:
+            _pool = ThreadedConnectionPool(minconn, max(minconn, maxconn), **connection_kwargs())
+        return _pool
+
+
+@contextmanager
+def pooled_connection():
+    """
+    Borrow a connection from the pool. Commits on success, rolls back on
+    error, and always returns the connection to the pool.
+    """
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn, close=bool(conn.closed))
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None and not _pool.closed:
+            _pool.closeall()
+        _pool = None
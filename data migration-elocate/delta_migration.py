@@ -0,0 +1,407 @@
+"""
+Incremental (delta) migration between successive CPCB registration lists.
+
+Every normalized input row gets a content hash, stored next to its facility
+in facility_fingerprint (keyed by RecyclerID, or by name + state when the
+sheet has no ID column). The next run compares the new sheet against those
+fingerprints and only touches what changed:
+
+    new        not seen before           -> geocode + insert
+    changed    content hash differs      -> update; re-geocode only if the
+                                            address/state/PIN changed
+    removed    fingerprint not in sheet  -> is_active = false (soft delete)
+    unchanged                            -> nothing
+
+Inserts, updates, fingerprints, deactivations and registration numbers are
+applied in one transaction, so a failed run leaves the database untouched
+and can simply be re-run.
+
+The first run against a database filled by full_migration.py adopts the
+existing facilities by (name, address) instead of inserting them again.
+New facilities get registration numbers from add_registration_numbers'
+backfill statement.
+
+Usage:
+    python delta_migration.py [path/to/RecyclerRegistrationGrantedList.xlsx]
+    python delta_migration.py --dry-run      # report the delta, change nothing
+"""
+import os
+import time
+import uuid
+import hashlib
+import argparse
+from collections import Counter
+from datetime import datetime
+from dotenv import load_dotenv
+
+# Before the local imports: their settings are read from the environment at import time
+load_dotenv()
+
+from psycopg2.extras import execute_values
+from db import connect
+from geocode_cache import GeocodeCache
+from pincode_index import PincodeIndex
+from geocode_scheduler import GeocodeScheduler
+from geocode_retry import RETRY
+from strategy_planner import StrategyPlanner
+from facility_cache import bump_version
+from facility_summary import ensure_summary, counts_for_ids, apply_counts, key_columns
+from facility_writer import FacilityBatchWriter
+from facility_dedup import DuplicateFilter, load_existing_keys, has_unique_index
+from add_registration_numbers import BACKFILL_SQL
+from metrics import Metrics
+from xlsx_reader import read_columns, iter_chunks, find_column
+from normalize import (
+    normalize_frame, iter_normalized,
+    NAME_COLUMNS, ADDRESS_COLUMNS, STATE_COLUMNS, EMAIL_COLUMNS, DISTRICT_COLUMNS, ID_COLUMNS,
+)
+
+INPUT_FILE = os.getenv("DELTA_INPUT_FILE", "RecyclerRegistrationGrantedList.xlsx")
+# Refuse to deactivate more than this share of known facilities (truncated sheet?) without --force
+MAX_REMOVED_SHARE = float(os.getenv("DELTA_MAX_REMOVED_SHARE", "0.2"))
+
+FINGERPRINT_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS facility_fingerprint (
+        source_key   text PRIMARY KEY,
+        facility_id  {id_type} NOT NULL REFERENCES recycling_facility (id) ON DELETE CASCADE,
+        content_hash text NOT NULL,
+        address_hash text NOT NULL,
+        removed_at   timestamp,
+        updated_at   timestamp NOT NULL DEFAULT now()
+    )
+"""
+
+# Only rows whose facility still exists (an ON CONFLICT insert may have skipped it)
+UPSERT_FINGERPRINTS_SQL = """
+    INSERT INTO facility_fingerprint (source_key, facility_id, content_hash, address_hash, removed_at, updated_at)
+    SELECT v.source_key, f.id, v.content_hash, v.address_hash, NULL, now()
+    FROM (VALUES %s) AS v (source_key, facility_id, content_hash, address_hash)
+    JOIN recycling_facility f ON f.id = v.facility_id
+    ON CONFLICT (source_key) DO UPDATE
+    SET facility_id = EXCLUDED.facility_id,
+        content_hash = EXCLUDED.content_hash,
+        address_hash = EXCLUDED.address_hash,
+        removed_at = NULL,
+        updated_at = now()
+"""
+
+UPDATE_FACILITIES_SQL = """
+    UPDATE recycling_facility f
+    SET name = v.name,
+        address = v.address,
+        state = v.state,
+        email = v.email,
+        pincode = v.pincode,
+        latitude = COALESCE(v.latitude, f.latitude),
+        longitude = COALESCE(v.longitude, f.longitude),
+        geocode_source = COALESCE(v.geocode_source, f.geocode_source),
+        is_active = true,
+        updated_at = now()
+    FROM (VALUES %s) AS v (id, name, address, state, email, pincode, latitude, longitude, geocode_source)
+    WHERE f.id = v.id
+    RETURNING {key_columns}
+""".format(key_columns=key_columns("f"))
+
+DEACTIVATE_REMOVED_SQL = """
+    WITH removed AS (
+        UPDATE facility_fingerprint
+        SET removed_at = now(), updated_at = now()
+        WHERE source_key = ANY(%s) AND removed_at IS NULL
+        RETURNING facility_id
+    )
+    UPDATE recycling_facility f
+    SET is_active = false, updated_at = now()
+    FROM removed r
+    WHERE f.id = r.facility_id AND f.is_active
+    RETURNING {key_columns}
+""".format(key_columns=key_columns("f"))
+
+
+def _sha1(*parts):
+    return hashlib.sha1("\x1f".join("" if p is None else str(p) for p in parts).encode("utf-8")).hexdigest()
+
+
+def source_key(raw_id, name, state):
+    """Stable identity of a facility across lists"""
+    if raw_id is not None and str(raw_id).strip():
+        value = str(raw_id).strip()
+        return f"id:{value[:-2] if value.endswith('.0') else value}"  # 227.0 from numeric cells
+    return f"ns:{_sha1(name.lower(), state)}"
+
+
+def row_hashes(name, address, state, email, district, pincode):
+    """(content_hash, address_hash): any change / a change that needs re-geocoding"""
+    return _sha1(name, address, state, email, district, pincode), _sha1(address, state, pincode)
+
+
+def facility_id_type(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT format_type(atttypid, atttypmod) FROM pg_attribute
+            WHERE attrelid = 'recycling_facility'::regclass AND attname = 'id'
+        """)
+        return cursor.fetchone()[0]
+
+
+def load_fingerprints(conn):
+    """source_key -> (facility_id, content_hash, address_hash, removed)"""
+    with conn.cursor(name="facility_fingerprints") as cursor:
+        cursor.itersize = 10000
+        cursor.execute("""
+            SELECT source_key, facility_id::text, content_hash, address_hash, removed_at IS NOT NULL
+            FROM facility_fingerprint
+        """)
+        return {key: tuple(rest) for key, *rest in cursor}
+
+
+def load_facility_ids(conn):
+    """(name, address) -> id for facilities without a fingerprint yet (adoption)"""
+    with conn.cursor(name="unfingerprinted_facilities") as cursor:
+        cursor.itersize = 10000
+        cursor.execute("""
+            SELECT f.name, f.address, f.id::text
+            FROM recycling_facility f
+            WHERE NOT EXISTS (SELECT 1 FROM facility_fingerprint p WHERE p.facility_id = f.id)
+        """)
+        return {(name, address): facility_id for name, address, facility_id in cursor}
+
+
+def compute_delta(path, fingerprints, unlinked, existing_keys=()):
+    """
+    Stream the sheet and classify every row. Returns (delta, stats) where
+    delta has lists 'new', 'changed', 'adopted' and 'removed' (source keys).
+    """
+    columns = read_columns(path)
+    id_col = find_column(columns, ID_COLUMNS)
+    cols = dict(name_col=find_column(columns, NAME_COLUMNS), address_col=find_column(columns, ADDRESS_COLUMNS),
+                state_col=find_column(columns, STATE_COLUMNS), email_col=find_column(columns, EMAIL_COLUMNS),
+                district_col=find_column(columns, DISTRICT_COLUMNS))
+    if not id_col:
+        print("⚠️ No RecyclerID column; identifying facilities by name + state")
+
+    delta = {'new': [], 'changed': [], 'adopted': [], 'removed': []}
+    stats = {'total': 0, 'unchanged': 0, 'skipped': 0, 'duplicates': 0, 'regeocode': 0}
+    seen = set()
+    dedup = DuplicateFilter(existing_keys)  # new rows that already exist / repeat in the file
+
+    for chunk in iter_chunks(path):
+        ids = chunk[id_col].tolist() if id_col else [None] * len(chunk)
+        normalized = iter_normalized(normalize_frame(chunk, **cols))
+        for raw_id, (index, name, address, state, email, district, pincode) in zip(ids, normalized):
+            stats['total'] += 1
+            if not address:
+                stats['skipped'] += 1
+                continue
+            key = source_key(raw_id, name, state)
+            if key in seen:
+                stats['duplicates'] += 1
+                continue
+            seen.add(key)
+
+            content_hash, address_hash = row_hashes(name, address, state, email, district, pincode)
+            row = {'key': key, 'row': index, 'name': name, 'address': address, 'state': state,
+                   'email': email or '', 'pincode': pincode,
+                   'content_hash': content_hash, 'address_hash': address_hash}
+
+            known = fingerprints.get(key)
+            if known:
+                facility_id, old_content, old_address, removed = known
+                if old_content == content_hash and not removed:
+                    stats['unchanged'] += 1
+                    continue
+                row['facility_id'] = facility_id
+                row['regeocode'] = old_address != address_hash
+                stats['regeocode'] += row['regeocode']
+                delta['changed'].append(row)
+            elif (name, address) in unlinked:
+                row['facility_id'] = unlinked.pop((name, address))
+                delta['adopted'].append(row)
+                dedup.check(name, address)  # later rows with the same name/address are duplicates
+            elif dedup.check(name, address):
+                stats['duplicates'] += 1
+            else:
+                delta['new'].append(row)
+
+    delta['removed'] = [key for key, (_, _, _, removed) in fingerprints.items()
+                        if key not in seen and not removed]
+    return delta, stats
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Apply only the changes between registration lists")
+    parser.add_argument("input", nargs="?", default=INPUT_FILE, help="registration list (.xlsx)")
+    parser.add_argument("--dry-run", action="store_true", help="report the delta without changing anything")
+    parser.add_argument("--force", action="store_true",
+                        help=f"allow deactivating more than {MAX_REMOVED_SHARE:.0%} of known facilities")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    print(f"🚀 Delta migration{' (dry run)' if args.dry_run else ''}: {args.input}")
+
+    if not os.path.exists(args.input):
+        print(f"❌ Error: Input file not found: {args.input}")
+        return
+
+    if not os.getenv("DATABASE_URL"):
+        print("❌ Error: DATABASE_URL not found in environment")
+        return
+
+    print("Connecting to database...")
+    try:
+        conn = connect()
+        print("✅ Connected to database\n")
+    except Exception as e:
+        print(f"❌ Database connection failed: {e}")
+        return
+
+    id_type = facility_id_type(conn)
+    with conn.cursor() as cursor:
+        cursor.execute(FINGERPRINT_TABLE_SQL.format(id_type=id_type))
+    conn.commit()
+
+    started = time.perf_counter()
+    fingerprints = load_fingerprints(conn)
+    unlinked = load_facility_ids(conn)
+    print(f"Loaded {len(fingerprints)} fingerprints, {len(unlinked)} facilities without one")
+
+    delta, stats = compute_delta(args.input, fingerprints, unlinked, load_existing_keys(conn))
+    diff_time = time.perf_counter() - started
+    print(f"Compared {stats['total']} rows in {diff_time:.2f}s: "
+          f"{len(delta['new'])} new, {len(delta['changed'])} changed "
+          f"({stats['regeocode']} with a new address), {len(delta['removed'])} removed, "
+          f"{len(delta['adopted'])} adopted, {stats['unchanged']} unchanged\n")
+
+    active_known = sum(1 for *_, removed in fingerprints.values() if not removed)
+    if active_known and len(delta['removed']) > MAX_REMOVED_SHARE * active_known and not args.force:
+        print(f"❌ {len(delta['removed'])} of {active_known} facilities would be deactivated; "
+              f"is the sheet complete? Re-run with --force to apply.")
+        conn.close()
+        return
+
+    if args.dry_run:
+        conn.close()
+        print("ℹ️  Dry run: nothing written.")
+        return
+
+    metrics = Metrics()
+    geocode_cache = GeocodeCache()
+    pincode_index = PincodeIndex()
+    planner = StrategyPlanner()
+    scheduler = GeocodeScheduler(cache=geocode_cache, pincode_index=pincode_index, metrics=metrics,
+                                 planner=planner)
+
+    # Geocode only new rows and rows whose address changed
+    to_geocode = delta['new'] + [row for row in delta['changed'] if row['regeocode']]
+    jobs = ((row['address'], row['state'], row['pincode']) for row in to_geocode)
+    geocode_started = time.perf_counter()
+    failed_geocode = 0
+    for row, (lat, lon, source) in zip(to_geocode, scheduler.resolve_all(jobs)):
+        row['latitude'], row['longitude'], row['source'] = lat, lon, source
+    # One more pass for rows that only failed on provider errors
+    retry = [row for row in to_geocode if row['source'] == RETRY]
+    if retry:
+        print(f"🔁 Retrying {len(retry)} rows that hit geocoder errors...")
+        scheduler.wait_for_breakers = True
+        jobs = ((row['address'], row['state'], row['pincode']) for row in retry)
+        for row, (lat, lon, source) in zip(retry, scheduler.resolve_all(jobs)):
+            row['latitude'], row['longitude'], row['source'] = lat, lon, source
+    for row in to_geocode:
+        if row['latitude'] is None or row['longitude'] is None:
+            failed_geocode += 1
+            print(f"  ❌ Geocoding failed: {row['name'][:50]}")
+    geocode_time = time.perf_counter() - geocode_started
+
+    # Inserts (registration numbers are assigned afterwards by the backfill)
+    now = datetime.utcnow().isoformat()
+    if ensure_summary(conn):
+        print("Built facility_summary from the existing facilities")
+    try:
+        # Batches are only flushed here; everything below commits together at the end
+        writer = FacilityBatchWriter(conn, on_conflict=has_unique_index(conn), metrics=metrics, summary=True,
+                                     defer_commit=True)
+        inserted = []
+        for row in delta['new']:
+            if row['latitude'] is None or row['longitude'] is None:
+                continue  # coordinates are required; retried on the next run
+            row['facility_id'] = str(uuid.uuid4())
+            writer.add((
+                row['facility_id'], row['name'], row['address'], row['latitude'], row['longitude'],
+                1000, '', '9AM-6PM', False, True, now, now,
+                row['source'], row['email'], row['state'], row['pincode'], None
+            ))
+            inserted.append(row)
+        writer.close()
+
+        with conn.cursor() as cursor:
+            # Rows whose re-geocode failed keep their old fingerprint, so the next run retries them
+            updates = [row for row in delta['changed'] if not row['regeocode'] or row['latitude'] is not None]
+            # facility_summary: updated rows leave their old group and join the one RETURNING reports
+            summary = Counter()
+            summary.subtract(counts_for_ids(cursor, [row['facility_id'] for row in updates], id_type))
+            summary.update(tuple(key) for key in execute_values(cursor, UPDATE_FACILITIES_SQL, [
+                (row['facility_id'], row['name'], row['address'], row['state'], row['email'], row['pincode'],
+                 row.get('latitude'), row.get('longitude'), row.get('source'))
+                for row in updates
+            ], template=f"(%s::{id_type}, %s, %s, %s, %s, %s, %s::float8, %s::float8, %s)", fetch=True))
+
+            execute_values(cursor, UPSERT_FINGERPRINTS_SQL, [
+                (row['key'], row['facility_id'], row['content_hash'], row['address_hash'])
+                for row in inserted + updates + delta['adopted'] if row['facility_id'] not in writer.failed_ids
+            ], template=f"(%s, %s::{id_type}, %s, %s)")
+
+            cursor.execute(DEACTIVATE_REMOVED_SQL, (delta['removed'],))
+            deactivated = 0
+            for state, pincode, verified, active, source in cursor.fetchall():
+                summary[(state, pincode, verified, True, source)] -= 1
+                summary[(state, pincode, verified, active, source)] += 1
+                deactivated += 1
+            apply_counts(cursor, summary)
+
+            cursor.execute(BACKFILL_SQL)
+            numbered = cursor.rowcount
+
+            if writer.stats['written'] or updates or deactivated or numbered:
+                bump_version(cursor)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        conn.close()
+        print(f"❌ Delta failed, nothing was written (re-run to retry): {e}")
+        # Geocoding results stay cached, so the re-run doesn't pay for them again
+        geocode_cache.close()
+        pincode_index.save()
+        planner.save()
+        metrics.close()
+        return
+    conn.close()
+    geocode_cache.close()
+    pincode_index.save()
+    planner.save()
+
+    print("\n" + "="*60)
+    print("DELTA MIGRATION SUMMARY")
+    print("="*60)
+    print(f"Rows in sheet:     {stats['total']}")
+    print(f"Unchanged:         {stats['unchanged']}")
+    print(f"Inserted:          {writer.stats['written']} (of {len(delta['new'])} new)")
+    print(f"Updated:           {len(updates)} ({sum(1 for row in updates if row['regeocode'])} re-geocoded)")
+    print(f"Adopted:           {len(delta['adopted'])}")
+    print(f"Deactivated:       {deactivated}")
+    print(f"Geocoding Failed:  {failed_geocode}")
+    print(f"Skipped:           {stats['skipped']} (+{stats['duplicates']} duplicates)")
+    print(f"Reg numbers:       {numbered} assigned")
+    print(f"Diff time:         {diff_time:.2f}s")
+    print(f"Geocode time:      {geocode_time:.2f}s for {len(to_geocode)} rows")
+    scheduler.print_stats()
+    planner.print_stats()
+    print("="*60)
+    metrics.event("finished", mode="delta", inserted=writer.stats['written'], updated=len(updates),
+                  deactivated=deactivated, unchanged=stats['unchanged'])
+    metrics.close()
+    print("\n✅ Delta migration finished!")
+
+
+if __name__ == "__main__":
+    main()
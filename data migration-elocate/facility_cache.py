@@ -0,0 +1,406 @@
+"""
+Read-through facility query cache for the admin facility list.
+
+Facilities are loaded in bulk by the migrators and rarely change
+afterwards, so instead of a full-table query per admin page load the
+cache keeps one snapshot of recycling_facility in memory, with the rows
+pre-grouped by state, PIN code and verified status. List/filter queries
+are answered from the snapshot; combined filters are intersected once
+and memoized until the next reload.
+
+Freshness comes from a version stamp, the facility_data_version_seq
+sequence. `python facility_cache.py setup` (run once, as the table owner)
+installs a statement-level trigger on recycling_facility that calls
+nextval() after every INSERT, UPDATE, DELETE or TRUNCATE, whoever the
+writer is (migrators, backfills, the backend's admin approve/reject).
+nextval takes no row lock, so concurrent writers don't queue behind each
+other. The migrators also bump it when they finish (bump_version), which
+covers databases where the trigger isn't installed yet.
+
+The cache checks the stamp (a plain SELECT) at most every
+FACILITY_CACHE_CHECK_SECONDS and reloads only when it moved. nextval is
+not transactional, so a writer can bump the stamp before its rows are
+visible; a snapshot loaded while any writer still holds a lock on the
+table is therefore not trusted and reloaded on the next check.
+The snapshot is also written to FACILITY_CACHE_FILE, so a restarted
+service with an unchanged version starts without touching the table.
+
+Usage:
+    python facility_cache.py setup                       # install the sequence + trigger
+    python facility_cache.py version                     # current stamp
+    python facility_cache.py bump                        # force a reload
+    python facility_cache.py query --state KARNATAKA --verified false
+    python facility_cache.py serve [--port 8766]
+
+The `serve` mode answers GET /facilities?state=&pincode=&verified=&page=&size=
+and GET /version with JSON, for the Next.js admin API routes to proxy
+(same pattern as facility_index.py).
+"""
+import os
+import json
+import time
+import argparse
+import threading
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+if __name__ == "__main__":
+    # Run as a script: load .env before the settings below (and the local imports') are read
+    from dotenv import load_dotenv
+    load_dotenv()
+
+CACHE_FILE = os.getenv(
+    "FACILITY_CACHE_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "facility_cache.json")
+)
+CHECK_SECONDS = float(os.getenv("FACILITY_CACHE_CHECK_SECONDS", "5"))
+MAX_VIEWS = int(os.getenv("FACILITY_CACHE_MAX_VIEWS", "256"))  # memoized filter combinations
+PAGE_SIZE = 20
+
+VERSION_SEQUENCE = "facility_data_version_seq"
+
+VERSION_SEQUENCE_SQL = f"CREATE SEQUENCE IF NOT EXISTS {VERSION_SEQUENCE}"
+
+# nextval once per writing statement (not per row). SECURITY DEFINER: the
+# backend's role needs no privileges on the sequence to write facilities.
+VERSION_TRIGGER_SQL = f"""
+    CREATE OR REPLACE FUNCTION facility_data_version_bump() RETURNS trigger
+    LANGUAGE plpgsql SECURITY DEFINER SET search_path = public AS $$
+    BEGIN
+        PERFORM nextval('{VERSION_SEQUENCE}');
+        RETURN NULL;
+    END
+    $$;
+
+    DROP TRIGGER IF EXISTS facility_data_version_bump ON recycling_facility;
+    CREATE TRIGGER facility_data_version_bump
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON recycling_facility
+    FOR EACH STATEMENT EXECUTE FUNCTION facility_data_version_bump();
+
+    -- The single-row counter the previous trigger upserted into
+    DROP TABLE IF EXISTS facility_data_version;
+"""
+
+# Lock modes taken by INSERT/UPDATE/DELETE/TRUNCATE (not by VACUUM or CREATE INDEX CONCURRENTLY)
+WRITERS_IN_FLIGHT_SQL = """
+    SELECT EXISTS (
+        SELECT 1 FROM pg_locks
+        WHERE database = (SELECT oid FROM pg_database WHERE datname = current_database())
+          AND relation = 'recycling_facility'::regclass
+          AND granted AND pid <> pg_backend_pid()
+          AND mode IN ('RowExclusiveLock', 'ShareRowExclusiveLock', 'ExclusiveLock', 'AccessExclusiveLock')
+    )
+"""
+
+# Newest first, like the admin list
+SNAPSHOT_SQL = """
+    SELECT id::text, name, address, latitude::float8, longitude::float8, state, pincode,
+           is_verified, is_active, email, contact_number, registration_number, geocode_source,
+           created_at::text, updated_at::text
+    FROM recycling_facility
+    ORDER BY created_at DESC NULLS LAST, id
+"""
+COLUMNS = ['id', 'name', 'address', 'latitude', 'longitude', 'state', 'pincode',
+           'is_verified', 'is_active', 'email', 'contact_number', 'registration_number', 'geocode_source',
+           'created_at', 'updated_at']
+
+
+def has_version_trigger(cursor):
+    cursor.execute("""
+        SELECT EXISTS (SELECT 1 FROM pg_trigger
+                       WHERE tgrelid = 'recycling_facility'::regclass AND tgname = 'facility_data_version_bump')
+    """)
+    return cursor.fetchone()[0]
+
+
+def install_version_trigger(cursor):
+    """Create the sequence and the bump trigger (DDL: needs owner privileges)"""
+    cursor.execute(VERSION_SEQUENCE_SQL)
+    cursor.execute(VERSION_TRIGGER_SQL)
+    # Writes before the trigger existed were never stamped; invalidate older snapshots
+    return bump_version(cursor)
+
+
+def bump_version(cursor):
+    """Move the stamp so cached snapshots reload (the migrators call this when they finish)"""
+    cursor.execute(VERSION_SEQUENCE_SQL)
+    cursor.execute("SELECT nextval(%s)", (VERSION_SEQUENCE,))
+    return cursor.fetchone()[0]
+
+
+def current_version(cursor):
+    """The stamp, or 0 before anything bumped it; read-only"""
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (VERSION_SEQUENCE,))
+    if not cursor.fetchone()[0]:
+        return 0
+    cursor.execute(f"SELECT last_value FROM {VERSION_SEQUENCE}")
+    return cursor.fetchone()[0]
+
+
+def writers_in_flight(cursor):
+    """True while another transaction holds a write lock on recycling_facility"""
+    cursor.execute(WRITERS_IN_FLIGHT_SQL)
+    return cursor.fetchone()[0]
+
+
+def _parse_verified(value):
+    if value is None or value == "":
+        return None
+    if str(value).lower() in ("true", "1", "yes"):
+        return True
+    if str(value).lower() in ("false", "0", "no"):
+        return False
+    raise ValueError(f"verified must be true or false, got {value!r}")
+
+
+class FacilitySnapshot:
+    """One version of the facility table, grouped for filtered listing"""
+
+    def __init__(self, version, rows):
+        self.version = version
+        self.rows = rows  # list of dicts, newest first
+        self.loaded_at = time.time()
+        # Positions into self.rows (ascending = newest first) per filter value
+        self.by_state, self.by_pincode, self.by_verified = {}, {}, {True: [], False: []}
+        for position, row in enumerate(rows):
+            self.by_state.setdefault((row['state'] or "").upper(), []).append(position)
+            self.by_pincode.setdefault(row['pincode'] or "", []).append(position)
+            self.by_verified[bool(row['is_verified'])].append(position)
+        self.views = OrderedDict()  # (state, pincode, verified) -> positions
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def view(self, state=None, pincode=None, verified=None):
+        """Row positions matching every given filter (memoized per combination)"""
+        key = ((state or "").upper() or None, pincode or None, verified)
+        with self.lock:
+            if key in self.views:
+                self.views.move_to_end(key)
+                return self.views[key]
+
+        groups = []
+        if key[0] is not None:
+            groups.append(self.by_state.get(key[0], []))
+        if key[1] is not None:
+            groups.append(self.by_pincode.get(key[1], []))
+        if verified is not None:
+            groups.append(self.by_verified[verified])
+        if not groups:
+            positions = range(len(self.rows))
+        else:
+            # Walk the smallest group, test membership in the others
+            groups.sort(key=len)
+            others = [set(g) for g in groups[1:]]
+            positions = [p for p in groups[0] if all(p in other for other in others)]
+
+        with self.lock:
+            self.views[key] = positions
+            while len(self.views) > MAX_VIEWS:
+                self.views.popitem(last=False)
+        return positions
+
+    def page(self, state=None, pincode=None, verified=None, page=0, size=PAGE_SIZE):
+        positions = self.view(state, pincode, verified)
+        start = max(0, page) * size
+        return {
+            'items': [self.rows[p] for p in positions[start:start + size]],
+            'total': len(positions),
+            'page': page,
+            'size': size,
+            'version': self.version,
+        }
+
+    def save(self, path):
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({'version': self.version, 'columns': COLUMNS,
+                       'rows': [[row[c] for c in COLUMNS] for row in self.rows]}, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data['version'], [dict(zip(data['columns'], values)) for values in data['rows']])
+
+
+class FacilityCache:
+    """Read-through cache: serve the snapshot, reload it when the version stamp moves"""
+
+    def __init__(self, connection_factory=None, path=CACHE_FILE, check_seconds=CHECK_SECONDS):
+        if connection_factory is None:
+            from db import pooled_connection
+            connection_factory = pooled_connection
+        self.connection_factory = connection_factory  # context manager yielding a connection
+        self.path = path
+        self.check_seconds = check_seconds
+        self.snapshot = None
+        self.checked_at = 0.0
+        self.reload_lock = threading.Lock()
+        self.stats = {'queries': 0, 'version_checks': 0, 'reloads': 0}
+        if path and os.path.exists(path):
+            try:
+                self.snapshot = FacilitySnapshot.load(path)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️ Ignoring unreadable snapshot {path}: {e}")
+
+    def _version(self):
+        with self.connection_factory() as conn, conn.cursor() as cursor:
+            self.stats['version_checks'] += 1
+            return current_version(cursor)
+
+    def _load(self, version):
+        with self.connection_factory() as conn, conn.cursor() as cursor:
+            # A writer that bumped the stamp but hasn't committed yet would be missing from
+            # the snapshot; checked before the snapshot query, so later commits are included
+            settled = not writers_in_flight(cursor)
+            cursor.execute(SNAPSHOT_SQL)
+            rows = [dict(zip(COLUMNS, values)) for values in cursor]
+        self.stats['reloads'] += 1
+        # An unsettled snapshot carries no version, so the next check reloads it
+        snapshot = FacilitySnapshot(version if settled else None, rows)
+        if self.path:
+            snapshot.save(self.path)
+        return snapshot
+
+    def get(self):
+        """Current snapshot; checks the stamp at most every check_seconds"""
+        now = time.monotonic()
+        if self.snapshot is not None and now - self.checked_at < self.check_seconds:
+            return self.snapshot
+        with self.reload_lock:
+            if self.snapshot is not None and time.monotonic() - self.checked_at < self.check_seconds:
+                return self.snapshot  # another thread just checked
+            version = self._version()
+            if self.snapshot is None or self.snapshot.version != version:
+                self.snapshot = self._load(version)
+            self.checked_at = time.monotonic()
+            return self.snapshot
+
+    def query(self, state=None, pincode=None, verified=None, page=0, size=PAGE_SIZE):
+        self.stats['queries'] += 1
+        return self.get().page(state, pincode, verified, page, size)
+
+
+def serve(cache, host="127.0.0.1", port=8766):
+    """Tiny JSON query service for the admin API routes"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            try:
+                started = time.perf_counter()
+                if url.path == "/facilities":
+                    result = cache.query(
+                        state=params.get('state'), pincode=params.get('pincode'),
+                        verified=_parse_verified(params.get('verified')),
+                        page=int(params.get('page', 0)), size=min(int(params.get('size', PAGE_SIZE)), 500),
+                    )
+                elif url.path == "/version":
+                    snapshot = cache.get()
+                    result = {'version': snapshot.version, 'facilities': len(snapshot)}
+                else:
+                    return self._reply(404, {'error': 'Not Found'})
+                result['took_ms'] = round((time.perf_counter() - started) * 1000, 3)
+                self._reply(200, result)
+            except ValueError as e:
+                self._reply(400, {'error': 'Bad Request', 'message': str(e)})
+            except Exception as e:
+                self._reply(503, {'error': 'Service Unavailable', 'message': str(e)})
+
+        def log_message(self, format, *args):
+            pass  # keep the console quiet; one line per request is too noisy
+
+    snapshot = cache.get()
+    with cache.connection_factory() as conn, conn.cursor() as cursor:
+        if not has_version_trigger(cursor):
+            print("⚠️  No version trigger: only the migrators' bumps reload the cache "
+                  "(run `python facility_cache.py setup`)")
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"✅ Serving {len(snapshot)} facilities (version {snapshot.version}) "
+          f"on http://{host}:{port} (/facilities, /version)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Read-through facility list cache")
+    parser.add_argument("--file", default=CACHE_FILE, help="snapshot file (.json)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("setup", help="install the version sequence and bump trigger (as the table owner)")
+    sub.add_parser("version", help="print the current data version")
+    sub.add_parser("bump", help="force cached snapshots to reload")
+
+    query = sub.add_parser("query", help="list facilities from the snapshot")
+    query.add_argument("--state")
+    query.add_argument("--pincode")
+    query.add_argument("--verified", type=_parse_verified)
+    query.add_argument("--page", type=int, default=0)
+    query.add_argument("--size", type=int, default=PAGE_SIZE)
+
+    srv = sub.add_parser("serve", help="run the local JSON query service")
+    srv.add_argument("--host", default="127.0.0.1")
+    srv.add_argument("--port", type=int, default=8766)
+    return parser.parse_args()
+
+
+def main():
+    from db import connect, close_pool
+    args = parse_args()
+
+    if args.command in ("setup", "version", "bump"):
+        conn = connect()
+        with conn.cursor() as cursor:
+            if args.command == "setup":
+                version = install_version_trigger(cursor)
+                conn.commit()
+                print(f"✅ Version trigger installed on recycling_facility (version {version})")
+            elif args.command == "bump":
+                version = bump_version(cursor)
+                conn.commit()
+                print(f"✅ Facility data version bumped to {version}")
+            else:
+                print(f"Facility data version: {current_version(cursor)}")
+                if not has_version_trigger(cursor):
+                    print("⚠️  No version trigger: admin edits won't reload the cache "
+                          "(run `python facility_cache.py setup`)")
+                conn.commit()
+        conn.close()
+        return
+
+    cache = FacilityCache(path=args.file)
+    try:
+        if args.command == "serve":
+            serve(cache, args.host, args.port)
+            return
+
+        started = time.perf_counter()
+        result = cache.query(args.state, args.pincode, args.verified, args.page, args.size)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        for row in result['items']:
+            print(f"  {row['name'][:40]:40} {str(row['state'] or '')[:15]:15} {row['pincode'] or '':6} "
+                  f"{'✅' if row['is_verified'] else '  '} {row['id']}")
+        print(f"\n{len(result['items'])} of {result['total']} facilities (version {result['version']}, "
+              f"{'reloaded' if cache.stats['reloads'] else 'from snapshot file'}) in {elapsed_ms:.3f} ms")
+    finally:
+        close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Set-based duplicate detection for recycling_facility imports.
+
+Instead of one SELECT COUNT(*) per input row, the existing (name, address)
+keys are fetched once and duplicates are resolved in memory. When the
+recommended unique index exists, inserts can also use
+ON CONFLICT DO NOTHING so concurrent imports can't race each other.
+"""
+
+UNIQUE_INDEX_NAME = "ux_recycling_facility_name_address"
+
+# Created by full_migration when the table has no duplicate keys (see
+# count_duplicate_keys); otherwise clean them up first with FIND_DUPLICATES_SQL.
+UNIQUE_INDEX_SQL = f"""
+    CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {UNIQUE_INDEX_NAME}
+    ON recycling_facility (name, address)
+"""
+
+FIND_DUPLICATES_SQL = """
+    SELECT name, address, COUNT(*)
+    FROM recycling_facility
+    GROUP BY name, address
+    HAVING COUNT(*) > 1
+"""
+
+ON_CONFLICT_CLAUSE = "ON CONFLICT (name, address) DO NOTHING"
+
+
+def load_existing_keys(conn, fetch_size=10000):
+    """Fetch every (name, address) pair in a single query"""
+    keys = set()
+    # Named (server-side) cursor streams the result instead of buffering it all
+    with conn.cursor(name="existing_facility_keys") as cursor:
+        cursor.itersize = fetch_size
+        cursor.execute("SELECT name, address FROM recycling_facility")
+        for name, address in cursor:
+            keys.add((name, address))
+    return keys
+
+
+def has_unique_index(conn):
+    """True when a unique index covers exactly (name, address)"""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT EXISTS (
+                SELECT 1
+                FROM pg_index i
+                JOIN pg_class t ON t.oid = i.indrelid
+                WHERE t.relname = 'recycling_facility'
+                  AND i.indisunique
+                  AND i.indisvalid
+                  AND (
+                      SELECT array_agg(a.attname::text ORDER BY a.attname)
+                      FROM pg_attribute a
+                      WHERE a.attrelid = t.oid AND a.attnum = ANY(i.indkey)
+                  ) = ARRAY['address', 'name']
+                  AND i.indnatts = 2
+                  AND i.indpred IS NULL
+            )
+        """)
+        return cursor.fetchone()[0]
+
+
+def count_duplicate_keys(conn):
+    """Number of (name, address) keys stored more than once"""
+    with conn.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM ({FIND_DUPLICATES_SQL}) AS duplicates")
+        return cursor.fetchone()[0]
+
+
+def create_unique_index(conn):
+    """Create the recommended unique index (CONCURRENTLY needs autocommit)"""
+    # Ends the current (read-only setup) transaction; autocommit can't be switched inside one
+    conn.commit()
+    previous = conn.autocommit
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            # The build scans the whole table; don't let the session's statement_timeout cut it short
+            cursor.execute("SET statement_timeout = 0")
+            try:
+                cursor.execute(UNIQUE_INDEX_SQL)
+            except Exception:
+                # A failed concurrent build leaves an INVALID index that IF NOT EXISTS would then skip
+                cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {UNIQUE_INDEX_NAME}")
+                raise
+            finally:
+                cursor.execute("RESET statement_timeout")
+    finally:
+        conn.autocommit = previous
+
+
+class DuplicateFilter:
+    """In-memory (name, address) filter seeded from the database"""
+
+    def __init__(self, existing_keys=None):
+        self.keys = set(existing_keys or ())
+        self.stats = {'existing': 0, 'in_file': 0}
+        self._seen_in_file = set()
+
+    def check(self, name, address):
+        """Returns None for a new facility, or 'existing' / 'in_file' for duplicates"""
+        key = (name, address)
+        if key in self._seen_in_file:
+            self.stats['in_file'] += 1
+            return 'in_file'
+        if key in self.keys:
+            self.stats['existing'] += 1
+            return 'existing'
+        self._seen_in_file.add(key)
+        return None
+
+    def __len__(self):
+        return len(self.keys)
@@ -0,0 +1,281 @@
+"""
+Offline nearest-facility spatial index built from recycling_facility.
+
+Facility coordinates are exported once into a compact grid index stored as
+NumPy arrays (.npz): points are bucketed into fixed-size lat/lon cells and
+sorted by cell, so a query only computes vectorized haversine distances for
+the handful of cells around it instead of scanning the whole table.
+
+Usage:
+    python facility_index.py [--index facility_index.npz] build
+    python facility_index.py nearest --lat 13.08 --lon 80.27 [--k 5]
+    python facility_index.py within --lat 13.08 --lon 80.27 --km 10
+    python facility_index.py serve [--port 8765]
+
+The `serve` mode answers GET /nearest?lat=&lon=&k= and
+GET /within?lat=&lon=&km=[&limit=] with JSON, for the Next.js API routes to
+proxy (same pattern as the backend proxies under src/app/api).
+"""
+import os
+import json
+import time
+import argparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+
+if __name__ == "__main__":
+    # Run as a script: load .env before the settings below (and the local imports') are read
+    from dotenv import load_dotenv
+    load_dotenv()
+
+INDEX_FILE = os.getenv(
+    "FACILITY_INDEX_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "facility_index.npz")
+)
+CELL_DEGREES = float(os.getenv("FACILITY_INDEX_CELL_DEGREES", "0.25"))  # ~28 km at the equator
+EARTH_RADIUS_KM = 6371.0088
+
+# Grid is 0..719 x 0..1439 for CELL_DEGREES=0.25; key = row * COLS + col
+_LAT_OFFSET, _LON_OFFSET = 90.0, 180.0
+
+
+def haversine_km(lat, lon, lats, lons):
+    """Great-circle distance from one point to arrays of points (vectorized)"""
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class FacilityIndex:
+    """Grid-bucketed point index answering k-nearest and within-radius queries"""
+
+    def __init__(self, ids, names, lats, lons, cell_degrees=CELL_DEGREES):
+        self.cell_degrees = float(cell_degrees)
+        self.cols = int(np.ceil(360.0 / self.cell_degrees))
+        self.rows = int(np.ceil(180.0 / self.cell_degrees))
+
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        keys = self._cell_keys(lats, lons)
+        order = np.argsort(keys, kind="stable")
+
+        self.ids = np.asarray(ids, dtype=str)[order]
+        self.names = np.asarray(names, dtype=str)[order]
+        self.lats = lats[order]
+        self.lons = lons[order]
+        keys = keys[order]
+
+        # cell_keys[i] owns points [cell_starts[i], cell_starts[i + 1])
+        self.cell_keys, self.cell_starts = np.unique(keys, return_index=True)
+        self.cell_starts = np.append(self.cell_starts, len(keys))
+
+    def _cell_rc(self, lats, lons):
+        r = np.clip(((np.asarray(lats) + _LAT_OFFSET) // self.cell_degrees).astype(np.int64), 0, self.rows - 1)
+        c = np.clip(((np.asarray(lons) + _LON_OFFSET) // self.cell_degrees).astype(np.int64), 0, self.cols - 1)
+        return r, c
+
+    def _cell_keys(self, lats, lons):
+        r, c = self._cell_rc(lats, lons)
+        return r * self.cols + c
+
+    def __len__(self):
+        return len(self.ids)
+
+    # ------------------------------------------------------------------ persistence
+
+    @classmethod
+    def from_db(cls, conn, cell_degrees=CELL_DEGREES, active_only=True):
+        """Export facility coordinates with one query"""
+        with conn.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT id::text, name, latitude::float8, longitude::float8
+                FROM recycling_facility
+                WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+                {"AND is_active" if active_only else ""}
+            """)
+            rows = cursor.fetchall()
+        if not rows:
+            return cls([], [], [], [], cell_degrees)
+        ids, names, lats, lons = zip(*rows)
+        return cls(ids, names, lats, lons, cell_degrees)
+
+    def save(self, path=INDEX_FILE):
+        np.savez_compressed(
+            path, ids=self.ids, names=self.names, lats=self.lats, lons=self.lons,
+            cell_degrees=np.array(self.cell_degrees),
+        )
+
+    @classmethod
+    def load(cls, path=INDEX_FILE):
+        with np.load(path) as data:
+            return cls(data['ids'], data['names'], data['lats'], data['lons'],
+                       float(data['cell_degrees']))
+
+    # ------------------------------------------------------------------ queries
+
+    def _candidates(self, lat, lon, radius_km):
+        """Indices of points in every cell overlapping the query's bounding box"""
+        dlat = np.degrees(radius_km / EARTH_RADIUS_KM)
+        cos_lat = max(np.cos(np.radians(lat)), 1e-6)
+        dlon = min(180.0, np.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)))
+
+        r0, c0 = self._cell_rc(lat - dlat, lon - dlon)
+        r1, c1 = self._cell_rc(lat + dlat, lon + dlon)
+        rows = np.arange(r0, r1 + 1)
+        if dlon >= 180.0 or c0 > c1:  # wraps the antimeridian / covers every column
+            cols = np.arange(self.cols)
+        else:
+            cols = np.arange(c0, c1 + 1)
+        keys = (rows[:, None] * self.cols + cols[None, :]).ravel()
+
+        # Keep only the cells that actually hold points
+        pos = np.searchsorted(self.cell_keys, keys)
+        valid = pos < len(self.cell_keys)
+        pos, keys = pos[valid], keys[valid]
+        pos = pos[self.cell_keys[pos] == keys]
+        if not len(pos):
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([
+            np.arange(self.cell_starts[p], self.cell_starts[p + 1]) for p in pos
+        ])
+
+    def within(self, lat, lon, radius_km, limit=None):
+        """Facilities within radius_km, nearest first: list of (id, name, distance_km)"""
+        idx = self._candidates(lat, lon, radius_km)
+        if not len(idx):
+            return []
+        dist = haversine_km(lat, lon, self.lats[idx], self.lons[idx])
+        keep = dist <= radius_km
+        idx, dist = idx[keep], dist[keep]
+        order = np.argsort(dist, kind="stable")[:limit]
+        return [(self.ids[i], self.names[i], float(d)) for i, d in zip(idx[order], dist[order])]
+
+    def nearest(self, lat, lon, k=5):
+        """k nearest facilities: list of (id, name, distance_km)"""
+        if not len(self):
+            return []
+        k = min(k, len(self))
+        radius = self.cell_degrees * 111.0
+        # Once >= k points fall inside the radius, the true k nearest are among them
+        while True:
+            found = self.within(lat, lon, radius, limit=k)
+            if len(found) >= k or radius > np.pi * EARTH_RADIUS_KM:
+                return found
+            radius *= 2
+
+
+def _to_json(results):
+    return [{'id': i, 'name': n, 'distance_km': round(d, 3)} for i, n, d in results]
+
+
+def serve(index, host="127.0.0.1", port=8765):
+    """Tiny JSON query service for the frontend API routes"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            try:
+                lat, lon = float(params['lat']), float(params['lon'])
+                started = time.perf_counter()
+                if url.path == "/nearest":
+                    results = index.nearest(lat, lon, int(params.get('k', 5)))
+                elif url.path == "/within":
+                    limit = int(params['limit']) if 'limit' in params else None
+                    results = index.within(lat, lon, float(params['km']), limit)
+                else:
+                    return self._reply(404, {'error': 'Not Found'})
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                self._reply(200, {'results': _to_json(results), 'took_ms': round(elapsed_ms, 3)})
+            except KeyError as e:
+                self._reply(400, {'error': 'Bad Request', 'message': f"missing parameter {e}"})
+            except ValueError as e:
+                self._reply(400, {'error': 'Bad Request', 'message': str(e)})
+
+        def log_message(self, format, *args):
+            pass  # keep the console quiet; one line per request is too noisy
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"✅ Serving {len(index)} facilities on http://{host}:{port} (/nearest, /within)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Nearest-facility spatial index")
+    parser.add_argument("--index", default=INDEX_FILE, help="index file (.npz)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="export facility coordinates from the database")
+    build.add_argument("--cell-degrees", type=float, default=CELL_DEGREES)
+    build.add_argument("--include-inactive", action="store_true")
+
+    for name in ("nearest", "within"):
+        query = sub.add_parser(name)
+        query.add_argument("--lat", type=float, required=True)
+        query.add_argument("--lon", type=float, required=True)
+        if name == "nearest":
+            query.add_argument("--k", type=int, default=5)
+        else:
+            query.add_argument("--km", type=float, required=True)
+            query.add_argument("--limit", type=int)
+
+    srv = sub.add_parser("serve", help="run the local JSON query service")
+    srv.add_argument("--host", default="127.0.0.1")
+    srv.add_argument("--port", type=int, default=8765)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if args.command == "build":
+        from db import connect
+        print("Connecting to database...")
+        conn = connect()
+        started = time.perf_counter()
+        index = FacilityIndex.from_db(conn, args.cell_degrees, not args.include_inactive)
+        conn.close()
+        index.save(args.index)
+        print(f"✅ Indexed {len(index)} facilities in {len(index.cell_keys)} cells "
+              f"({time.perf_counter() - started:.2f}s) -> {args.index}")
+        return
+
+    if not os.path.exists(args.index):
+        print(f"❌ Error: Index file not found: {args.index} (run 'build' first)")
+        return
+    index = FacilityIndex.load(args.index)
+
+    if args.command == "serve":
+        serve(index, args.host, args.port)
+        return
+
+    started = time.perf_counter()
+    if args.command == "nearest":
+        results = index.nearest(args.lat, args.lon, args.k)
+    else:
+        results = index.within(args.lat, args.lon, args.km, args.limit)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    for rank, (facility_id, name, distance) in enumerate(results, 1):
+        print(f"{rank:3}. {distance:8.2f} km  {name[:50]:50} {facility_id}")
+    print(f"\n{len(results)} result(s) in {elapsed_ms:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
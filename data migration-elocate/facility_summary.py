@@ -0,0 +1,212 @@
+"""
+Precomputed facility counts maintained by the migrators.
+
+facility_summary holds one row per (state, pincode, is_verified,
+is_active, geocode_source) with the number of facilities in that group.
+Dashboards and health checks sum a few hundred summary rows instead of
+aggregating recycling_facility.
+
+The table is kept current incrementally, in the same transaction as the
+writes that change it:
+  * FacilityBatchWriter(summary=True) adds the rows each INSERT batch
+    returns (so ON CONFLICT skips are not counted);
+  * delta_migration subtracts the groups of the rows it is about to
+    update and adds their new groups, and moves deactivated rows from
+    active to inactive.
+
+Writes made outside the migrators (e.g. admin approve/reject flipping
+is_verified) are not seen; `verify` reports such drift and `rebuild`
+recomputes the table from scratch.
+
+    python facility_summary.py show [--by state|pincode|source|verified|active] [--state KARNATAKA]
+    python facility_summary.py verify
+    python facility_summary.py rebuild
+"""
+import time
+import argparse
+from collections import Counter
+from psycopg2.extras import execute_values
+
+if __name__ == "__main__":
+    # Run as a script: load .env before the settings below (and the local imports') are read
+    from dotenv import load_dotenv
+    load_dotenv()
+
+KEY_COLUMNS = ('state', 'pincode', 'is_verified', 'is_active', 'geocode_source')
+
+SUMMARY_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS facility_summary (
+        state          TEXT NOT NULL,
+        pincode        TEXT NOT NULL,
+        is_verified    BOOLEAN NOT NULL,
+        is_active      BOOLEAN NOT NULL,
+        geocode_source TEXT NOT NULL,
+        facility_count BIGINT NOT NULL,
+        updated_at     TIMESTAMPTZ NOT NULL DEFAULT now(),
+        PRIMARY KEY (state, pincode, is_verified, is_active, geocode_source)
+    )
+"""
+
+UPSERT_SQL = f"""
+    INSERT INTO facility_summary ({', '.join(KEY_COLUMNS)}, facility_count) VALUES %s
+    ON CONFLICT ({', '.join(KEY_COLUMNS)}) DO UPDATE
+    SET facility_count = facility_summary.facility_count + EXCLUDED.facility_count, updated_at = now()
+"""
+
+# What dashboards group by; summary rows are summed per requested column
+GROUPINGS = {
+    'state': 'state',
+    'pincode': 'pincode',
+    'source': 'geocode_source',
+    'verified': 'is_verified',
+    'active': 'is_active',
+}
+
+
+def key_columns(alias=None):
+    """SQL expressions for the summary key of a recycling_facility row (NULLs folded)"""
+    p = f"{alias}." if alias else ""
+    return (f"COALESCE(UPPER({p}state), ''), COALESCE({p}pincode, ''), COALESCE({p}is_verified, false), "
+            f"COALESCE({p}is_active, false), COALESCE({p}geocode_source, '')")
+
+
+def summary_exists(cursor):
+    cursor.execute("SELECT to_regclass('facility_summary') IS NOT NULL")
+    return cursor.fetchone()[0]
+
+
+def rebuild(cursor):
+    """Recompute every count from recycling_facility; returns the number of groups"""
+    cursor.execute(SUMMARY_TABLE_SQL)
+    cursor.execute("DELETE FROM facility_summary")
+    cursor.execute(f"""
+        INSERT INTO facility_summary ({', '.join(KEY_COLUMNS)}, facility_count)
+        SELECT {key_columns()}, COUNT(*) FROM recycling_facility GROUP BY 1, 2, 3, 4, 5
+    """)
+    return cursor.rowcount
+
+
+def ensure_summary(conn):
+    """Create and seed the table on first use; returns True if it was just built"""
+    with conn.cursor() as cursor:
+        if summary_exists(cursor):
+            return False
+        rebuild(cursor)
+    conn.commit()
+    return True
+
+
+def apply_counts(cursor, counts):
+    """Add a Counter of summary key -> delta (negative to subtract)"""
+    values = [(*key, n) for key, n in counts.items() if n]
+    if not values:
+        return
+    execute_values(cursor, UPSERT_SQL, values, page_size=len(values))
+    if any(n < 0 for *_, n in values):
+        cursor.execute("DELETE FROM facility_summary WHERE facility_count <= 0")
+
+
+def counts_for_ids(cursor, ids, id_type="uuid"):
+    """Current summary keys of the given facilities, as a Counter"""
+    if not ids:
+        return Counter()
+    cursor.execute(f"""
+        SELECT {key_columns()}, COUNT(*) FROM recycling_facility
+        WHERE id = ANY(%s::{id_type}[]) GROUP BY 1, 2, 3, 4, 5
+    """, (list(ids),))
+    return Counter({tuple(row[:5]): row[5] for row in cursor.fetchall()})
+
+
+def read_summary(cursor, by="state", state=None):
+    """[(group value, facilities)] from the summary table, largest first"""
+    column = GROUPINGS[by]
+    where, params = "", ()
+    if state:
+        where, params = "WHERE state = %s", (state.strip().upper(),)
+    cursor.execute(f"""
+        SELECT {column}, SUM(facility_count)::bigint FROM facility_summary {where}
+        GROUP BY 1 ORDER BY 2 DESC, 1
+    """, params)
+    return cursor.fetchall()
+
+
+def total_facilities(cursor):
+    """Facility count from the summary (None if the table doesn't exist yet)"""
+    if not summary_exists(cursor):
+        return None
+    cursor.execute("SELECT COALESCE(SUM(facility_count), 0)::bigint FROM facility_summary")
+    return cursor.fetchone()[0]
+
+
+def drift(cursor):
+    """Groups whose summary count differs from a live GROUP BY: [(key, summary, actual)]"""
+    cursor.execute(f"SELECT {', '.join(KEY_COLUMNS)}, facility_count FROM facility_summary")
+    summary = {tuple(row[:5]): row[5] for row in cursor.fetchall()}
+    cursor.execute(f"SELECT {key_columns()}, COUNT(*) FROM recycling_facility GROUP BY 1, 2, 3, 4, 5")
+    actual = {tuple(row[:5]): row[5] for row in cursor.fetchall()}
+    return [(key, summary.get(key, 0), actual.get(key, 0))
+            for key in sorted(set(summary) | set(actual), key=str)
+            if summary.get(key, 0) != actual.get(key, 0)]
+
+
+def drift_note(cursor):
+    """One line for the checkers: how far the summary is from the table (same GROUP BY as `verify`)"""
+    mismatches = drift(cursor)
+    if not mismatches:
+        return "✅ facility_summary matches recycling_facility"
+    off = sum(actual - expected for _, expected, actual in mismatches)
+    return (f"⚠️  facility_summary drifted in {len(mismatches)} group(s), {off:+} facilities in total; "
+            f"run 'python facility_summary.py rebuild'")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Precomputed facility counts")
+    sub = parser.add_subparsers(dest="command", required=True)
+    show = sub.add_parser("show", help="counts from the summary table")
+    show.add_argument("--by", choices=sorted(GROUPINGS), default="state")
+    show.add_argument("--state", help="only this state")
+    show.add_argument("--limit", type=int, default=50)
+    sub.add_parser("verify", help="compare the summary with a full GROUP BY")
+    sub.add_parser("rebuild", help="recompute the summary from recycling_facility")
+    return parser.parse_args()
+
+
+def main():
+    from db import connect
+    args = parse_args()
+
+    print("Connecting to database...")
+    conn = connect()
+    cursor = conn.cursor()
+    started = time.perf_counter()
+
+    if args.command == "rebuild":
+        groups = rebuild(cursor)
+        conn.commit()
+        print(f"✅ Rebuilt facility_summary: {groups} groups, {total_facilities(cursor)} facilities "
+              f"({time.perf_counter() - started:.2f}s)")
+    elif not summary_exists(cursor):
+        print("⚠️ facility_summary does not exist yet; run 'rebuild' or a migration first")
+    elif args.command == "verify":
+        mismatches = drift(cursor)
+        if not mismatches:
+            print(f"✅ facility_summary matches recycling_facility ({time.perf_counter() - started:.2f}s)")
+        else:
+            print(f"❌ {len(mismatches)} group(s) drifted; run 'rebuild':")
+            for key, expected, actual in mismatches[:20]:
+                print(f"  {' / '.join(str(k) for k in key)[:60]:60} summary {expected:6}  actual {actual:6}")
+    else:
+        rows = read_summary(cursor, args.by, args.state)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        for value, count in rows[:args.limit]:
+            print(f"  {str(value)[:40] or '(none)':40} {count:8}")
+        if len(rows) > args.limit:
+            print(f"  ... and {len(rows) - args.limit} more")
+        print(f"\n{sum(c for _, c in rows)} facilities in {len(rows)} groups ({elapsed_ms:.2f} ms)")
+
+    cursor.close()
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
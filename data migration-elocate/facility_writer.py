@@ -0,0 +1,157 @@
+"""
+Batched writer for the recycling_facility table.
+
+Rows are buffered and sent with psycopg2's execute_values (one multi-row
+INSERT per batch) instead of one round trip per facility, and the
+transaction is committed every N rows so a crash only loses the open batch
+(defer_commit=True leaves every commit to the caller, for all-or-nothing runs).
+With summary=True each batch also updates facility_summary (see
+facility_summary.py) in the same transaction.
+"""
+import os
+import time
+from collections import Counter
+from psycopg2.extras import execute_values
+from facility_dedup import ON_CONFLICT_CLAUSE
+from facility_summary import key_columns, apply_counts
+
+BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", "500"))
+# Commit every batch by default so a crash loses at most one batch
+COMMIT_EVERY = int(os.getenv("MIGRATION_COMMIT_EVERY", str(BATCH_SIZE)))
+
+FACILITY_COLUMNS = (
+    'id', 'name', 'address', 'latitude', 'longitude',
+    'capacity', 'contact_number', 'operating_hours',
+    'is_verified', 'is_active', 'created_at', 'updated_at',
+    'geocode_source', 'email', 'state', 'pincode', 'registration_number'
+)
+
+
+class FacilityBatchWriter:
+    """Buffers facility rows and writes them in multi-row INSERT batches"""
+
+    def __init__(self, conn, batch_size=BATCH_SIZE, commit_every=COMMIT_EVERY,
+                 columns=FACILITY_COLUMNS, on_conflict=False, on_commit=None, metrics=None, summary=False,
+                 defer_commit=False):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.batch_size = max(1, batch_size)
+        self.commit_every = max(self.batch_size, commit_every)
+        self.columns = columns
+        self.insert_sql = f"INSERT INTO recycling_facility ({', '.join(columns)}) VALUES %s"
+        if on_conflict:
+            # Requires the unique (name, address) index, see facility_dedup.py
+            self.insert_sql += f" {ON_CONFLICT_CLAUSE}"
+        if summary:
+            # Inserted rows come back as summary keys; conflict-skipped rows don't
+            self.insert_sql += f" RETURNING {key_columns()}"
+        self.on_conflict = on_conflict
+        self.summary = summary
+        self.defer_commit = defer_commit  # never commit; the caller commits the whole run
+        self.on_commit = on_commit  # called after every successful commit
+        self.metrics = metrics  # optional metrics.Metrics
+        self.failed_ids = set()  # ids of rows rejected by the row-by-row fallback
+        self.buffer = []
+        self.uncommitted = 0
+        self.batch_timings = []  # (batch_no, rows, seconds)
+        self.stats = {'written': 0, 'failed': 0, 'conflicts': 0, 'commits': 0}
+
+    def add(self, row):
+        """Queue a row (dict keyed by column name or tuple in column order)"""
+        if isinstance(row, dict):
+            row = tuple(row.get(col) for col in self.columns)
+        self.buffer.append(row)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Send the buffered rows as one batch; commits every commit_every rows"""
+        if not self.buffer:
+            return
+        rows, self.buffer = self.buffer, []
+        failed_before = self.stats['failed']
+        started = time.perf_counter()
+
+        self.cursor.execute("SAVEPOINT facility_batch")
+        counts = Counter()
+        try:
+            written = self._insert(rows, counts)
+        except Exception as e:
+            print(f"  ⚠️ Batch insert failed ({e}); retrying row by row")
+            self.cursor.execute("ROLLBACK TO SAVEPOINT facility_batch")
+            counts.clear()
+            written = self._write_rows_individually(rows, counts)
+        if counts:
+            apply_counts(self.cursor, counts)
+        self.cursor.execute("RELEASE SAVEPOINT facility_batch")
+
+        elapsed = time.perf_counter() - started
+        self.stats['written'] += written
+        if self.on_conflict:
+            failed = self.stats['failed'] - failed_before
+            self.stats['conflicts'] += len(rows) - written - failed
+        self.uncommitted += written
+        self.batch_timings.append((len(self.batch_timings) + 1, len(rows), elapsed))
+        print(f"  💾 Batch {len(self.batch_timings)}: {written}/{len(rows)} rows in {elapsed:.2f}s")
+        if self.metrics is not None:
+            self.metrics.observe("stage_seconds", elapsed, stage="insert")
+            self.metrics.count("rows_written", written)
+            self.metrics.event("batch", batch=len(self.batch_timings), rows=len(rows),
+                               written=written, seconds=round(elapsed, 4))
+
+        if self.uncommitted >= self.commit_every and not self.defer_commit:
+            self.commit()
+
+    def _insert(self, rows, counts):
+        """One multi-row INSERT; returns rows written and adds their summary keys to counts"""
+        returned = execute_values(self.cursor, self.insert_sql, rows, page_size=len(rows), fetch=self.summary)
+        if self.summary:
+            counts.update(tuple(row) for row in returned)
+            return len(returned)
+        return self.cursor.rowcount if self.on_conflict else len(rows)
+
+    def _write_rows_individually(self, rows, counts):
+        """Fallback so one bad row doesn't sink the whole batch"""
+        written = 0
+        for row in rows:
+            self.cursor.execute("SAVEPOINT facility_row")
+            try:
+                written += self._insert([row], counts)
+                self.cursor.execute("RELEASE SAVEPOINT facility_row")
+            except Exception as e:
+                self.cursor.execute("ROLLBACK TO SAVEPOINT facility_row")
+                self.stats['failed'] += 1
+                self.failed_ids.add(row[0])
+                print(f"  ❌ Insert failed for {str(row[1])[:50]}: {e}")
+        return written
+
+    def commit(self):
+        started = time.perf_counter()
+        self.conn.commit()
+        self.stats['commits'] += 1
+        self.uncommitted = 0
+        elapsed = time.perf_counter() - started
+        if self.metrics is not None:
+            self.metrics.observe("stage_seconds", elapsed, stage="commit")
+            self.metrics.event("commit", commits=self.stats['commits'], written=self.stats['written'],
+                               seconds=round(elapsed, 4))
+        if self.on_commit:
+            self.on_commit()
+        return elapsed
+
+    def close(self):
+        """Flush remaining rows and commit (just flush with defer_commit)"""
+        self.flush()
+        if not self.defer_commit:
+            self.commit()
+        self.cursor.close()
+
+    def print_timings(self):
+        if not self.batch_timings:
+            return
+        total = sum(t for _, _, t in self.batch_timings)
+        rows = sum(n for _, n, _ in self.batch_timings)
+        print(f"Insert batches:    {len(self.batch_timings)} "
+              f"({rows} rows in {total:.2f}s, {rows / total if total else 0:.0f} rows/s)")
+        for batch_no, n, seconds in self.batch_timings:
+            print(f"  Batch {batch_no:4}:      {n:5} rows  {seconds * 1000:8.1f} ms")
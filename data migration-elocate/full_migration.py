@@ -1,181 +1,418 @@
-import pandas as pd
 import os
+import argparse
 import time
-import re
 import uuid
 import psycopg2
 from datetime import datetime
-from geopy.geocoders import Nominatim
 from dotenv import load_dotenv
-from urllib.parse import urlparse, parse_qsl
 
-# Load env variables
+# Before the local imports: their settings are read from the environment at import time
 load_dotenv()
 
+from db import get_pool, pooled_connection, close_pool
+from geocode_cache import GeocodeCache
+from pincode_index import PincodeIndex
+from geocode_scheduler import GeocodeScheduler
+from geocode_retry import RETRY
+from strategy_planner import StrategyPlanner
+from facility_cache import bump_version
+from facility_summary import ensure_summary
+from geocode_prefetch import prefetch, PROCESSES as PREFETCH_PROCESSES
+from facility_writer import FacilityBatchWriter
+from facility_dedup import (
+    DuplicateFilter, load_existing_keys, has_unique_index, count_duplicate_keys,
+    create_unique_index, UNIQUE_INDEX_SQL,
+)
+import fuzzy_dedup
+from fuzzy_dedup import FuzzyDuplicateIndex, FuzzyReport
+from migration_checkpoint import MigrationCheckpoint
+from metrics import Metrics
+from pipeline import Pipeline
+from xlsx_reader import read_columns, iter_chunks, find_column
+from normalize import (
+    normalize_frame, iter_normalized,
+    NAME_COLUMNS, ADDRESS_COLUMNS, STATE_COLUMNS, EMAIL_COLUMNS,
+)
+
 # File paths
 INPUT_FILE = r"C:\Users\kasum\Downloads\RecyclerRegistrationGrantedList.xlsx"
 
-# Geocoder (FREE – OpenStreetMap)
-geolocator = Nominatim(user_agent="elocate_full_migrator")
+# Pipeline workers (queue size: MIGRATION_QUEUE_SIZE, see pipeline.py)
+NORMALIZE_WORKERS = int(os.getenv("MIGRATION_NORMALIZE_WORKERS", "2"))
+CHUNK_QUEUE_SIZE = int(os.getenv("MIGRATION_CHUNK_QUEUE_SIZE", "2"))
 
-def extract_pincode(address):
-    """Extract 6-digit Indian PIN code from address"""
-    if pd.isna(address):
-        return None
-    match = re.search(r'\b\d{6}\b', str(address))
-    return match.group(0) if match else None
+def collect_geocode_jobs(name_col, address_col, state_col, email_col, existing_keys, done_rows=()):
+    """
+    Pre-pass for --prefetch: distinct (address, state, pincode) of the rows the
+    pipeline will geocode, i.e. not committed by a resumed run, not in the DB
+    and not a repeat of an earlier row in the file
+    """
+    jobs = {}
+    dedup = DuplicateFilter(existing_keys)  # a copy; the pipeline's filter must start fresh
+    next_row = 0
+    for chunk in iter_chunks(INPUT_FILE):
+        normalized = normalize_frame(chunk, name_col, address_col, state_col, email_col)
+        # Same row numbering as MigrationRun.dedup_chunk, so checkpointed rows line up
+        for row_no, (_, name, address, state, _, _, pincode) in enumerate(iter_normalized(normalized),
+                                                                           next_row + 1):
+            if row_no in done_rows or not address or dedup.check(name, address):
+                continue
+            jobs[(address, state, pincode)] = None
+        next_row += len(chunk)
+    return list(jobs)
 
-def get_lat_lon_smart(address, state):
-    """Smart geocoding priority for Indian addresses"""
-    pincode = extract_pincode(address)
-    
-    strategies = [
-        ("PIN", f"{pincode}, {state}, India" if pincode else None),
-        ("FULL_ADDRESS", f"{address}, {state}, India"),
-    ]
-    
-    for strategy_name, query in strategies:
-        if not query:
-            continue
-        try:
-            location = geolocator.geocode(query, timeout=10)
-            time.sleep(1.2)  # Rate limiting
-            if location:
-                return location.latitude, location.longitude, strategy_name
-        except Exception:
-            pass
-    return None, None, "FAILED"
+class MigrationRun:
+    """
+    The migration's pipeline stages and the state they share. main() wires
+    them to Postgres; benchmarks/run_benchmark.py drives the same stages
+    with a stub geocoder and a local writer.
+    """
 
-def main():
-    print("🚀 Starting Direct XLSX -> PostgreSQL Migration")
-    
-    if not os.path.exists(INPUT_FILE):
-        print(f"❌ Error: Input file not found: {INPUT_FILE}")
-        return
+    def __init__(self, input_file, columns, scheduler, writer, dedup, checkpoint, metrics,
+                 fuzzy=None, fuzzy_report=None, done_rows=(), verbose=True):
+        self.input_file = input_file
+        self.columns = columns  # (name, address, state, email) column names
+        self.scheduler = scheduler
+        self.writer = writer  # FacilityBatchWriter or anything with add()
+        self.dedup = dedup
+        self.checkpoint = checkpoint
+        self.metrics = metrics
+        self.fuzzy = fuzzy
+        self.fuzzy_report = fuzzy_report
+        self.done_rows = done_rows
+        self.verbose = verbose  # per-row progress lines
+        self.stats = {'total': 0, 'imported': 0, 'insert_failed': 0, 'duplicates': 0, 'failed_geocode': 0,
+                      'skipped': 0, 'resumed': 0, 'near_duplicates': 0, 'retried': 0, 'recovered': 0}
+        # Normalizer workers may finish out of order; dedup in sheet order so "first row wins" holds
+        self.next_seq = 0
+        self.waiting = {}
+        self.progress = 0
+        # Rows that only failed on provider errors; geocoded again once the pipeline is done
+        self.retry_queue = []
+        self.final_pass = False
 
-    # Database connection
-    db_url = os.getenv("DATABASE_URL")
-    if not db_url:
-        print("❌ Error: DATABASE_URL not found in environment")
-        return
+    def log(self, message):
+        if self.verbose:
+            print(message)
 
-    print("Connecting to database...")
-    try:
-        tmpPostgres = urlparse(db_url)
-        conn = psycopg2.connect(
-            host=tmpPostgres.hostname,
-            database=tmpPostgres.path.replace('/', ''),
-            user=tmpPostgres.username,
-            password=tmpPostgres.password,
-            port=tmpPostgres.port or 5432,
-            **dict(parse_qsl(tmpPostgres.query))
-        )
-        cursor = conn.cursor()
-        print("✅ Connected to database\n")
-    except Exception as e:
-        print(f"❌ Database connection failed: {e}")
-        return
+    def read_chunks(self, emit):
+        next_row = 0
+        for seq, chunk in enumerate(iter_chunks(self.input_file)):
+            self.metrics.count("rows_read", len(chunk))
+            emit((seq, next_row, chunk))
+            next_row += len(chunk)
+
+    def normalize_chunk(self, item, emit):
+        # Cleaning + PIN extraction for the whole chunk at once; later stages only do lookups
+        seq, first_row, chunk = item
+        normalized = normalize_frame(chunk, *self.columns)
+        emit((seq, first_row, list(iter_normalized(normalized))))
+
+    def dedup_chunk(self, item, emit):
+        stats = self.stats
+        self.waiting[item[0]] = item
+        while self.next_seq in self.waiting:
+            _, first_row, rows = self.waiting.pop(self.next_seq)
+            self.next_seq += 1
+            for offset, (index, name, address, state, email, _, pincode) in enumerate(rows, 1):
+                stats['total'] += 1
+                row_no = first_row + offset
+
+                if row_no in self.done_rows:
+                    stats['resumed'] += 1
+                    continue
+
+                if not address:
+                    self.log(f"⚠️ Row {index}: Missing address, skipping.")
+                    stats['skipped'] += 1
+                    continue
+
+                duplicate = self.dedup.check(name, address)
+                if duplicate:
+                    self.log(f"⚠️ Row {index}: {name[:50]} - "
+                             f"{'already exists in DB' if duplicate == 'existing' else 'duplicate row in input file'}.")
+                    stats['duplicates'] += 1
+                    self.metrics.count("rows_duplicate", kind=duplicate)
+                    continue
+
+                if self.fuzzy is not None:
+                    match = self.fuzzy.check(f"row {index}", name, address, state, pincode)
+                    if match:
+                        self.log(f"🔎 Row {index}: {name[:50]} - near-duplicate of {match[1][:50]} ({match[2]:.2f})")
+                        self.fuzzy_report.add(index, name, address, state, pincode, match)
+                        stats['near_duplicates'] += 1
+                        self.metrics.count("rows_near_duplicate", mode=fuzzy_dedup.MODE)
+                        if fuzzy_dedup.MODE == "skip":
+                            stats['duplicates'] += 1
+                            continue
+
+                emit((row_no, name, address, state, email, pincode))
+
+    def geocode_row(self, item, emit):
+        _, _, address, state, _, pincode = item
+        emit((item, self.scheduler.resolve(address, state, pincode)))
+
+    def write_row(self, item, emit):
+        stats = self.stats
+        (row_no, name, address, state, email, pincode), (lat, lon, source) = item
+        if self.final_pass and lat and lon:
+            stats['recovered'] += 1
+        elif source == RETRY and not self.final_pass:
+            self.log(f"  🔁 Row {row_no}: geocoder unavailable, queued for retry")
+            self.retry_queue.append(item[0])
+            return
+        self.progress += 1
+        self.metrics.count("rows_geocoded", source=source)
+        self.log(f"[{self.progress}] {name[:50]}...")
+
+        if source == RETRY:
+            self.log("  ❌ Geocoding failed again (provider errors); --resume will retry it.")
+            stats['failed_geocode'] += 1
+            return  # not checkpointed, so --resume picks it up
+        if not lat or not lon:
+            self.log("  ❌ Geocoding failed.")
+            stats['failed_geocode'] += 1
+            self.checkpoint.record(row_no, 'failed_geocode', source=source)
+            # We skip if geocoding fails as coordinates are likely required
+            return
+
+        now = datetime.utcnow().isoformat()
+
+        # Generate registration number from state and index
+        reg_number = f"REG-{state[:3]}-{row_no:04d}"
+
+        facility_id = str(uuid.uuid4())
+        self.checkpoint.record(row_no, 'inserted', facility_id, lat, lon, source)
+        self.writer.add((
+            facility_id, name, address, lat, lon,
+            1000, '', '9AM-6PM', False, True, now, now,
+            source, email, state, pincode, reg_number
+        ))
+        self.log(f"  ✅ Queued ({lat}, {lon}) via {source} - Reg: {reg_number}")
+
+    def build_pipeline(self, normalize_workers=NORMALIZE_WORKERS, chunk_queue_size=CHUNK_QUEUE_SIZE):
+        """
+        Staged pipeline: read -> normalize -> dedup -> geocode -> write, connected by
+        bounded queues so inserts overlap with geocoding waits and memory stays flat
+        """
+        pipeline = Pipeline(metrics=self.metrics)
+        # Whole chunks are large; only a couple need to be in flight between the first stages
+        pipeline.add("read", self.read_chunks, source=True)
+        pipeline.add("normalize", self.normalize_chunk, workers=normalize_workers, queue_size=chunk_queue_size)
+        pipeline.add("dedup", self.dedup_chunk, queue_size=chunk_queue_size)
+        pipeline.add("geocode", self.geocode_row, workers=self.scheduler.workers)
+        pipeline.add("write", self.write_row)  # single writer owns the connection and the checkpoint
+        return pipeline
 
-    # Read Excel
+    def run(self, pipeline):
+        """Run the pipeline, then the deferred retry pass; the caller closes the writer"""
+        pipeline.run()
+        self.retry_deferred()
+
+    def retry_deferred(self):
+        if not self.retry_queue:
+            return
+        # Prefetch gaps are fetched from the provider now; open circuits are waited out this time
+        print(f"\n🔁 Retrying {len(self.retry_queue)} rows that hit geocoder errors...")
+        self.stats['retried'] = len(self.retry_queue)
+        self.final_pass = True
+        self.scheduler.cache_only = False
+        self.scheduler.wait_for_breakers = True
+        jobs = [(address, state, pincode) for _, _, address, state, _, pincode in self.retry_queue]
+        with self.metrics.timer("stage_seconds", stage="retry"):
+            for row, result in zip(self.retry_queue, self.scheduler.resolve_all(jobs)):
+                self.write_row((row, result), None)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Migrate the CPCB recycler list into recycling_facility")
+    parser.add_argument("--resume", action="store_true",
+                        help="skip input rows committed by a previous (crashed) run of the same file")
+    parser.add_argument("--prefetch", type=int, nargs="?", const=PREFETCH_PROCESSES, metavar="PROCESSES",
+                        help="geocode into the cache with a process pool (sharded by state) before writing; "
+                             f"the write phase then only reads the cache (default: {PREFETCH_PROCESSES})")
+    return parser.parse_args()
+
+def migrate(conn, args):
+    """Everything after connecting: setup, the pipeline, the retry pass and the summary"""
+    # Persistent geocode cache (see geocode_cache.py for GEOCODE_CACHE_* settings)
+    geocode_cache = GeocodeCache()
+    print(f"Geocode cache: {geocode_cache.path} (eviction: {geocode_cache.eviction})")
+    # PIN code centroid index (see pincode_index.py for PINCODE_INDEX_FILE)
+    pincode_index = PincodeIndex()
+    print(f"PIN index: {len(pincode_index)} centroids loaded from {pincode_index.path}")
+    # Counters + latency histograms (see metrics.py for MIGRATION_METRICS_FILE / _PROM)
+    metrics = Metrics()
+    print(f"Metrics: {metrics.path}" + (f" + {metrics.prom_path}" if metrics.prom_path else ""))
+    # Learned strategy order per state / address shape (see strategy_planner.py for PLANNER_*)
+    planner = StrategyPlanner()
+    # Concurrent geocoder (see geocode_scheduler.py for GEOCODE_PROVIDERS / GEOCODE_WORKERS)
+    scheduler = GeocodeScheduler(cache=geocode_cache, pincode_index=pincode_index, metrics=metrics,
+                                 planner=planner)
+    print(f"Geocoding with {scheduler.workers} workers via "
+          f"{', '.join(p.describe() for p in scheduler.providers)}\n")
+
+    # Stream the sheet; only the header is read up front
     try:
         print(f"Reading: {INPUT_FILE}")
-        df = pd.read_excel(INPUT_FILE)
-        print(f"Successfully loaded {len(df)} rows.\n")
+        columns = read_columns(INPUT_FILE)
+        print(f"Found {len(columns)} columns.\n")
     except Exception as e:
         print(f"❌ Error reading Excel: {e}")
         return
 
-    # Column mapping helper
-    def find_col(possible_names):
-        for name in possible_names:
-            for col in df.columns:
-                if name.lower() in str(col).lower():
-                    return col
-        return None
-
-    name_col = find_col(['Company Name', 'Name', 'Unit Name'])
-    address_col = find_col(['Address'])
-    state_col = find_col(['State'])
-    email_col = find_col(['Email'])
-
-    stats = {'total': 0, 'imported': 0, 'duplicates': 0, 'failed_geocode': 0, 'skipped': 0}
-
-    for index, row in df.iterrows():
-        stats['total'] += 1
-        
-        name = str(row[name_col]).strip() if name_col and pd.notna(row[name_col]) else "Unknown"
-        address = str(row[address_col]).strip() if address_col and pd.notna(row[address_col]) else None
-        state = str(row[state_col]).strip().upper() if state_col and pd.notna(row[state_col]) else "UNKNOWN"
-        email = str(row[email_col]).strip() if email_col and pd.notna(row[email_col]) else ""
-
-        if not address:
-            print(f"⚠️ Row {index+2}: Missing address, skipping.")
-            stats['skipped'] += 1
-            continue
-
-        print(f"[{stats['total']}/{len(df)}] Processing: {name[:50]}...")
-
-        # 1. Duplicate check
-        cursor.execute(
-            "SELECT COUNT(*) FROM recycling_facility WHERE name = %s AND address = %s",
-            (name, address)
-        )
-        if cursor.fetchone()[0] > 0:
-            print(f"  ⚠️ Already exists in DB.")
-            stats['duplicates'] += 1
-            continue
-
-        # 2. Geocode
-        lat, lon, source = get_lat_lon_smart(address, state)
-        if not lat or not lon:
-            print(f"  ❌ Geocoding failed.")
-            stats['failed_geocode'] += 1
-            # We skip if geocoding fails as coordinates are likely required
-            continue
-
-        # 3. Insert
-        try:
-            now = datetime.utcnow().isoformat()
-            pincode = extract_pincode(address)
-            
-            # Generate registration number from state and index
-            reg_number = f"REG-{state[:3]}-{stats['total']:04d}"
-            
-            cursor.execute(
-                """
-                INSERT INTO recycling_facility (
-                    id, name, address, latitude, longitude, 
-                    capacity, contact_number, operating_hours, 
-                    is_verified, is_active, created_at, updated_at, 
-                    geocode_source, email, state, pincode, registration_number
-                ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-                """,
-                (
-                    str(uuid.uuid4()), name, address, lat, lon,
-                    1000, '', '9AM-6PM', False, True, now, now,
-                    source, email, state, pincode, reg_number
-                )
-            )
-            stats['imported'] += 1
-            print(f"  ✅ Inserted ({lat}, {lon}) - Reg: {reg_number}")
-        except Exception as e:
-            print(f"  ❌ Insert failed: {e}")
-            conn.rollback()
-
-    conn.commit()
-    cursor.close()
-    conn.close()
+    name_col = find_column(columns, NAME_COLUMNS)
+    address_col = find_column(columns, ADDRESS_COLUMNS)
+    state_col = find_column(columns, STATE_COLUMNS)
+    email_col = find_column(columns, EMAIL_COLUMNS)
+
+    # Row outcomes are checkpointed after each commit so --resume can pick up where we stopped
+    checkpoint = MigrationCheckpoint(INPUT_FILE)
+    done_rows = set()
+    if args.resume:
+        done_rows = checkpoint.done_rows()
+        print(f"Resuming: {len(done_rows)} rows already committed ({checkpoint.path})")
+    else:
+        checkpoint.reset()
+
+    # Existing facilities are loaded once; duplicates are resolved in memory
+    dedup = DuplicateFilter(load_existing_keys(conn))
+    print(f"Loaded {len(dedup)} existing facility keys")
+    # Near-duplicates (casing, "Pvt Ltd" vs "Private Limited", ...) per FUZZY_DEDUP_MODE, see fuzzy_dedup.py
+    fuzzy = fuzzy_report = None
+    if fuzzy_dedup.MODE != "off":
+        fuzzy = FuzzyDuplicateIndex.from_db(conn)
+        fuzzy_report = FuzzyReport()
+        print(f"Fuzzy dedup: {fuzzy_dedup.MODE} near-duplicates (threshold {fuzzy.threshold:.2f}, "
+              f"{len(fuzzy)} facilities indexed)")
+    on_conflict = has_unique_index(conn)
+    if not on_conflict:
+        duplicates = count_duplicate_keys(conn)
+        if duplicates:
+            print(f"💡 {duplicates} duplicate (name, address) keys block the unique index; "
+                  "clean them up, then add it so inserts can use ON CONFLICT DO NOTHING:")
+            print(f"   {' '.join(UNIQUE_INDEX_SQL.split())};")
+        else:
+            print("Creating unique index on (name, address)...")
+            try:
+                create_unique_index(conn)
+            except psycopg2.Error as e:
+                print(f"⚠️  Could not create the unique index: {e}")
+            on_conflict = has_unique_index(conn)
+            if on_conflict:
+                print("✅ Unique index ready; inserts use ON CONFLICT DO NOTHING")
+
+    # Per-state/PIN counts are kept in facility_summary, updated with every insert batch
+    if ensure_summary(conn):
+        print("Built facility_summary from the existing facilities")
+    writer = FacilityBatchWriter(
+        conn, on_conflict=on_conflict,
+        on_commit=lambda: checkpoint.flush(failed_ids=writer.failed_ids),
+        metrics=metrics, summary=True,
+    )
+    print(f"Batch size: {writer.batch_size}, committing every {writer.commit_every} rows\n")
+
+    if args.prefetch:
+        jobs = collect_geocode_jobs(name_col, address_col, state_col, email_col, dedup.keys, done_rows)
+        with metrics.timer("stage_seconds", stage="prefetch"):
+            totals = prefetch(jobs, args.prefetch, cache_path=geocode_cache.path, threads=scheduler.workers,
+                              planner_path=planner.path, pincode_index=pincode_index)
+        print(f"Prefetch: {totals['found']}/{totals['jobs']} found, {totals['calls']} geocoder calls, "
+              f"{totals['seconds']:.1f}s\n")
+        # The worker processes wrote to the cache file directly; reopen so size/eviction count their entries
+        cache_path = geocode_cache.path
+        geocode_cache.close()
+        geocode_cache = GeocodeCache(cache_path)
+        scheduler.cache = geocode_cache
+        scheduler.cache_only = True
+        planner.load()  # pick up what the worker processes learned
+
+    run = MigrationRun(INPUT_FILE, (name_col, address_col, state_col, email_col), scheduler, writer, dedup,
+                       checkpoint, metrics, fuzzy=fuzzy, fuzzy_report=fuzzy_report, done_rows=done_rows)
+    stats = run.stats
+    pipeline = run.build_pipeline()
+    print(f"Pipeline: {NORMALIZE_WORKERS} normalizer(s), {scheduler.workers} geocoder(s), "
+          f"queue size {pipeline.queue_size}\n")
+
+    started = time.perf_counter()
+    run.run(pipeline)
+    writer.close()
+    if writer.stats['written']:
+        # Cached admin list snapshots (facility_cache.py) reload on the next check
+        with conn.cursor() as cursor:
+            bump_version(cursor)
+        conn.commit()
+    metrics.observe("stage_seconds", time.perf_counter() - started, stage="pipeline")
+    stats['imported'] = writer.stats['written']
+    stats['insert_failed'] = writer.stats['failed']
+    stats['duplicates'] += writer.stats['conflicts']
+    checkpoint.close()
+    geocode_cache.close()
+    pincode_index.save()
+    planner.save()
+    if fuzzy_report is not None:
+        fuzzy_report.close()
 
     print("\n" + "="*60)
     print("MIGRATION SUMMARY")
     print("="*60)
     print(f"Total rows:        {stats['total']}")
     print(f"Imported:          {stats['imported']}")
+    print(f"Insert Failed:     {stats['insert_failed']}")
     print(f"Duplicates:        {stats['duplicates']}")
+    print(f"Near-duplicates:   {stats['near_duplicates']} ({fuzzy_dedup.MODE})")
     print(f"Geocoding Failed:  {stats['failed_geocode']}")
+    print(f"Retried:           {stats['retried']} ({stats['recovered']} recovered)")
     print(f"Skipped:           {stats['skipped']}")
+    print(f"Resumed (skipped): {stats['resumed']}")
+    print(f"Cache hits:        {geocode_cache.stats['hits']} "
+          f"({geocode_cache.stats['negative_hits']} negative)")
+    print(f"Cache misses:      {geocode_cache.stats['misses']}")
+    print(f"Cache hit rate:    {geocode_cache.hit_rate():.1f}%")
+    print(f"PIN index hits:    {pincode_index.stats['hits']} "
+          f"(+{pincode_index.learned} centroids learned)")
+    scheduler.print_stats()
+    planner.print_stats()
+    writer.print_timings()
+    pipeline.print_stats()
+    metrics.print_summary()
     print("="*60)
+    metrics.event("finished", **stats)
+    metrics.close()
+    if fuzzy_report is not None and fuzzy_report.count:
+        print(f"\n🔎 Near-duplicates for review: {fuzzy_report.path}")
     print("\n✅ Migration Finished!")
 
+def main():
+    args = parse_args()
+    print("🚀 Starting Direct XLSX -> PostgreSQL Migration")
+    
+    if not os.path.exists(INPUT_FILE):
+        print(f"❌ Error: Input file not found: {INPUT_FILE}")
+        return
+
+    if fuzzy_dedup.MODE not in fuzzy_dedup.MODES:
+        print(f"❌ Error: FUZZY_DEDUP_MODE must be one of {', '.join(fuzzy_dedup.MODES)}")
+        return
+
+    # Database connection
+    if not os.getenv("DATABASE_URL"):
+        print("❌ Error: DATABASE_URL not found in environment")
+        return
+
+    print("Connecting to database...")
+    try:
+        get_pool()  # opens the pool's first connection, so a bad DATABASE_URL fails here
+        print("✅ Connected to database\n")
+    except Exception as e:
+        print(f"❌ Database connection failed: {e}")
+        return
+
+    try:
+        with pooled_connection() as conn:
+            migrate(conn, args)
+    finally:
+        close_pool()
+
 if __name__ == "__main__":
     main()
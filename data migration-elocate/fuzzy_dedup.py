@@ -0,0 +1,284 @@
+"""
+Blocking-based fuzzy duplicate detection for facility names and addresses.
+
+The exact (name, address) check in facility_dedup.py misses re-imports that
+differ only in casing, whitespace, punctuation or "Pvt Ltd" vs "Private
+Limited". Here every facility is reduced to token sets and only compared
+with facilities in the same block (same PIN code, or same state when
+there is no PIN), and inside a block only with facilities sharing a name
+token. The pair score is
+
+    0.6 * name similarity + 0.4 * address similarity
+
+where name similarity is a token-set overlap (a name that is a subset of
+the other scores 1.0) and address similarity is the Jaccard index of the
+address tokens. Pairs scoring >= FUZZY_DEDUP_THRESHOLD are near-duplicates,
+unless both addresses carry house/plot numbers and none of them agree
+(neighbours on one industrial estate share every other token).
+
+    python fuzzy_dedup.py scan                       # near-duplicates already in the DB
+    python fuzzy_dedup.py sheet path/to/list.xlsx    # near-duplicates inside a sheet
+"""
+import os
+import re
+import csv
+import time
+import argparse
+from collections import defaultdict
+from functools import lru_cache
+
+if __name__ == "__main__":
+    # Run as a script: load .env before the settings below (and the local imports') are read
+    from dotenv import load_dotenv
+    load_dotenv()
+
+from normalize import PINCODE_RE
+
+THRESHOLD = float(os.getenv("FUZZY_DEDUP_THRESHOLD", "0.85"))
+# off: exact check only, flag: insert but report, skip: treat as a duplicate
+MODE = os.getenv("FUZZY_DEDUP_MODE", "flag")
+REPORT_FILE = os.getenv(
+    "FUZZY_DEDUP_REPORT",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "fuzzy_duplicates.csv")
+)
+MODES = ("off", "flag", "skip")
+MAX_POSTING = 500  # name tokens shared by more facilities than this in a block are ignored
+
+NAME_WEIGHT = 0.6
+ADDRESS_WEIGHT = 0.4
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+# Spelling variants collapse to one token; legal suffixes and filler words are dropped
+_SYNONYMS = {
+    'pvt': 'private', 'ltd': 'limited', 'co': 'company', 'corp': 'corporation',
+    'inds': 'industries', 'ind': 'industries', 'rd': 'road', 'st': 'street',
+    'no': '', 'plot': '', 'near': '', 'opp': '', 'm': '', 's': '',
+}
+_NAME_STOPWORDS = {'private', 'limited', 'llp', 'company', 'the', 'and', 'of', 'm', 's', 'ms'}
+_ADDRESS_STOPWORDS = {'india', 'the', 'and', 'of', 'at', 'post', 'dist', 'district', 'taluk', 'tq'}
+
+
+def _tokens(text, stopwords):
+    if not text:
+        return frozenset()
+    result = set()
+    for token in _TOKEN_RE.findall(str(text).lower()):
+        token = _SYNONYMS.get(token, token)
+        if token and token not in stopwords:
+            result.add(token)
+    return frozenset(result)
+
+
+@lru_cache(maxsize=200000)
+def name_tokens(name):
+    return _tokens(name, _NAME_STOPWORDS)
+
+
+@lru_cache(maxsize=200000)
+def address_tokens(address):
+    # The PIN code is the block key already; leaving it in would inflate every score
+    return _tokens(PINCODE_RE.sub(' ', str(address or '')), _ADDRESS_STOPWORDS)
+
+
+def token_set_similarity(a, b):
+    """|A & B| / min(|A|, |B|): 1.0 when one side is a subset of the other"""
+    if not a or not b:
+        return 0.0
+    if min(len(a), len(b)) == 1:
+        return len(a & b) / len(a | b)  # one-word names are too weak for subset matching
+    return len(a & b) / min(len(a), len(b))
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def numbers_conflict(a, b):
+    """Both addresses have plot/door numbers and they have none in common"""
+    numbers_a = {t for t in a if t.isdigit()}
+    numbers_b = {t for t in b if t.isdigit()}
+    return bool(numbers_a and numbers_b and not numbers_a & numbers_b)
+
+
+def block_key(state, pincode):
+    """Facilities are only compared within a block"""
+    if pincode:
+        return ("pin", str(pincode))
+    return ("state", (state or "").strip().upper())
+
+
+class FuzzyDuplicateIndex:
+    """Incremental near-duplicate index: find() / add() per facility"""
+
+    def __init__(self, threshold=THRESHOLD):
+        self.threshold = threshold
+        # block -> {'items': [(key, name, name_tokens, address_tokens)], 'postings': token -> [item index]}
+        self.blocks = defaultdict(lambda: {'items': [], 'postings': defaultdict(list)})
+        self.size = 0
+        self.stats = {'lookups': 0, 'comparisons': 0, 'matches': 0}
+
+    def __len__(self):
+        return self.size
+
+    @classmethod
+    def from_db(cls, conn, threshold=THRESHOLD, fetch_size=10000):
+        """Seed with every facility in the database (one streamed query)"""
+        index = cls(threshold)
+        with conn.cursor(name="fuzzy_dedup_facilities") as cursor:
+            cursor.itersize = fetch_size
+            cursor.execute("SELECT id::text, name, address, state, pincode FROM recycling_facility")
+            for facility_id, name, address, state, pincode in cursor:
+                if not pincode and address:
+                    match = PINCODE_RE.search(address)
+                    pincode = match.group(1) if match else None
+                index.add(facility_id, name, address, state, pincode)
+        return index
+
+    def add(self, key, name, address, state, pincode):
+        block = self.blocks[block_key(state, pincode)]
+        position = len(block['items'])
+        names = name_tokens(name)
+        block['items'].append((key, name, names, address_tokens(address)))
+        for token in names:
+            block['postings'][token].append(position)
+        self.size += 1
+
+    def find(self, name, address, state, pincode):
+        """Best match as (key, matched_name, score), or None below the threshold"""
+        self.stats['lookups'] += 1
+        block = self.blocks.get(block_key(state, pincode))
+        if not block:
+            return None
+        names = name_tokens(name)
+        addresses = address_tokens(address)
+
+        candidates = set()
+        for token in names:
+            posting = block['postings'].get(token)
+            if posting and len(posting) <= MAX_POSTING:
+                candidates.update(posting)
+
+        best = None
+        for position in candidates:
+            key, other_name, other_names, other_addresses = block['items'][position]
+            self.stats['comparisons'] += 1
+            if numbers_conflict(addresses, other_addresses):
+                continue
+            score = (NAME_WEIGHT * token_set_similarity(names, other_names)
+                     + ADDRESS_WEIGHT * jaccard(addresses, other_addresses))
+            if score >= self.threshold and (best is None or score > best[2]):
+                best = (key, other_name, score)
+        if best:
+            self.stats['matches'] += 1
+        return best
+
+    def check(self, key, name, address, state, pincode):
+        """find() then add(); returns the match (if any)"""
+        match = self.find(name, address, state, pincode)
+        self.add(key, name, address, state, pincode)
+        return match
+
+
+class FuzzyReport:
+    """CSV of flagged near-duplicate pairs for manual review"""
+
+    COLUMNS = ['row', 'name', 'address', 'state', 'pincode', 'matched_key', 'matched_name', 'score']
+
+    def __init__(self, path=REPORT_FILE):
+        self.path = path
+        self.count = 0
+        self.file = open(path, "w", encoding="utf-8", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(self.COLUMNS)
+
+    def add(self, row, name, address, state, pincode, match):
+        matched_key, matched_name, score = match
+        self.writer.writerow([row, name, address, state, pincode, matched_key, matched_name, f"{score:.3f}"])
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+
+
+def scan_rows(rows, threshold=THRESHOLD, report=None):
+    """Find near-duplicates among (key, name, address, state, pincode) rows"""
+    index = FuzzyDuplicateIndex(threshold)
+    pairs = 0
+    for key, name, address, state, pincode in rows:
+        match = index.check(key, name, address, state, pincode)
+        if match:
+            pairs += 1
+            if report:
+                report.add(key, name, address, state, pincode, match)
+    return index, pairs
+
+
+def _sheet_rows(path):
+    from xlsx_reader import read_columns, iter_chunks, find_column
+    from normalize import (
+        normalize_frame, iter_normalized,
+        NAME_COLUMNS, ADDRESS_COLUMNS, STATE_COLUMNS,
+    )
+    columns = read_columns(path)
+    cols = (find_column(columns, NAME_COLUMNS), find_column(columns, ADDRESS_COLUMNS),
+            find_column(columns, STATE_COLUMNS))
+    rows = []
+    for chunk in iter_chunks(path):
+        for index, name, address, state, _, _, pincode in iter_normalized(normalize_frame(chunk, *cols)):
+            if address:
+                rows.append((f"row {index}", name, address, state, pincode))
+    return rows
+
+
+def _db_rows():
+    from db import connect
+    print("Connecting to database...")
+    conn = connect()
+    with conn.cursor(name="fuzzy_dedup_scan") as cursor:
+        cursor.itersize = 10000
+        cursor.execute("SELECT id::text, name, address, state, pincode FROM recycling_facility ORDER BY created_at")
+        rows = list(cursor)
+    conn.close()
+    return rows
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Find near-duplicate facilities")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--report", default=REPORT_FILE, help="CSV of flagged pairs")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("scan", help="facilities already in the database")
+    sheet = sub.add_parser("sheet", help="rows of a registration list")
+    sheet.add_argument("path")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    started = time.perf_counter()
+    rows = _db_rows() if args.command == "scan" else _sheet_rows(args.path)
+    load_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    report = FuzzyReport(args.report)
+    index, pairs = scan_rows(rows, args.threshold, report)
+    report.close()
+    scan_time = time.perf_counter() - started
+
+    print("\n" + "="*60)
+    print("FUZZY DUPLICATE SCAN")
+    print("="*60)
+    print(f"Facilities:        {len(rows)} ({len(index.blocks)} blocks)")
+    print(f"Near-duplicates:   {pairs} (threshold {args.threshold:.2f})")
+    print(f"Comparisons:       {index.stats['comparisons']} "
+          f"({index.stats['comparisons'] / max(1, len(rows)):.1f} per facility)")
+    print(f"Load time:         {load_time:.2f}s")
+    print(f"Scan time:         {scan_time:.2f}s ({len(rows) / scan_time if scan_time else 0:.0f} rows/s)")
+    print("="*60)
+    print(f"\n✅ Report saved to: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
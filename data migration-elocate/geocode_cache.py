@@ -0,0 +1,156 @@
+"""
+Persistent on-disk geocode cache shared by the migration scripts.
+
+Results are stored in a local SQLite file keyed on the normalized query
+string, so a repeat migration only hits Nominatim for addresses it has
+never seen. Negative results (no match) are cached too, but expire after
+a TTL so that they get retried on a later run.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# Defaults (override through .env; entry points load it before importing this module)
+CACHE_FILE = os.getenv(
+    "GEOCODE_CACHE_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "geocode_cache.sqlite")
+)
+NEGATIVE_TTL = int(os.getenv("GEOCODE_NEGATIVE_TTL", str(7 * 24 * 3600)))  # 7 days
+MAX_ENTRIES = int(os.getenv("GEOCODE_CACHE_MAX_ENTRIES", "0"))  # 0 = unbounded
+EVICTION = os.getenv("GEOCODE_CACHE_EVICTION", "lru")
+
+# none: never evict, lru: drop least recently used, fifo: drop oldest inserted
+EVICTION_POLICIES = {"none": None, "lru": "last_used", "fifo": "created_at"}
+
+
+def normalize_query(query):
+    """Normalize a geocoding query so equivalent strings share one cache key"""
+    text = re.sub(r'\s+', ' ', str(query).strip().lower())
+    text = re.sub(r'\s*,\s*', ',', text)
+    text = re.sub(r',+', ',', text).strip(',')
+    return text.replace(',', ', ')
+
+
+class GeocodeCache:
+    """SQLite backed cache of query -> (latitude, longitude)"""
+
+    def __init__(self, path=CACHE_FILE, negative_ttl=NEGATIVE_TTL,
+                 max_entries=MAX_ENTRIES, eviction=EVICTION):
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError(
+                f"Unknown eviction policy '{eviction}' "
+                f"(expected one of: {', '.join(EVICTION_POLICIES)})"
+            )
+        self.path = path
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.eviction = eviction
+        self.stats = {'hits': 0, 'misses': 0, 'negative_hits': 0, 'expired': 0, 'evicted': 0}
+
+        # One connection shared by the geocoding worker threads, guarded by a lock
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS geocode_cache (
+                query      TEXT PRIMARY KEY,
+                latitude   REAL,
+                longitude  REAL,
+                found      INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used  REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+        self._size = self.conn.execute("SELECT COUNT(*) FROM geocode_cache").fetchone()[0]
+
+    def lookup(self, query):
+        """
+        Returns (hit, latitude, longitude).
+        A cached negative result is a hit with latitude/longitude set to None.
+        """
+        key = normalize_query(query)
+        with self.lock:
+            return self._lookup(key)
+
+    def _lookup(self, key):
+        row = self.conn.execute(
+            "SELECT latitude, longitude, found, created_at FROM geocode_cache WHERE query = ?",
+            (key,)
+        ).fetchone()
+        now = time.time()
+
+        if row is None:
+            self.stats['misses'] += 1
+            return False, None, None
+
+        lat, lon, found, created_at = row
+        if not found and now - created_at > self.negative_ttl:
+            self.conn.execute("DELETE FROM geocode_cache WHERE query = ?", (key,))
+            self.conn.commit()
+            self._size -= 1
+            self.stats['expired'] += 1
+            self.stats['misses'] += 1
+            return False, None, None
+
+        if self.eviction == "lru":
+            self.conn.execute("UPDATE geocode_cache SET last_used = ? WHERE query = ?", (now, key))
+            self.conn.commit()
+
+        self.stats['hits'] += 1
+        if not found:
+            self.stats['negative_hits'] += 1
+        return True, lat, lon
+
+    def store(self, query, latitude, longitude):
+        """Store a geocoding result; pass None coordinates to record a negative result"""
+        key = normalize_query(query)
+        with self.lock:
+            self._store(key, latitude, longitude)
+
+    def _store(self, key, latitude, longitude):
+        now = time.time()
+        found = 1 if latitude is not None and longitude is not None else 0
+        existed = self.conn.execute(
+            "SELECT 1 FROM geocode_cache WHERE query = ?", (key,)
+        ).fetchone() is not None
+        self.conn.execute(
+            """
+            INSERT OR REPLACE INTO geocode_cache
+                (query, latitude, longitude, found, created_at, last_used)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (key, latitude, longitude, found, now, now)
+        )
+        self.conn.commit()
+        if not existed:
+            self._size += 1
+        self._evict()
+
+    def _evict(self):
+        order_col = EVICTION_POLICIES[self.eviction]
+        if not order_col or not self.max_entries or self._size <= self.max_entries:
+            return
+        excess = self._size - self.max_entries
+        self.conn.execute(
+            f"""
+            DELETE FROM geocode_cache WHERE query IN (
+                SELECT query FROM geocode_cache ORDER BY {order_col} ASC LIMIT ?
+            )
+            """,
+            (excess,)
+        )
+        self.conn.commit()
+        self._size -= excess
+        self.stats['evicted'] += excess
+
+    def hit_rate(self):
+        lookups = self.stats['hits'] + self.stats['misses']
+        return (self.stats['hits'] / lookups * 100) if lookups else 0.0
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,105 @@
+"""
+Multi-process geocode prefetch.
+
+Before the write phase, the distinct (address, state, pincode) jobs of a
+sheet are sharded by state and resolved by a ProcessPoolExecutor. Every
+worker process runs its own GeocodeScheduler (threads + token buckets)
+and writes into the shared SQLite geocode cache, so the migration's write
+phase afterwards only reads from the cache.
+
+Provider rate limits are split evenly between the processes, so a public
+Nominatim at 1 req/s is still hit at 1 req/s in total; the speed-up comes
+from self-hosted Nominatim / offline gazetteer backends and from parsing
+on every core. Jobs whose PIN code is already in the PIN centroid index
+are dropped up front: the write phase answers them from the index, so
+prefetching them would only spend the shared request quota.
+
+GEOCODE_PREFETCH_PROCESSES sets the default process count (CPU count).
+"""
+import os
+import time
+import math
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from geocode_cache import GeocodeCache, CACHE_FILE
+from geocode_scheduler import GeocodeScheduler, parse_providers, PROVIDERS, WORKERS
+from strategy_planner import StrategyPlanner
+
+PROCESSES = int(os.getenv("GEOCODE_PREFETCH_PROCESSES", str(os.cpu_count() or 1)))
+SHARDS_PER_PROCESS = 4  # big states are split so no single shard finishes last
+
+
+def shard_by_state(jobs, processes=PROCESSES):
+    """
+    Group distinct jobs by state; states larger than the target shard size
+    are split into several shards. Returns [(shard_name, jobs)], largest first.
+    """
+    by_state = defaultdict(list)
+    for job in dict.fromkeys(jobs):  # distinct, order kept
+        by_state[job[1] or "UNKNOWN"].append(job)
+
+    total = sum(len(v) for v in by_state.values())
+    target = max(1, math.ceil(total / (max(1, processes) * SHARDS_PER_PROCESS)))
+    shards = []
+    for state, state_jobs in by_state.items():
+        parts = math.ceil(len(state_jobs) / target)
+        for i in range(parts):
+            name = state if parts == 1 else f"{state} #{i + 1}"
+            shards.append((name, state_jobs[i * target:(i + 1) * target]))
+    shards.sort(key=lambda shard: len(shard[1]), reverse=True)
+    return shards
+
+
+def _prefetch_shard(name, jobs, spec, cache_path, threads, rate_share, planner_path):
+    """Runs in a worker process: resolve one shard into the shared cache"""
+    started = time.perf_counter()
+    # No eviction here; the parent process owns the cache size limit
+    cache = GeocodeCache(cache_path, max_entries=0)
+    planner = StrategyPlanner(planner_path) if planner_path else None
+    scheduler = GeocodeScheduler(providers=parse_providers(spec, rate_share), workers=threads, cache=cache,
+                                 planner=planner)
+    found = sum(1 for lat, lon, _ in scheduler.resolve_all(jobs) if lat is not None and lon is not None)
+    cache.close()
+    if planner is not None:
+        planner.save()  # counts are added to the shared file
+    return {
+        'shard': name,
+        'jobs': len(jobs),
+        'found': found,
+        'calls': scheduler.stats['network_calls'],
+        'cache_hits': cache.stats['hits'],
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def prefetch(jobs, processes=PROCESSES, spec=PROVIDERS, cache_path=CACHE_FILE, threads=WORKERS,
+             planner_path=None, pincode_index=None):
+    """Resolve (address, state, pincode) jobs into the cache with a process pool; returns totals"""
+    indexed = 0
+    if pincode_index is not None:
+        pending = [job for job in jobs if job[2] not in pincode_index]
+        indexed = len(jobs) - len(pending)
+        jobs = pending
+    shards = shard_by_state(jobs, processes)
+    processes = max(1, min(processes, len(shards)))
+    totals = {'shards': len(shards), 'jobs': 0, 'found': 0, 'calls': 0, 'cache_hits': 0,
+              'pin_indexed': indexed, 'processes': processes, 'seconds': 0.0}
+    if not shards:
+        return totals
+
+    print(f"Prefetching {sum(len(s) for _, s in shards)} distinct addresses in {len(shards)} shards "
+          f"with {processes} processes x {threads} threads ({indexed} left to the PIN index)")
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [
+            pool.submit(_prefetch_shard, name, shard, spec, cache_path, threads, 1.0 / processes, planner_path)
+            for name, shard in shards
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            for key in ('jobs', 'found', 'calls', 'cache_hits'):
+                totals[key] += result[key]
+            print(f"  ✅ {result['shard'][:30]:30} {result['found']:6}/{result['jobs']:<6} found "
+                  f"({result['calls']} calls) in {result['seconds']:.1f}s")
+    totals['seconds'] = time.perf_counter() - started
+    return totals
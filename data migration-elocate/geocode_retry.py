@@ -0,0 +1,132 @@
+"""
+Retry policy and circuit breaker for geocoding calls.
+
+A provider answering "no result" and a provider failing are different
+things: the first is cached as a negative result, the second (timeouts,
+HTTP 429/502-504, connection errors) is retried with exponential backoff and
+full jitter, and never cached. Rows that still fail after GEOCODE_RETRIES
+attempts are reported with the RETRY source so the migration can queue
+them for a second pass at the end.
+
+Each provider (endpoint) has a circuit breaker: after
+GEOCODE_BREAKER_THRESHOLD consecutive transient failures it opens and
+requests are routed to the other providers. Once GEOCODE_BREAKER_COOLDOWN
+seconds have passed, a single probe request decides whether to close it
+again. A degraded endpoint is left alone instead of being hit at full
+rate, and the healthy ones keep working. When every provider's circuit is
+open, the query is deferred (RETRY) instead of waiting for the cooldown.
+"""
+import os
+import random
+import socket
+import threading
+import time
+
+try:
+    from geopy import exc as geopy_exc
+except ImportError:  # offline gazetteer setups don't need geopy
+    geopy_exc = None
+
+RETRIES = int(os.getenv("GEOCODE_RETRIES", "3"))
+BACKOFF_BASE = float(os.getenv("GEOCODE_BACKOFF_BASE", "1.0"))
+BACKOFF_MAX = float(os.getenv("GEOCODE_BACKOFF_MAX", "30"))
+BREAKER_THRESHOLD = int(os.getenv("GEOCODE_BREAKER_THRESHOLD", "5"))
+BREAKER_COOLDOWN = float(os.getenv("GEOCODE_BREAKER_COOLDOWN", "30"))
+BREAKER_PROBES = int(os.getenv("GEOCODE_BREAKER_PROBES", "3"))  # failed probes in a row = provider is down
+
+# Source reported by GeocodeScheduler.resolve() for rows that only failed transiently
+RETRY = "RETRY"
+
+
+class TransientGeocodeError(Exception):
+    """The provider could not answer right now; the query may succeed later"""
+
+
+def is_transient(error):
+    """True for errors worth retrying (rate limits, timeouts, outages)"""
+    if isinstance(error, (TransientGeocodeError, ConnectionError, TimeoutError, socket.timeout)):
+        return True
+    # Everything else (bad credentials, quota, malformed queries, parse errors, other
+    # OSErrors such as a missing file) won't fix itself by asking again
+    return geopy_exc is not None and isinstance(
+        error, (geopy_exc.GeocoderTimedOut, geopy_exc.GeocoderUnavailable, geopy_exc.GeocoderRateLimited))
+
+
+def retry_after(error):
+    """Seconds the server asked us to wait (HTTP Retry-After), if any"""
+    value = getattr(error, "retry_after", None)
+    try:
+        return float(value) if value is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """Full-jitter exponential backoff: uniform(0, min(cap, base * 2**attempt))"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """closed -> open (after `threshold` consecutive failures) -> half-open probe -> closed"""
+
+    def __init__(self, name, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.name = name
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.failed_probes = 0  # consecutive half-open probes that failed
+        self.lock = threading.Lock()
+        self.stats = {'opened': 0, 'rejected': 0}
+
+    @property
+    def closed(self):
+        return self.state == "closed"
+
+    @property
+    def down(self):
+        """Open and the last BREAKER_PROBES probes failed: not worth waiting for"""
+        return self.state == "open" and self.failed_probes >= BREAKER_PROBES
+
+    def try_probe(self):
+        """
+        For an open breaker: True if the cooldown is over and this caller
+        becomes the half-open probe; False (request rejected) otherwise
+        """
+        with self.lock:
+            if self.state == "open" and time.monotonic() >= self.opened_at + self.cooldown:
+                self.state = "half_open"
+                return True
+            self.stats['rejected'] += 1
+            return False
+
+    def retry_in(self):
+        """Seconds until an open breaker lets a probe through (a short poll while probing)"""
+        with self.lock:
+            if self.state == "closed":
+                return 0.0
+            if self.state == "half_open":
+                return 0.5
+            return max(0.0, self.opened_at + self.cooldown - time.monotonic())
+
+    def record_success(self):
+        """The provider answered (a result or a definite "not found")"""
+        with self.lock:
+            self.failures = 0
+            self.failed_probes = 0
+            if self.state != "closed":
+                self.state = "closed"
+                print(f"✅ {self.name}: geocoder healthy again, resuming")
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == "half_open":
+                self.failed_probes += 1
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.threshold):
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self.stats['opened'] += 1
+                print(f"⚠️ {self.name}: {self.failures} consecutive geocoder errors, "
+                      f"routing around it for {self.cooldown:g}s")
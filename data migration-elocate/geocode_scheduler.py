@@ -0,0 +1,300 @@
+"""
+Concurrent geocoding stage with a shared token-bucket rate limiter.
+
+Addresses are resolved by a thread pool; every network call first takes a
+token from its provider's bucket, so throughput is bounded by the allowed
+request rate instead of latency plus a fixed sleep. Several providers can
+be configured (e.g. public Nominatim at 1 req/s plus a self-hosted
+Nominatim container at 50 req/s) and requests go to whichever has a token.
+
+GEOCODE_PROVIDERS is a comma separated list of backend specs (geocoders.py):
+    GEOCODE_PROVIDERS="https://nominatim.openstreetmap.org|1,http://localhost:8080|50"
+    GEOCODE_PROVIDERS="gazetteer:all_india_pincode.csv"   # fully offline
+
+Transient provider errors are retried with backoff behind a per-provider
+circuit breaker (geocode_retry.py); providers with an open circuit are
+routed around. With a StrategyPlanner the strategies are tried
+likeliest-first per state and address shape (strategy_planner.py).
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from geocoders import build_geocoder
+from strategy_planner import address_shape
+from geocode_retry import (
+    CircuitBreaker, TransientGeocodeError, is_transient, retry_after, backoff_delay, RETRIES, RETRY,
+)
+
+PROVIDERS = os.getenv("GEOCODE_PROVIDERS", "https://nominatim.openstreetmap.org|1")
+WORKERS = int(os.getenv("GEOCODE_WORKERS", "4"))
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `burst` stored"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def try_acquire(self):
+        """Take a token if available; returns 0 on success or seconds until the next token"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return
+            time.sleep(wait)
+
+
+class Provider:
+    """A geocoding backend (see geocoders.py) plus its rate limiter"""
+
+    def __init__(self, geocoder, burst=1, rate_share=1.0):
+        self.geocoder = geocoder
+        self.name = geocoder.name
+        # rate_share < 1 when several processes split one provider's rate limit
+        self.rate = geocoder.rate * rate_share if geocoder.rate else None
+        self.bucket = TokenBucket(self.rate, burst) if self.rate else None
+        self.breaker = CircuitBreaker(self.name)
+        self.requests = 0
+
+    def try_acquire(self):
+        return self.bucket.try_acquire() if self.bucket else 0.0
+
+    def acquire(self):
+        if self.bucket:
+            self.bucket.acquire()
+
+    def describe(self):
+        return f"{self.name} ({f'{self.rate:g}/s' if self.rate else 'unlimited'})"
+
+    def geocode(self, query):
+        return self.geocoder.geocode(query)
+
+
+def parse_providers(spec=PROVIDERS, rate_share=1.0):
+    """Parse the GEOCODE_PROVIDERS string into Provider objects"""
+    providers = [Provider(build_geocoder(entry), rate_share=rate_share)
+                 for entry in spec.split(',') if entry.strip()]
+    if not providers:
+        raise ValueError("GEOCODE_PROVIDERS is empty")
+    return providers
+
+
+class GeocodeScheduler:
+    """Resolves addresses concurrently behind per-provider token buckets"""
+
+    def __init__(self, providers=None, workers=WORKERS, cache=None, pincode_index=None, metrics=None,
+                 retries=RETRIES, planner=None):
+        self.providers = providers or parse_providers()
+        self.workers = max(1, workers)
+        self.cache = cache
+        self.pincode_index = pincode_index
+        self.metrics = metrics  # optional metrics.Metrics
+        self.planner = planner  # optional strategy_planner.StrategyPlanner
+        self.cache_only = False  # set after a prefetch: cache misses are queued for retry instead of fetched
+        # Set for the deferred retry pass: wait out an open circuit instead of deferring right away
+        self.wait_for_breakers = False
+        self.retries = max(0, retries)
+        self.stats = {'network_calls': 0, 'rate_limit_wait': 0.0, 'transient_errors': 0, 'backoff_wait': 0.0,
+                      'breaker_wait': 0.0, 'deferred': 0}
+        self.stats_lock = threading.Lock()
+
+    def _next_provider(self, may_wait=False):
+        """
+        Block until some provider with a closed circuit has a token; prefer the
+        first listed. Open providers are skipped until their cooldown is over,
+        then one caller probes them. When every circuit is open the query is
+        deferred (TransientGeocodeError); with may_wait it waits for a probe
+        first, unless every provider has failed its last few probes.
+        """
+        while True:
+            waits = []
+            for provider in self.providers:
+                if not provider.breaker.closed:
+                    if provider.breaker.try_probe():
+                        # This caller tests the provider; wait for its token rather than give the probe up
+                        provider.acquire()
+                        return provider
+                    continue
+                wait = provider.try_acquire()
+                if not wait:
+                    return provider
+                waits.append(wait)
+            if not waits:
+                self._wait_for_breakers(may_wait)
+                continue
+            wait = min(waits)
+            with self.stats_lock:
+                self.stats['rate_limit_wait'] += wait
+            if self.metrics is not None:
+                self.metrics.observe("rate_limit_wait_seconds", wait)
+            time.sleep(wait)
+
+    def _wait_for_breakers(self, may_wait):
+        """Every provider's circuit is open: sleep until one can be probed, or defer the query"""
+        if not may_wait or all(p.breaker.down for p in self.providers):
+            with self.stats_lock:
+                self.stats['deferred'] += 1
+            raise TransientGeocodeError("every geocoding provider is unavailable (circuit open)")
+        wait = max(0.05, min(p.breaker.retry_in() for p in self.providers))
+        with self.stats_lock:
+            self.stats['breaker_wait'] += wait
+        if self.metrics is not None:
+            self.metrics.observe("breaker_pause_seconds", wait)
+        time.sleep(wait)
+
+    def _has_healthy_alternative(self, provider):
+        return any(other is not provider and other.breaker.closed for other in self.providers)
+
+    def geocode_query(self, query):
+        """
+        Geocode one query string: cache first, then a rate-limited provider.
+        Returns (lat, lon, cached); raises TransientGeocodeError once the
+        retries are used up.
+        """
+        if self.cache:
+            hit, lat, lon = self.cache.lookup(query)
+            if self.metrics is not None:
+                self.metrics.count("geocode_cache", result="hit" if hit else "miss")
+            if hit:
+                return lat, lon, True
+            if self.cache_only:
+                # Negative results are cached too, so a miss means the prefetch hit an error
+                # or never needed this query (resolve() then moves on to the next strategy)
+                raise TransientGeocodeError(f"not resolved by the prefetch: {query}")
+
+        for attempt in range(self.retries + 1):
+            provider = self._next_provider(may_wait=self.wait_for_breakers)
+            with self.stats_lock:
+                self.stats['network_calls'] += 1
+                provider.requests += 1
+            try:
+                if self.metrics is not None:
+                    with self.metrics.timer("geocoder_request_seconds", provider=provider.name):
+                        lat, lon = provider.geocode(query)
+                else:
+                    lat, lon = provider.geocode(query)
+            except Exception as e:
+                if not is_transient(e):
+                    provider.breaker.record_success()  # the provider answered; the query is the problem
+                    raise
+                provider.breaker.record_failure()
+                with self.stats_lock:
+                    self.stats['transient_errors'] += 1
+                if self.metrics is not None:
+                    self.metrics.count("geocoder_errors", provider=provider.name, error=type(e).__name__)
+                if attempt == self.retries:
+                    raise TransientGeocodeError(f"{provider.name}: {e}") from e
+                if not provider.breaker.closed and self._has_healthy_alternative(provider):
+                    continue  # this endpoint is now routed around; another one takes the retry right away
+                delay = max(retry_after(e), backoff_delay(attempt))
+                with self.stats_lock:
+                    self.stats['backoff_wait'] += delay
+                time.sleep(delay)
+                continue
+
+            provider.breaker.record_success()
+            # Only real answers are cached; a transient failure must not become a negative entry
+            if self.cache:
+                self.cache.store(query, lat, lon)
+            return lat, lon, False
+
+    def resolve(self, address, state, pincode=None):
+        """
+        Smart geocoding priority for Indian addresses; returns (lat, lon, source).
+        source is "FAILED" when nothing was found and RETRY as soon as a
+        strategy runs out of retries on provider errors: the row goes to the
+        deferred retry pass instead of falling through to a less precise
+        strategy than a healthy run would have used. In cache_only mode a
+        strategy the prefetch didn't query is skipped instead; the row is
+        RETRY only if no strategy found an answer and one of them wasn't cached.
+        """
+        # PIN centroids are shared by every facility in the PIN; no network needed
+        if self.pincode_index is not None:
+            started = time.perf_counter()
+            centroid = self.pincode_index.get(pincode)
+            if centroid:
+                self._observe("PIN_INDEX", "hit", started)
+                return centroid[0], centroid[1], "PIN_INDEX"
+
+        strategies = [
+            ("PIN", f"{pincode}, {state}, India" if pincode else None),
+            ("FULL_ADDRESS", f"{address}, {state}, India"),
+        ]
+        shape = None
+        # After a prefetch the planner already learned from these rows; only replay its plan
+        learning = self.planner is not None and not self.cache_only
+        if self.planner is not None:
+            shape = address_shape(address)
+            strategies = self.planner.plan(strategies, state, shape, explore=learning)
+
+        uncached = False
+        for strategy_name, query in strategies:
+            if not query:
+                continue
+            started = time.perf_counter()
+            try:
+                lat, lon, cached = self.geocode_query(query)
+                # Cache hits replay an answer the planner already counted
+                if learning and not cached:
+                    self.planner.record(strategy_name, state, shape, lat is not None and lon is not None)
+                if lat is not None and lon is not None:
+                    self._observe(strategy_name, "hit", started)
+                    if strategy_name == "PIN" and self.pincode_index is not None:
+                        self.pincode_index.add(pincode, lat, lon)
+                    return lat, lon, strategy_name
+                self._observe(strategy_name, "miss", started)
+            except TransientGeocodeError:
+                if self.cache_only:
+                    # The prefetch's plan may have stopped at another strategy; keep looking
+                    self._observe(strategy_name, "uncached", started)
+                    uncached = True
+                    continue
+                self._observe(strategy_name, "transient", started)
+                return None, None, RETRY
+            except Exception:
+                self._observe(strategy_name, "error", started)
+        return None, None, RETRY if uncached else "FAILED"
+
+    def _observe(self, strategy, result, started):
+        """Latency of one strategy attempt, labelled by outcome"""
+        if self.metrics is not None:
+            self.metrics.observe("geocode_seconds", time.perf_counter() - started,
+                                 strategy=strategy, result=result)
+
+    def resolve_all(self, jobs):
+        """
+        Resolve an iterable of (address, state, pincode) tuples concurrently.
+        Yields (lat, lon, source) in input order.
+        """
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="geocode") as pool:
+            yield from pool.map(lambda job: self.resolve(*job), jobs)
+
+    def print_stats(self):
+        print(f"Geocoder calls:    {self.stats['network_calls']} "
+              f"(waited {self.stats['rate_limit_wait']:.1f}s on rate limits)")
+        for provider in self.providers:
+            print(f"  {provider.describe():40} {provider.requests:6} requests")
+        if self.stats['transient_errors']:
+            print(f"  Transient errors: {self.stats['transient_errors']} "
+                  f"(backed off {self.stats['backoff_wait']:.1f}s, {self.stats['deferred']} queries deferred, "
+                  f"waited {self.stats['breaker_wait']:.1f}s on open circuits)")
+        for provider in self.providers:
+            breaker = provider.breaker
+            if breaker.stats['opened']:
+                print(f"  Circuit {provider.name[:30]:30} opened {breaker.stats['opened']}x, "
+                      f"{breaker.stats['rejected']} requests routed around")
@@ -0,0 +1,212 @@
+"""
+Pluggable geocoding backends.
+
+Every backend implements Geocoder.geocode(query) -> (lat, lon) or
+(None, None) and advertises the request rate it tolerates (None means
+unlimited). Available backends:
+
+    nominatim:<url>|<rate>   public or self-hosted Nominatim (geopy)
+    gazetteer:<file>         offline lookup from a local PIN/district/locality file
+
+A bare "<url>|<rate>" entry is treated as Nominatim, so existing
+GEOCODE_PROVIDERS values keep working.
+
+Benchmark backends against the same sheet:
+    python geocoders.py --sheet RecyclerRegistrationGrantedList.xlsx \\
+        --backend gazetteer:all_india_pincode.csv --backend "http://localhost:8080|50"
+"""
+import os
+import re
+import csv
+import time
+import argparse
+from collections import defaultdict
+
+if __name__ == "__main__":
+    # Run as a script: load .env before the settings below (and the local imports') are read
+    from dotenv import load_dotenv
+    load_dotenv()
+
+from normalize import PINCODE_RE
+
+PUBLIC_NOMINATIM = "https://nominatim.openstreetmap.org"
+USER_AGENT = os.getenv("GEOCODE_USER_AGENT", "elocate_full_migrator")
+
+
+class Geocoder:
+    """Base class for geocoding backends"""
+
+    name = "geocoder"
+    rate = None  # requests per second; None = no limit
+
+    def geocode(self, query):
+        raise NotImplementedError
+
+
+class NominatimGeocoder(Geocoder):
+    """Nominatim over HTTP; works for the public server and self-hosted containers"""
+
+    def __init__(self, url=PUBLIC_NOMINATIM, rate=1.0, user_agent=USER_AGENT, timeout=10):
+        from urllib.parse import urlparse
+        from geopy.geocoders import Nominatim
+
+        parsed = urlparse(url if '://' in url else f"https://{url}")
+        self.name = parsed.netloc
+        self.rate = rate
+        self.client = Nominatim(
+            user_agent=user_agent,
+            domain=parsed.netloc + parsed.path.rstrip('/'),
+            scheme=parsed.scheme,
+            timeout=timeout,
+        )
+
+    def geocode(self, query):
+        location = self.client.geocode(query)
+        return (location.latitude, location.longitude) if location else (None, None)
+
+
+def _key(text):
+    return re.sub(r'[^a-z ]', '', str(text).lower()).strip()
+
+
+class OfflineGazetteer(Geocoder):
+    """
+    Offline geocoder backed by a local CSV of Indian post offices, e.g. the
+    India Post "All India Pincode Directory" (officename, pincode, district,
+    statename, latitude, longitude). Queries resolve by PIN code first, then
+    by locality or district name within the state. No network, no rate limit.
+    """
+
+    def __init__(self, path):
+        from pincode_index import pick_column, clean_pincode
+
+        self.name = f"gazetteer:{os.path.basename(path)}"
+        sums = {'pin': defaultdict(lambda: [0.0, 0.0, 0]),
+                'place': defaultdict(lambda: [0.0, 0.0, 0])}
+
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            reader = csv.DictReader(f)
+            columns = reader.fieldnames or []
+            pin_col = pick_column(columns, ('pincode', 'pin', 'pin_code'))
+            lat_col = pick_column(columns, ('latitude', 'lat'))
+            lon_col = pick_column(columns, ('longitude', 'lon', 'lng'))
+            state_col = pick_column(columns, ('statename', 'state', 'state_name'))
+            district_col = pick_column(columns, ('district', 'districtname', 'district_name'))
+            office_col = pick_column(columns, ('officename', 'office_name', 'locality', 'place'))
+            if not (lat_col and lon_col):
+                raise ValueError(f"{path}: expected latitude/longitude columns, got {columns}")
+
+            for row in reader:
+                try:
+                    lat, lon = float(row[lat_col]), float(row[lon_col])
+                except (TypeError, ValueError):
+                    continue
+                state = _key(row[state_col]) if state_col else ""
+                places = []
+                if pin_col and clean_pincode(row[pin_col]):
+                    places.append(('pin', clean_pincode(row[pin_col])))
+                if district_col and row[district_col]:
+                    places.append(('place', (_key(row[district_col]), state)))
+                if office_col and row[office_col]:
+                    # "Anna Nagar S.O" -> "anna nagar"
+                    office = re.sub(r'\b(s\.?o|b\.?o|h\.?o|g\.?p\.?o)\b.*$', '', str(row[office_col]), flags=re.I)
+                    places.append(('place', (_key(office), state)))
+                for kind, key in places:
+                    total = sums[kind][key]
+                    total[0] += lat
+                    total[1] += lon
+                    total[2] += 1
+
+        # Several offices share a PIN / district: use the mean as the centroid
+        self.pins = {k: (a / n, b / n) for k, (a, b, n) in sums['pin'].items()}
+        self.places = {k: (a / n, b / n) for k, (a, b, n) in sums['place'].items() if k[0]}
+
+    def geocode(self, query):
+        match = PINCODE_RE.search(query)
+        if match and match.group(1) in self.pins:
+            return self.pins[match.group(1)]
+
+        parts = [_key(p) for p in str(query).split(',')]
+        parts = [p for p in parts if p]
+        if parts and parts[-1] == "india":
+            parts.pop()
+        state = parts.pop() if parts else ""
+
+        # Most specific locality names tend to sit right before the district/state
+        for part in reversed(parts):
+            centroid = self.places.get((part, state)) or self.places.get((part, ""))
+            if centroid:
+                return centroid
+        return None, None
+
+
+def build_geocoder(spec):
+    """Create a backend from a GEOCODE_PROVIDERS entry"""
+    spec = spec.strip()
+    kind, sep, rest = spec.partition(':')
+    if sep and kind == "gazetteer":
+        return OfflineGazetteer(rest)
+    if sep and kind == "nominatim":
+        spec = rest
+    url, _, rate = spec.partition('|')
+    return NominatimGeocoder(url.strip(), float(rate) if rate else 1.0)
+
+
+def benchmark(geocoder, jobs):
+    """Resolve (address, state, pincode) jobs with one backend; returns stats"""
+    from geocode_scheduler import GeocodeScheduler, Provider
+
+    scheduler = GeocodeScheduler(providers=[Provider(geocoder)])
+    started = time.perf_counter()
+    results = list(scheduler.resolve_all(jobs))
+    elapsed = time.perf_counter() - started
+    hits = sum(1 for lat, lon, _ in results if lat is not None and lon is not None)
+    return {
+        'rows': len(results),
+        'hits': hits,
+        'seconds': elapsed,
+        'calls': scheduler.stats['network_calls'],
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark geocoding backends on one sheet")
+    parser.add_argument("--sheet", required=True, help="registration list (.xlsx)")
+    parser.add_argument("--backend", action="append", required=True,
+                        help="backend spec, e.g. gazetteer:pins.csv or 'http://localhost:8080|50'")
+    parser.add_argument("--limit", type=int, help="only use the first N rows")
+    return parser.parse_args()
+
+
+def main():
+    from xlsx_reader import read_columns, iter_chunks, find_column
+    from normalize import (
+        normalize_frame, iter_normalized, NAME_COLUMNS, ADDRESS_COLUMNS, STATE_COLUMNS,
+    )
+
+    args = parse_args()
+    columns = read_columns(args.sheet)
+    name_col = find_column(columns, NAME_COLUMNS)
+    address_col = find_column(columns, ADDRESS_COLUMNS)
+    state_col = find_column(columns, STATE_COLUMNS)
+
+    jobs = []
+    for chunk in iter_chunks(args.sheet, nrows=args.limit):
+        normalized = normalize_frame(chunk, name_col, address_col, state_col)
+        jobs.extend((address, state, pincode)
+                    for _, _, address, state, _, _, pincode in iter_normalized(normalized) if address)
+    print(f"Benchmarking {len(args.backend)} backend(s) on {len(jobs)} rows\n")
+
+    print(f"{'Backend':35} {'Rows':>6} {'Hits':>6} {'Hit %':>6} {'Calls':>6} {'Rows/s':>9} {'Time':>8}")
+    print("="*82)
+    for spec in args.backend:
+        geocoder = build_geocoder(spec)
+        stats = benchmark(geocoder, jobs)
+        rate = stats['rows'] / stats['seconds'] if stats['seconds'] else float('inf')
+        hit_pct = stats['hits'] / stats['rows'] * 100 if stats['rows'] else 0
+        print(f"{geocoder.name[:35]:35} {stats['rows']:6} {stats['hits']:6} {hit_pct:5.1f}% "
+              f"{stats['calls']:6} {rate:9.1f} {stats['seconds']:7.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
-import pandas as pd
 import os
+from xlsx_reader import read_columns, iter_records
 
 FILE_PATH = r"C:\Users\kasum\Downloads\RecyclerRegistrationGrantedList.xlsx"
 
@@ -10,24 +10,27 @@ def inspect_excel():
 
     try:
         print(f"Reading: {FILE_PATH}...")
-        df = pd.read_excel(FILE_PATH)
+        columns = read_columns(FILE_PATH)
         
         print("\nColumn names in Excel:")
         print("="*60)
-        for idx, col in enumerate(df.columns, 1):
+        for idx, col in enumerate(columns, 1):
             print(f"{idx:2}. [{col}]")
         
         print("\n" + "="*60)
         print("Sample data from first row:")
         print("="*60)
         
-        if not df.empty:
-            first_row = df.iloc[0]
-            for col in df.columns[:15]:  # Show first 15 columns
+        records = iter_records(FILE_PATH)
+        first = next(records, None)
+        if first is not None:
+            _, first_row = first
+            for col in columns[:15]:  # Show first 15 columns
                 value = first_row.get(col, '')
                 print(f"{col}: [{value}]")
             
-            print("\nTotal Rows:", len(df))
+            # Counting streams the rest of the sheet without holding it in memory
+            print("\nTotal Rows:", 1 + sum(1 for _ in records))
         else:
             print("File is empty.")
 
@@ -0,0 +1,201 @@
+"""
+Lightweight metrics for the migration pipeline.
+
+Counters and latency histograms keyed by name + labels, e.g.
+
+    metrics.count("rows", outcome="duplicate")
+    with metrics.timer("stage_seconds", stage="normalize"):
+        ...
+    metrics.observe("geocode_seconds", 0.42, strategy="PIN", result="hit")
+
+Results go to a JSON lines file (events as they happen plus one summary line
+per series with p50/p95/p99 at the end) and, if MIGRATION_METRICS_PROM is
+set, to a Prometheus textfile for node_exporter's textfile collector.
+"""
+import os
+import json
+import math
+import time
+import random
+import threading
+from contextlib import contextmanager
+
+METRICS_FILE = os.getenv(
+    "MIGRATION_METRICS_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "migration_metrics.jsonl")
+)
+PROM_FILE = os.getenv("MIGRATION_METRICS_PROM")  # e.g. /var/lib/node_exporter/elocate_migration.prom
+MAX_SAMPLES = int(os.getenv("MIGRATION_METRICS_MAX_SAMPLES", "100000"))  # per histogram
+PROM_PREFIX = "elocate_migration_"
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _series_key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def quantile(sorted_values, q):
+    """
+    Nearest-rank quantile of an already sorted list: the smallest value with
+    at least q of the samples at or below it.
+
+    >>> quantile(list(range(1, 101)), 0.95), quantile(list(range(1, 101)), 0.99)
+    (95, 99)
+    >>> quantile(list(range(1, 11)), 0.5), quantile([7], 0.5), quantile([], 0.5)
+    (5, 7, None)
+    """
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class Histogram:
+    """Exact count/sum/min/max; quantiles from a bounded reservoir sample"""
+
+    def __init__(self, max_samples=MAX_SAMPLES):
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+        self.samples = []
+        self.max_samples = max_samples
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if len(self.samples) < self.max_samples:
+            self.samples.append(value)
+        else:
+            slot = random.randrange(self.count)
+            if slot < self.max_samples:
+                self.samples[slot] = value
+
+    def quantiles(self):
+        ordered = sorted(self.samples)
+        return {f"p{int(q * 100)}": quantile(ordered, q) for q in QUANTILES}
+
+
+class Metrics:
+    """Thread-safe counters + histograms with JSON lines / Prometheus output"""
+
+    def __init__(self, path=METRICS_FILE, prom_path=PROM_FILE, run_id=None):
+        self.path = path
+        self.prom_path = prom_path
+        self.run_id = run_id or time.strftime("%Y%m%dT%H%M%S")
+        self.started = time.time()
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.file = open(path, "a", encoding="utf-8") if path else None
+
+    def count(self, name, value=1, **labels):
+        key = _series_key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = _series_key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def event(self, name, **fields):
+        """Write one JSON line right away (batch commits, phase changes, ...)"""
+        if not self.file:
+            return
+        line = json.dumps({'ts': round(time.time(), 3), 'run': self.run_id, 'event': name, **fields},
+                          default=str)
+        with self.lock:
+            self.file.write(line + "\n")
+            self.file.flush()
+
+    def summary(self):
+        """One dict per series, sorted by name"""
+        with self.lock:
+            counters = list(self.counters.items())
+            histograms = [(key, h.count, h.sum, h.min, h.max, h.quantiles())
+                          for key, h in self.histograms.items()]
+        rows = []
+        for (name, labels), value in sorted(counters):
+            rows.append({'type': 'counter', 'metric': name, 'labels': dict(labels), 'value': value})
+        for (name, labels), count, total, low, high, qs in sorted(histograms, key=lambda h: h[0]):
+            rows.append({'type': 'histogram', 'metric': name, 'labels': dict(labels), 'count': count,
+                         'sum': total, 'min': low, 'max': high, **qs})
+        return rows
+
+    def write_prometheus(self, path=None):
+        """Write a node_exporter textfile (atomic rename, so scrapes never see half a file)"""
+        path = path or self.prom_path
+        if not path:
+            return
+
+        def fmt_labels(labels, **extra):
+            items = list(labels.items()) + list(extra.items())
+            if not items:
+                return ""
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+        lines = []
+        typed = set()
+        for row in self.summary():
+            name = PROM_PREFIX + row['metric']
+            if row['type'] == 'counter':
+                name += "_total"
+                if name not in typed:
+                    lines.append(f"# TYPE {name} counter")
+                    typed.add(name)
+                lines.append(f"{name}{fmt_labels(row['labels'])} {row['value']}")
+            else:
+                if name not in typed:
+                    lines.append(f"# TYPE {name} summary")
+                    typed.add(name)
+                for q in QUANTILES:
+                    value = row[f"p{int(q * 100)}"]
+                    lines.append(f"{name}{fmt_labels(row['labels'], quantile=q)} {value}")
+                lines.append(f"{name}_sum{fmt_labels(row['labels'])} {row['sum']}")
+                lines.append(f"{name}_count{fmt_labels(row['labels'])} {row['count']}")
+        lines.append(f"# TYPE {PROM_PREFIX}last_run_timestamp_seconds gauge")
+        lines.append(f"{PROM_PREFIX}last_run_timestamp_seconds {self.started:.0f}")
+
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp, path)
+
+    def print_summary(self, name_prefix=""):
+        """Latency table for the console summary"""
+        rows = [r for r in self.summary() if r['type'] == 'histogram' and r['metric'].startswith(name_prefix)]
+        if not rows:
+            return
+        print(f"{'Timing':58} {'Count':>7} {'Total':>9} {'p50':>8} {'p95':>8} {'p99':>8}")
+        for row in rows:
+            label = row['metric'] + "".join(f" {k}={v}" for k, v in row['labels'].items())
+            print(f"  {label[:56]:56} {row['count']:7} {row['sum']:8.2f}s "
+                  f"{row['p50'] * 1000:6.1f}ms {row['p95'] * 1000:6.1f}ms {row['p99'] * 1000:6.1f}ms")
+
+    def close(self):
+        """Append the per-series summary and write the Prometheus textfile"""
+        if self.file:
+            for row in self.summary():
+                self.event("summary", **row)
+            self.file.close()
+            self.file = None
+        self.write_prometheus()
@@ -1,16 +1,17 @@
-import pandas as pd
 import os
 import time
-import re
 import uuid
 import csv
 from datetime import datetime
 from geopy.geocoders import Nominatim
 from dotenv import load_dotenv
 
-# Load env variables
+# Before the local imports: their settings are read from the environment at import time
 load_dotenv()
 
+from xlsx_reader import read_columns, iter_records, find_column
+from normalize import extract_pincode
+
 # File paths
 INPUT_FILE = r"C:\Users\kasum\Downloads\RecyclerRegistrationGrantedList.xlsx"
 OUTPUT_CSV = r"C:\Users\kasum\Downloads\test_5_geocoded.csv"
@@ -21,10 +22,6 @@ ALLOWED_STATES = {"TAMIL NADU", "KERALA", "KARNATAKA", "UTTAR PRADESH"} # Added
 # Geocoder
 geolocator = Nominatim(user_agent="elocate_test_loader")
 
-def extract_pincode(address):
-    match = re.search(r'\b\d{6}\b', str(address))
-    return match.group(0) if match else None
-
 def get_lat_lon_smart(address, state):
     pincode = extract_pincode(address)
     strategies = [
@@ -50,7 +47,11 @@ def main():
         return
 
     print(f"Reading first 5 rows from: {INPUT_FILE}")
-    df = pd.read_excel(INPUT_FILE).head(5)
+    # Only the first 5 data rows are parsed; the rest of the sheet is never read
+    columns = read_columns(INPUT_FILE)
+    name_col = find_column(columns, ['name'])
+    address_col = find_column(columns, ['address'])
+    state_col = find_column(columns, ['state'])
     
     target_columns = [
         'id', 'name', 'address', 'latitude', 'longitude', 
@@ -63,11 +64,10 @@ def main():
         writer = csv.DictWriter(outfile, fieldnames=target_columns)
         writer.writeheader()
         
-        for _, row in df.iterrows():
-            # Basic column search (case-insensitive)
-            name = next((row[c] for c in df.columns if 'name' in c.lower()), "Unknown")
-            address = next((row[c] for c in df.columns if 'address' in c.lower()), "Unknown")
-            state = next((row[c] for c in df.columns if 'state' in c.lower()), "Unknown")
+        for _, row in iter_records(INPUT_FILE, nrows=5):
+            name = row[name_col] if name_col else "Unknown"
+            address = row[address_col] if address_col else "Unknown"
+            state = row[state_col] if state_col else "Unknown"
             
             print(f"\nProcessing: {name}")
             lat, lon, source = get_lat_lon_smart(address, state)
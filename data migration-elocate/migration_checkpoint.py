@@ -0,0 +1,90 @@
+"""
+Checkpoint store for resumable migration runs.
+
+Every input row's outcome (and geocode result) is recorded in a local
+SQLite file, but only after the database batch that contains it has been
+committed. A crashed run can then be restarted with --resume and continue
+from the first row that wasn't committed.
+"""
+import os
+import sqlite3
+import time
+
+CHECKPOINT_FILE = os.getenv(
+    "MIGRATION_CHECKPOINT_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "migration_checkpoint.sqlite")
+)
+
+
+def input_fingerprint(path):
+    """Identify an input file by path, size and mtime so edits invalidate the checkpoint"""
+    st = os.stat(path)
+    return f"{os.path.abspath(path)}|{st.st_size}|{int(st.st_mtime)}"
+
+
+class MigrationCheckpoint:
+    """Tracks which input rows of a given file are done"""
+
+    def __init__(self, input_file, path=CHECKPOINT_FILE):
+        self.path = path
+        self.run_key = input_fingerprint(input_file)
+        self.pending = []
+        # Opened here, written from the pipeline's writer thread (one thread at a time)
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS checkpoint_rows (
+                run_key     TEXT NOT NULL,
+                row_no      INTEGER NOT NULL,
+                status      TEXT NOT NULL,
+                facility_id TEXT,
+                latitude    REAL,
+                longitude   REAL,
+                source      TEXT,
+                updated_at  REAL NOT NULL,
+                PRIMARY KEY (run_key, row_no)
+            )
+        """)
+        self.conn.commit()
+
+    def done_rows(self):
+        """Row numbers already committed for this input file"""
+        cursor = self.conn.execute(
+            "SELECT row_no FROM checkpoint_rows WHERE run_key = ?", (self.run_key,)
+        )
+        return {row_no for (row_no,) in cursor}
+
+    def reset(self):
+        """Forget previous progress for this input file (fresh run)"""
+        self.conn.execute("DELETE FROM checkpoint_rows WHERE run_key = ?", (self.run_key,))
+        self.conn.commit()
+        self.pending = []
+
+    def record(self, row_no, status, facility_id=None, latitude=None, longitude=None, source=None):
+        """Stage a row outcome; persisted on the next database commit"""
+        self.pending.append(
+            (self.run_key, row_no, status, facility_id, latitude, longitude, source, time.time())
+        )
+
+    def flush(self, failed_ids=()):
+        """
+        Persist staged outcomes; call right after the database commit succeeds.
+        Rows whose facility_id is in failed_ids were not inserted; they are left
+        out so that --resume retries them.
+        """
+        if not self.pending:
+            return
+        done = [entry for entry in self.pending if entry[3] is None or entry[3] not in failed_ids]
+        self.conn.executemany(
+            """
+            INSERT OR REPLACE INTO checkpoint_rows
+                (run_key, row_no, status, facility_id, latitude, longitude, source, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            done
+        )
+        self.conn.commit()
+        self.pending = []
+
+    def close(self):
+        self.conn.close()
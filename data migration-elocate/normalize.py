@@ -0,0 +1,105 @@
+"""
+Vectorized normalization of registration-list DataFrames.
+
+Cleans name, address, state and email and extracts the 6-digit PIN code
+for a whole chunk at once with pandas string methods, so the per-row loop
+in the migrators only has to do I/O (dedup lookups, geocoding, inserts).
+
+Row-at-a-time scripts use parse_address() instead: each distinct address
+is parsed once into an AddressRecord (cleaned text, PIN code, city/area,
+state) and memoized, so repeated lookups of the same address are free.
+"""
+import os
+import re
+from collections import namedtuple
+from functools import lru_cache
+import pandas as pd
+
+PINCODE_PATTERN = r'\b(\d{6})\b'
+PINCODE_RE = re.compile(PINCODE_PATTERN)
+_WHITESPACE_RE = re.compile(r'\s+')
+_SEPARATOR_RE = re.compile(r'\s*,\s*')
+
+ADDRESS_CACHE_SIZE = int(os.getenv("ADDRESS_CACHE_SIZE", "65536"))
+
+NAME_COLUMNS = ['Company Name', 'Name', 'Unit Name']
+ADDRESS_COLUMNS = ['Address']
+STATE_COLUMNS = ['State']
+DISTRICT_COLUMNS = ['District']
+EMAIL_COLUMNS = ['Email']
+ID_COLUMNS = ['RecyclerID', 'Recycler ID', 'Registration ID', 'ID']
+
+
+def _clean(series):
+    """Strip strings and turn blanks/NaN into None-like NA"""
+    cleaned = series.astype("string").str.strip()
+    return cleaned.mask(cleaned == "")
+
+
+def normalize_frame(df, name_col=None, address_col=None, state_col=None,
+                    email_col=None, district_col=None):
+    """
+    Return a DataFrame with columns name, address, state, email, district and
+    pincode, aligned to df's index. Missing values follow the migrators'
+    defaults: name "Unknown", state "UNKNOWN", email/district "".
+    Address stays NA when missing so callers can skip those rows.
+    """
+    def column(col):
+        if col and col in df.columns:
+            return _clean(df[col])
+        return pd.Series(pd.NA, index=df.index, dtype="string")
+
+    out = pd.DataFrame(index=df.index)
+    out['name'] = column(name_col).fillna("Unknown")
+    out['address'] = column(address_col)
+    out['state'] = column(state_col).str.upper().fillna("UNKNOWN")
+    out['email'] = column(email_col).fillna("")
+    out['district'] = column(district_col).fillna("")
+    out['pincode'] = out['address'].str.extract(PINCODE_PATTERN, expand=False)
+    return out
+
+
+def iter_normalized(normalized):
+    """Yield (index, name, address, state, email, district, pincode) with None for missing values"""
+    plain = normalized.astype(object).where(normalized.notna(), None)
+    yield from plain[['name', 'address', 'state', 'email', 'district', 'pincode']].itertuples(name=None)
+
+
+AddressRecord = namedtuple('AddressRecord', ['text', 'pincode', 'city_area', 'state'])
+
+
+@lru_cache(maxsize=ADDRESS_CACHE_SIZE)
+def parse_address(address, state=None):
+    """
+    Parse one address into an AddressRecord. `text` has whitespace collapsed,
+    `city_area` is the last two or three comma-separated parts (or the whole
+    address), `state` is upper-cased. Missing address -> all fields None.
+    """
+    if address is None or address is pd.NA or (isinstance(address, float) and address != address):
+        return AddressRecord(None, None, None, state.strip().upper() if state else None)
+
+    text = _WHITESPACE_RE.sub(' ', str(address)).strip()
+    match = PINCODE_RE.search(text)
+    parts = _SEPARATOR_RE.split(text)
+    if len(parts) >= 3:
+        city_area = ', '.join(parts[-3:])
+    elif len(parts) >= 2:
+        city_area = ', '.join(parts[-2:])
+    else:
+        city_area = text
+    return AddressRecord(
+        text,
+        match.group(1) if match else None,
+        city_area,
+        state.strip().upper() if state else None,
+    )
+
+
+def extract_pincode(address):
+    """Extract 6-digit Indian PIN code from address"""
+    return parse_address(address).pincode
+
+
+def extract_city_from_address(address):
+    """Extract likely city/area name from address"""
+    return parse_address(address).city_area
@@ -1,30 +1,27 @@
-import csv
-import psycopg2
-from dotenv import load_dotenv
+import sys
 import os
-from urllib.parse import urlparse, parse_qsl
+import pyarrow.compute as pc
+from dotenv import load_dotenv
 
-# Load env variables
+# Before the local imports: their settings are read from the environment at import time
 load_dotenv()
 
-# CSV path (the geocoded file created by process_csv.py)
-INPUT_CSV = r"C:\Users\kasum\Downloads\geocoded_facilities.csv"
+# Shared migration helpers live one directory up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db import connect
+from facility_dedup import DuplicateFilter, load_existing_keys, has_unique_index
+from facility_writer import FacilityBatchWriter
+from facility_cache import bump_version
+from facility_summary import ensure_summary
+from review_file import read_review_file, csv_path_for, COLUMNS
 
-# Parse DATABASE_URL
-tmpPostgres = urlparse(os.getenv("DATABASE_URL"))
+# Geocoded file created by process_csv.py (geocoded_facilities.csv is the reviewer copy)
+INPUT_FILE = r"C:\Users\kasum\Downloads\geocoded_facilities.parquet"
 
 # DB connection
 print("Connecting to database...")
 try:
-    conn = psycopg2.connect(
-        host=tmpPostgres.hostname,
-        database=tmpPostgres.path.replace('/', ''),
-        user=tmpPostgres.username,
-        password=tmpPostgres.password,
-        port=5432,
-        **dict(parse_qsl(tmpPostgres.query))
-    )
-    cursor = conn.cursor()
+    conn = connect()
     print("✅ Connected to database\n")
 except Exception as e:
     print(f"❌ Database connection failed: {e}")
@@ -35,71 +32,51 @@ stats = {
     'total': 0,
     'imported': 0,
     'duplicates': 0,
+    'no_coordinates': 0,
     'errors': 0
 }
 
 # Check if input file exists
-if not os.path.exists(INPUT_CSV):
-    print(f"❌ Error: Input file not found: {INPUT_CSV}")
+if not os.path.exists(INPUT_FILE) and not os.path.exists(csv_path_for(INPUT_FILE)):
+    print(f"❌ Error: Input file not found: {INPUT_FILE}")
     exit(1)
 
-print(f"Reading from: {INPUT_CSV}\n")
+# Load existing (name, address) keys once instead of querying per row
+dedup = DuplicateFilter(load_existing_keys(conn))
+on_conflict = has_unique_index(conn)
+print(f"Loaded {len(dedup)} existing facility keys"
+      f"{' (ON CONFLICT DO NOTHING enabled)' if on_conflict else ''}")
+
+# Typed Parquet/Arrow file from process_csv.py; a reviewer-edited CSV next to it takes precedence
+table, source = read_review_file(INPUT_FILE)
+print(f"Reading from: {source} ({table.num_rows} rows)\n")
+stats['total'] = table.num_rows
 
-with open(INPUT_CSV, "r", encoding="utf-8", newline="") as file:
-    reader = csv.DictReader(file)
-    
-    for row in reader:
-        stats['total'] += 1
-        
-        # Check if facility already exists
-        try:
-            cursor.execute(
-                "SELECT COUNT(*) FROM recycling_facility WHERE name = %s AND address = %s",
-                (row['name'], row['address'])
-            )
-            if cursor.fetchone()[0] > 0:
-                print(f"⚠️  Already exists: {row['name'][:50]}")
-                stats['duplicates'] += 1
-                continue
-            
-            # Map coordinates (handle potential empty strings)
-            lat = float(row['latitude']) if row['latitude'] else None
-            lon = float(row['longitude']) if row['longitude'] else None
-            
-            if lat is None or lon is None:
-                print(f"⚠️  Skipping {row['name'][:50]} (No coordinates)")
-                continue
+# Rows without coordinates are dropped in one vectorized filter
+geocoded = table.filter(pc.and_(pc.is_valid(table['latitude']), pc.is_valid(table['longitude'])))
+stats['no_coordinates'] = table.num_rows - geocoded.num_rows
 
-            # Insert into database using direct mapping from CSV
-            cursor.execute(
-                """
-                INSERT INTO recycling_facility (
-                    id, name, address, latitude, longitude, 
-                    capacity, contact_number, operating_hours, 
-                    is_verified, is_active, created_at, updated_at, 
-                    geocode_source, email, state, pincode
-                ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-                """,
-                (
-                    row['id'], row['name'], row['address'], lat, lon,
-                    int(row['capacity']), row['contact_number'], row['operating_hours'],
-                    row['is_verified'] == 'True', row['is_active'] == 'True',
-                    row['created_at'], row['updated_at'], 
-                    row['geocode_source'], row['email'], row['state'], row['pincode']
-                ),
-            )
-            
-            print(f"✅ Inserted: {row['name'][:50]}")
-            stats['imported'] += 1
-            
-        except Exception as e:
-            print(f"❌ Error inserting {row['name'][:50]}: {e}")
-            stats['errors'] += 1
+ensure_summary(conn)
+writer = FacilityBatchWriter(conn, columns=COLUMNS, on_conflict=on_conflict, summary=True)
+columns = [geocoded.column(col).to_pylist() for col in COLUMNS]
+for row in zip(*columns):
+    # Column order is COLUMNS, so name/address are row[1]/row[2]
+    if dedup.check(row[1], row[2]):
+        print(f"⚠️  Already exists: {row[1][:50]}")
+        stats['duplicates'] += 1
+        continue
+    writer.add(row)
 
-# Commit all changes
-conn.commit()
-cursor.close()
+writer.close()
+if writer.stats['written']:
+    # Invalidate cached admin list snapshots (facility_cache.py)
+    with conn.cursor() as cursor:
+        bump_version(cursor)
+    conn.commit()
 conn.close()
+stats['imported'] = writer.stats['written']
+stats['duplicates'] += writer.stats['conflicts']
+stats['errors'] = writer.stats['failed']
 
 # Print summary
 print("\n" + "="*60)
@@ -107,6 +84,7 @@ print("Import Summary:")
 print("="*60)
 print(f"Total rows read:          {stats['total']}")
 print(f"Successfully imported:    {stats['imported']}")
+print(f"Skipped (no coordinates): {stats['no_coordinates']}")
 print(f"Duplicates:               {stats['duplicates']}")
 print(f"Errors:                   {stats['errors']}")
 print("="*60)
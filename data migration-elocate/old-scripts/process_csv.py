@@ -1,19 +1,27 @@
 import pandas as pd
 import os
+import sys
 import time
-import re
 import uuid
 from datetime import datetime
 from geopy.geocoders import Nominatim
 from dotenv import load_dotenv
 
-# Load env variables
+# Before the local imports: their settings are read from the environment at import time
 load_dotenv()
 
+# Shared migration helpers live one directory up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from normalize import parse_address
+from strategy_planner import StrategyPlanner, address_shape
+from review_file import to_table, write_review_file
+
 # CSV paths
 # File paths
 INPUT_FILE = r"C:\Users\kasum\Downloads\RecyclerRegistrationGrantedList.xlsx"
 OUTPUT_CSV = r"C:\Users\kasum\Downloads\geocoded_facilities.csv"
+# Typed copy for import_to_db.py (same name, .parquet; use .arrow for Arrow IPC)
+OUTPUT_PARQUET = os.path.splitext(OUTPUT_CSV)[0] + ".parquet"
 
 # Allowed states
 ALLOWED_STATES = {"TAMIL NADU", "KERALA", "KARNATAKA"}
@@ -21,19 +29,8 @@ ALLOWED_STATES = {"TAMIL NADU", "KERALA", "KARNATAKA"}
 # Geocoder (FREE – OpenStreetMap)
 geolocator = Nominatim(user_agent="elocate_facility_loader")
 
-def extract_pincode(address):
-    """Extract 6-digit Indian PIN code from address"""
-    match = re.search(r'\b\d{6}\b', address)
-    return match.group(0) if match else None
-
-def extract_city_from_address(address):
-    """Extract likely city/area name from address"""
-    parts = [p.strip() for p in address.split(',')]
-    if len(parts) >= 3:
-        return ', '.join(parts[-3:])
-    elif len(parts) >= 2:
-        return ', '.join(parts[-2:])
-    return address
+# Tries the strategy most likely to win for this state / address shape first (PLANNER_* settings)
+planner = StrategyPlanner()
 
 def get_lat_lon_smart(full_address, district, state):
     """
@@ -45,25 +42,27 @@ def get_lat_lon_smart(full_address, district, state):
     5. District + State
     6. State only
     """
-    pincode = extract_pincode(full_address)
-    city_area = extract_city_from_address(full_address)
+    # Parsed once per distinct address and memoized (normalize.parse_address)
+    record = parse_address(full_address)
+    pincode, city_area = record.pincode, record.city_area
     
     strategies = [
         ("PIN_FULL", full_address if pincode else None),
         ("PIN", f"{pincode}, {state}, India" if pincode else None),
         ("FULL_ADDRESS", full_address),
-        ("AREA", f"{city_area}, {state}, India" if city_area != full_address else None)
+        ("AREA", f"{city_area}, {state}, India" if city_area != record.text else None)
     ]
+    strategies = [(name, address) for name, address in strategies
+                  if address and address != ", India" and address != "None, India"]
+    shape = address_shape(full_address)
     
-    for strategy_name, address in strategies:
-        if not address or address == ", India" or address == "None, India":
-            continue
-            
+    for strategy_name, address in planner.plan(strategies, state, shape):
         try:
             print(f"    Trying: {strategy_name}")
             print(f"      → {address[:100]}...")
             location = geolocator.geocode(address, timeout=10)
             time.sleep(1.5)  # Delay for rate limiting
+            planner.record(strategy_name, state, shape, location is not None)
             
             if location:
                 print(f"    ✅ SUCCESS with {strategy_name}")
@@ -128,6 +127,9 @@ email_col = find_col(['Email'], df.columns)
 
 import csv # Needed for writing OUTPUT_CSV
 
+# Typed rows for the Parquet file; the CSV is still written row by row so a crash keeps partial output
+records = []
+
 with open(OUTPUT_CSV, "w", encoding="utf-8", newline="") as outfile:
     writer = csv.DictWriter(outfile, fieldnames=target_columns)
     writer.writeheader()
@@ -156,7 +158,7 @@ with open(OUTPUT_CSV, "w", encoding="utf-8", newline="") as outfile:
             stats['skipped'] += 1
             continue
             
-        pincode = extract_pincode(address)
+        pincode = parse_address(address).pincode
         
         # Geocode the address
         print(f"Processing: {name[:50]}...")
@@ -169,13 +171,13 @@ with open(OUTPUT_CSV, "w", encoding="utf-8", newline="") as outfile:
             'id': str(uuid.uuid4()),
             'name': name,
             'address': address,
-            'latitude': latitude if latitude else '',
-            'longitude': longitude if longitude else '',
+            'latitude': latitude if latitude else None,
+            'longitude': longitude if longitude else None,
             'capacity': 1000,
             'contact_number': '',
             'operating_hours': '9AM-6PM',
-            'is_verified': 'False',
-            'is_active': 'True',
+            'is_verified': False,
+            'is_active': True,
             'created_at': now,
             'updated_at': now,
             'geocode_source': source,
@@ -192,8 +194,13 @@ with open(OUTPUT_CSV, "w", encoding="utf-8", newline="") as outfile:
         
         # Write to output CSV
         writer.writerow(new_row)
+        records.append(new_row)
         stats['processed'] += 1
 
+# Written after the CSV, so a CSV edited during review is newer than this file
+write_review_file(to_table(records), OUTPUT_PARQUET)
+planner.save()
+
 # Print summary
 print("\n" + "="*60)
 print("Processing Summary:")
@@ -204,9 +211,11 @@ print(f"Skipped (missing data):   {stats['skipped']}")
 print(f"Processed:                {stats['processed']}")
 print(f"Successfully geocoded:    {stats['geocoded']}")
 print(f"Failed geocoding:         {stats['processed'] - stats['geocoded']}")
+planner.print_stats()
 print("="*60)
 
 if stats['processed'] > 0:
     print(f"\n✅ Output saved to: {OUTPUT_CSV}")
+    print(f"✅ Typed copy saved to: {OUTPUT_PARQUET}")
 else:
     print("\n⚠️  No records were processed")
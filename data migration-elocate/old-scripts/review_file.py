@@ -0,0 +1,125 @@
+"""
+Typed intermediate file between process_csv.py and import_to_db.py.
+
+The geocoded facilities are stored as Parquet (or Arrow IPC for .arrow /
+.feather paths) with a fixed schema, so latitude/longitude stay float64 and
+the flags stay booleans instead of round-tripping through strings. A CSV
+copy is still written for reviewers; if that CSV is edited after the
+typed file was written, read_review_file() picks up the edited CSV and
+parses it with the same schema.
+
+    python review_file.py geocoded_facilities.parquet           # summary
+    python review_file.py geocoded_facilities.parquet --csv     # re-export CSV
+"""
+import os
+import sys
+import argparse
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+SCHEMA = pa.schema([
+    ('id', pa.string()),
+    ('name', pa.string()),
+    ('address', pa.string()),
+    ('latitude', pa.float64()),
+    ('longitude', pa.float64()),
+    ('capacity', pa.int32()),
+    ('contact_number', pa.string()),
+    ('operating_hours', pa.string()),
+    ('is_verified', pa.bool_()),
+    ('is_active', pa.bool_()),
+    ('created_at', pa.string()),  # ISO timestamps, passed through to Postgres as-is
+    ('updated_at', pa.string()),
+    ('geocode_source', pa.string()),
+    ('email', pa.string()),
+    ('state', pa.string()),
+    ('pincode', pa.string()),
+])
+COLUMNS = SCHEMA.names
+
+_IPC_EXTENSIONS = ('.arrow', '.feather', '.ipc')
+
+
+def _is_ipc(path):
+    return path.lower().endswith(_IPC_EXTENSIONS)
+
+
+def csv_path_for(path):
+    """Reviewer CSV that sits next to a typed review file"""
+    return os.path.splitext(path)[0] + ".csv"
+
+
+def to_table(rows):
+    """Build a typed table from a list of row dicts (missing values -> null)"""
+    return pa.Table.from_pylist([{col: row.get(col) for col in COLUMNS} for row in rows], schema=SCHEMA)
+
+
+def write_review_file(table, path):
+    """Write Parquet, or Arrow IPC for .arrow/.feather/.ipc"""
+    if _is_ipc(path):
+        with pa.OSFile(path, "wb") as sink, ipc.new_file(sink, SCHEMA) as writer:
+            writer.write_table(table)
+    else:
+        pq.write_table(table, path, compression="zstd")
+
+
+def export_csv(table, csv_path):
+    """Plain CSV for human review (True/False flags, empty cells for nulls)"""
+    pa_csv.write_csv(table, csv_path)
+
+
+def read_csv(csv_path):
+    """Parse a (possibly hand-edited) review CSV with the typed schema"""
+    options = pa_csv.ConvertOptions(
+        column_types=SCHEMA, include_columns=COLUMNS,
+        true_values=["True", "true", "TRUE", "1"], false_values=["False", "false", "FALSE", "0"],
+        strings_can_be_null=False, null_values=[""],
+    )
+    table = pa_csv.read_csv(csv_path, convert_options=options)
+    return table.select(COLUMNS)
+
+
+def read_review_file(path):
+    """
+    Load the typed file memory-mapped (zero-copy for Arrow IPC). Returns
+    (table, source_path); a CSV edited after the typed file was written wins.
+    """
+    csv_path = csv_path_for(path)
+    if os.path.exists(csv_path) and (
+            not os.path.exists(path) or os.path.getmtime(csv_path) > os.path.getmtime(path) + 1):
+        return read_csv(csv_path), csv_path
+
+    if _is_ipc(path):
+        with pa.memory_map(path, "r") as source:
+            return ipc.open_file(source).read_all(), path
+    return pq.read_table(path, memory_map=True).select(COLUMNS), path
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Inspect or convert the geocoded review file")
+    parser.add_argument("path", help="typed review file (.parquet or .arrow)")
+    parser.add_argument("--csv", action="store_true", help="re-export the reviewer CSV")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if not os.path.exists(args.path) and not os.path.exists(csv_path_for(args.path)):
+        print(f"❌ Error: Input file not found: {args.path}")
+        sys.exit(1)
+
+    table, source = read_review_file(args.path)
+    geocoded = table.filter(pc.is_valid(table['latitude'])).num_rows
+    print(f"Loaded {table.num_rows} rows from {source}")
+    print(f"Geocoded: {geocoded}, missing coordinates: {table.num_rows - geocoded}")
+
+    if args.csv:
+        export_csv(table, csv_path_for(args.path))
+        print(f"✅ CSV saved to: {csv_path_for(args.path)}")
+
+
+if __name__ == "__main__":
+    main()
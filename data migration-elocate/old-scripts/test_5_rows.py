@@ -1,15 +1,19 @@
 import csv
 import os
+import sys
 import time
-import re
 import uuid
 import datetime
 from geopy.geocoders import Nominatim
 from dotenv import load_dotenv
 
-# Load env variables
+# Before the local imports: their settings are read from the environment at import time
 load_dotenv()
 
+# Shared migration helpers live one directory up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from normalize import parse_address
+
 # CSV paths
 INPUT_CSV = r"C:\Users\kasum\Downloads\authorized_producers_cpcb.csv"
 timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -24,29 +28,16 @@ geolocator = Nominatim(user_agent="elocate_facility_loader")
 # LIMIT FOR TESTING
 MAX_TO_PROCESS = 5
 
-def extract_pincode(address):
-    """Extract 6-digit Indian PIN code from address"""
-    match = re.search(r'\b\d{6}\b', address)
-    return match.group(0) if match else None
-
-def extract_city_from_address(address):
-    """Extract likely city/area name from address"""
-    parts = [p.strip() for p in address.split(',')]
-    if len(parts) >= 3:
-        return ', '.join(parts[-3:])
-    elif len(parts) >= 2:
-        return ', '.join(parts[-2:])
-    return address
-
 def get_lat_lon_smart(full_address, district, state):
-    pincode = extract_pincode(full_address)
-    city_area = extract_city_from_address(full_address)
+    # Parsed once per distinct address and memoized (normalize.parse_address)
+    record = parse_address(full_address)
+    pincode, city_area = record.pincode, record.city_area
     
     strategies = [
         ("PIN_FULL", full_address if pincode else None),
         ("PIN", f"{pincode}, {state}, India" if pincode else None),
         ("FULL_ADDRESS", full_address),
-        ("AREA", f"{city_area}, {state}, India" if city_area != full_address else None)
+        ("AREA", f"{city_area}, {state}, India" if city_area != record.text else None)
     ]
     
     for strategy_name, address in strategies:
@@ -118,7 +109,7 @@ with open(INPUT_CSV, "r", encoding="utf-8", newline="") as infile:
                 
             district = row.get('District', '').strip()
             email = row.get('Email', '').strip()
-            pincode = extract_pincode(address)
+            pincode = parse_address(address).pincode
             
             print(f"Processing: {name[:50]}...")
             lat, lon, source = get_lat_lon_smart(address, district, current_state)
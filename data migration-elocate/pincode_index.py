@@ -0,0 +1,124 @@
+"""
+Local PIN code -> (latitude, longitude) centroid index.
+
+Every facility that shares a PIN code resolves to the same centroid, so the
+"PIN" geocoding strategy can be answered from a dict instead of Nominatim.
+The index can be seeded from a CSV or Parquet file (e.g. the India Post
+PIN code directory) and grows with every successful network PIN lookup.
+"""
+import csv
+import os
+import threading
+
+INDEX_FILE = os.getenv(
+    "PINCODE_INDEX_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "pincode_index.csv")
+)
+
+# Column names accepted when loading third-party PIN code files
+PINCODE_COLUMNS = ('pincode', 'pin', 'pin_code', 'postal_code')
+LATITUDE_COLUMNS = ('latitude', 'lat')
+LONGITUDE_COLUMNS = ('longitude', 'lon', 'lng', 'long')
+
+
+def pick_column(columns, candidates):
+    """Actual name of the first candidate column present (case-insensitive), or None"""
+    lookup = {str(c).strip().lower(): c for c in columns}
+    for name in candidates:
+        if name in lookup:
+            return lookup[name]
+    return None
+
+
+def clean_pincode(value):
+    """Six-digit PIN code string, or None if the value isn't one"""
+    text = str(value).strip()
+    if text.endswith('.0'):  # pandas reads numeric PIN columns as floats
+        text = text[:-2]
+    return text if len(text) == 6 and text.isdigit() else None
+
+
+class PincodeIndex:
+    """In-memory PIN code centroid index with CSV/Parquet persistence"""
+
+    def __init__(self, path=INDEX_FILE):
+        self.path = path
+        self.centroids = {}
+        self.learned = 0
+        self.stats = {'hits': 0, 'misses': 0}
+        # get/add are called from the geocoding worker threads
+        self.lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def load(self, path):
+        """Load centroids from a CSV or Parquet file; returns rows loaded"""
+        if path.lower().endswith(('.parquet', '.pq')):
+            import pandas as pd
+            df = pd.read_parquet(path)
+            records = df.to_dict('records')
+            columns = df.columns
+        else:
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                reader = csv.DictReader(f)
+                columns = reader.fieldnames or []
+                records = list(reader)
+
+        pin_col = pick_column(columns, PINCODE_COLUMNS)
+        lat_col = pick_column(columns, LATITUDE_COLUMNS)
+        lon_col = pick_column(columns, LONGITUDE_COLUMNS)
+        if not (pin_col and lat_col and lon_col):
+            raise ValueError(f"{path}: expected pincode/latitude/longitude columns, got {list(columns)}")
+
+        loaded = 0
+        for record in records:
+            pincode = clean_pincode(record[pin_col])
+            try:
+                lat, lon = float(record[lat_col]), float(record[lon_col])
+            except (TypeError, ValueError):
+                continue
+            # Directories list several post offices per PIN; keep the first one
+            if pincode and lat == lat and lon == lon and pincode not in self.centroids:
+                self.centroids[pincode] = (lat, lon)
+                loaded += 1
+        return loaded
+
+    def get(self, pincode):
+        """O(1) lookup; returns (latitude, longitude) or None"""
+        with self.lock:
+            centroid = self.centroids.get(pincode) if pincode else None
+            self.stats['hits' if centroid else 'misses'] += 1
+        return centroid
+
+    def add(self, pincode, latitude, longitude):
+        """Record a centroid learned from a successful network lookup"""
+        with self.lock:
+            if pincode and pincode not in self.centroids:
+                self.centroids[pincode] = (latitude, longitude)
+                self.learned += 1
+
+    def save(self, path=None):
+        """Write the index back to CSV/Parquet so later runs start warm"""
+        path = path or self.path
+        with self.lock:
+            centroids = sorted(self.centroids.items())
+        if path.lower().endswith(('.parquet', '.pq')):
+            import pandas as pd
+            pd.DataFrame(
+                [(p, lat, lon) for p, (lat, lon) in centroids],
+                columns=['pincode', 'latitude', 'longitude']
+            ).to_parquet(path, index=False)
+            return
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(['pincode', 'latitude', 'longitude'])
+            for pincode, (lat, lon) in centroids:
+                writer.writerow([pincode, lat, lon])
+
+    def __contains__(self, pincode):
+        """Membership test that doesn't count as a lookup in stats"""
+        with self.lock:
+            return bool(pincode) and pincode in self.centroids
+
+    def __len__(self):
+        return len(self.centroids)
@@ -0,0 +1,168 @@
+"""
+Tiny producer/consumer pipeline built on threads and bounded queues.
+
+Each stage runs one or more worker threads that take items from the
+stage's inbox, process them, and emit results into the next stage's
+inbox. Queues are bounded (MIGRATION_QUEUE_SIZE), so a slow stage
+applies back-pressure instead of letting memory grow, and slow I/O in one
+stage (geocoding, Postgres) overlaps with work in the others.
+
+    pipeline = Pipeline()
+    pipeline.add("read", read_chunks, source=True)      # func(emit)
+    pipeline.add("normalize", normalize, workers=2)     # func(item, emit)
+    pipeline.add("write", write_row)                    # last stage: no emit needed
+    pipeline.run()
+
+If any worker raises, the whole pipeline stops and run() re-raises the
+first error in the calling thread.
+"""
+import os
+import queue
+import threading
+import time
+
+QUEUE_SIZE = int(os.getenv("MIGRATION_QUEUE_SIZE", "1000"))
+
+_STOP = object()
+
+
+class PipelineAborted(Exception):
+    """Raised inside workers when another stage has failed"""
+
+
+class Stage:
+    """One step of the pipeline: an inbox queue plus N worker threads"""
+
+    def __init__(self, name, func, workers=1, queue_size=QUEUE_SIZE, source=False):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.source = source
+        self.inbox = None if source else queue.Queue(maxsize=max(1, queue_size))
+        self.next = None
+        self.finished = 0
+        self.lock = threading.Lock()
+        # Where the time goes: busy = func(), idle = waiting for input, blocked = waiting on the next stage
+        self.stats = {'items': 0, 'emitted': 0, 'busy': 0.0, 'idle': 0.0, 'blocked': 0.0}
+
+
+class Pipeline:
+    """Chains stages in the order they are added"""
+
+    def __init__(self, queue_size=QUEUE_SIZE, metrics=None):
+        self.queue_size = queue_size
+        self.metrics = metrics  # optional metrics.Metrics
+        self.stages = []
+        self.aborted = threading.Event()
+        self.error = None
+
+    def add(self, name, func, workers=1, source=False, queue_size=None):
+        if source and self.stages:
+            raise ValueError("only the first stage can be a source")
+        stage = Stage(name, func, workers, queue_size or self.queue_size, source)
+        if self.stages:
+            self.stages[-1].next = stage
+        self.stages.append(stage)
+        return stage
+
+    # ------------------------------------------------------------------ queue helpers
+
+    def _put(self, q, item):
+        while True:
+            if self.aborted.is_set():
+                raise PipelineAborted()
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, q):
+        while True:
+            if self.aborted.is_set():
+                raise PipelineAborted()
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+    def _emitter(self, stage, local):
+        def emit(item):
+            if stage.next is None:
+                return
+            started = time.perf_counter()
+            self._put(stage.next.inbox, item)
+            local['blocked'] += time.perf_counter() - started
+            local['emitted'] += 1
+        return emit
+
+    # ------------------------------------------------------------------ workers
+
+    def _work(self, stage):
+        local = {'items': 0, 'emitted': 0, 'busy': 0.0, 'idle': 0.0, 'blocked': 0.0}
+        emit = self._emitter(stage, local)
+        try:
+            if stage.source:
+                started = time.perf_counter()
+                stage.func(emit)
+                local['busy'] += time.perf_counter() - started - local['blocked']
+            else:
+                while True:
+                    started = time.perf_counter()
+                    item = self._get(stage.inbox)
+                    local['idle'] += time.perf_counter() - started
+                    if item is _STOP:
+                        self._put(stage.inbox, _STOP)  # let sibling workers see it too
+                        break
+                    blocked_before = local['blocked']
+                    started = time.perf_counter()
+                    stage.func(item, emit)
+                    elapsed = time.perf_counter() - started - (local['blocked'] - blocked_before)
+                    local['busy'] += elapsed
+                    local['items'] += 1
+                    if self.metrics is not None:
+                        self.metrics.observe("stage_seconds", elapsed, stage=stage.name)
+        except PipelineAborted:
+            pass
+        except BaseException as e:
+            if self.error is None:
+                self.error = e
+            self.aborted.set()
+        finally:
+            with stage.lock:
+                for key, value in local.items():
+                    stage.stats[key] += value
+                stage.finished += 1
+                last = stage.finished == stage.workers
+            # Last worker out tells the next stage there is nothing more coming
+            if last and stage.next is not None and not self.aborted.is_set():
+                try:
+                    self._put(stage.next.inbox, _STOP)
+                except PipelineAborted:
+                    pass
+
+    def run(self):
+        """Start every stage, wait for all of them, and re-raise the first failure"""
+        threads = []
+        for stage in self.stages:
+            for i in range(stage.workers):
+                thread = threading.Thread(target=self._work, args=(stage,),
+                                          name=f"{stage.name}-{i}", daemon=True)
+                threads.append(thread)
+                thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=0.5)
+        except KeyboardInterrupt:
+            self.aborted.set()
+            raise
+        if self.error is not None:
+            raise self.error
+
+    def print_stats(self):
+        print(f"Pipeline stages:   (queue size {self.queue_size})")
+        for stage in self.stages:
+            s = stage.stats
+            print(f"  {stage.name:12} x{stage.workers:<3} {s['items'] or s['emitted']:8} items  "
+                  f"busy {s['busy']:7.1f}s  idle {s['idle']:7.1f}s  blocked {s['blocked']:7.1f}s")
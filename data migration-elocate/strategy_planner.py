@@ -0,0 +1,200 @@
+"""
+Adaptive ordering of geocoding strategies.
+
+Every address is tried against a cascade of strategies (PIN_FULL, PIN,
+FULL_ADDRESS, AREA, ...) until one returns coordinates, and every attempt
+costs a rate-limited network call. The planner keeps per-strategy
+success counts for each (state, address shape) pattern, where the shape
+says whether the address has a PIN code, a plot/door/survey number and a
+distinct area part. For each new address it then
+
+  * tries the strategy most likely to succeed for that pattern first, and
+  * drops strategies that almost never succeed for it (e.g. full
+    addresses with plot numbers on Nominatim) once they have been tried
+    PLANNER_MIN_TRIALS times with a success rate below PLANNER_SKIP_BELOW.
+
+A small PLANNER_EXPLORE share of rows still runs the full default cascade
+so dropped strategies can earn their place back. Counts are persisted in
+a SQLite file (PLANNER_FILE) and merged additively on save, so several
+processes (geocode_prefetch.py) can learn into the same file.
+
+    python strategy_planner.py        # print the learned success rates
+"""
+import os
+import re
+import random
+import sqlite3
+import threading
+from collections import defaultdict
+
+if __name__ == "__main__":
+    # Run as a script: load .env before the settings below (and the local imports') are read
+    from dotenv import load_dotenv
+    load_dotenv()
+
+from normalize import parse_address
+
+PLANNER_FILE = os.getenv(
+    "PLANNER_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "strategy_stats.sqlite")
+)
+MIN_TRIALS = int(os.getenv("PLANNER_MIN_TRIALS", "20"))
+SKIP_BELOW = float(os.getenv("PLANNER_SKIP_BELOW", "0.05"))
+EXPLORE = float(os.getenv("PLANNER_EXPLORE", "0.05"))
+
+ANY = "*"
+_PLOT_RE = re.compile(
+    r'\b(plot|door|survey|khasra|gat|shed|unit|flat|s\.?\s?no|sy\.?\s?no|d\.?\s?no|h\.?\s?no)\b'
+    r'|\b[a-z]?-?\d+\s?/\s?\d+[a-z]?\b|\b[a-z]-\s?\d+\b',
+    re.I
+)
+
+
+def address_shape(address):
+    """Coarse pattern of an address, e.g. "pin+plot+area" or "plain" """
+    record = parse_address(address)
+    if not record.text:
+        return "empty"
+    features = []
+    if record.pincode:
+        features.append("pin")
+    if _PLOT_RE.search(record.text):
+        features.append("plot")
+    if record.city_area != record.text:
+        features.append("area")
+    return "+".join(features) or "plain"
+
+
+class StrategyPlanner:
+    """Success counts per (strategy, state, shape) and the ordering derived from them"""
+
+    def __init__(self, path=PLANNER_FILE, min_trials=MIN_TRIALS, skip_below=SKIP_BELOW, explore=EXPLORE):
+        self.path = path
+        self.min_trials = min_trials
+        self.skip_below = skip_below
+        self.explore = explore
+        # (strategy, state, shape) -> [tries, wins]; the state/shape may be ANY for rolled-up counts
+        self.counts = defaultdict(lambda: [0, 0])
+        self.pending = defaultdict(lambda: [0, 0])  # not yet saved
+        self.lock = threading.Lock()
+        self.stats = {'rows': 0, 'planned': 0, 'skipped': 0, 'explored': 0, 'attempts': 0}
+        if path and os.path.exists(path):
+            self.load()
+
+    # ------------------------------------------------------------------ persistence
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS strategy_stats (
+                strategy TEXT NOT NULL,
+                state    TEXT NOT NULL,
+                shape    TEXT NOT NULL,
+                tries    INTEGER NOT NULL,
+                wins     INTEGER NOT NULL,
+                PRIMARY KEY (strategy, state, shape)
+            )
+        """)
+        return conn
+
+    def load(self):
+        conn = self._connect()
+        with self.lock:
+            for strategy, state, shape, tries, wins in conn.execute("SELECT * FROM strategy_stats"):
+                self.counts[(strategy, state, shape)] = [tries, wins]
+        conn.close()
+
+    def save(self):
+        """Add this run's counts to the file (other processes may have added theirs)"""
+        if not self.path:
+            return
+        with self.lock:
+            pending = [(*key, tries, wins) for key, (tries, wins) in self.pending.items()]
+            self.pending.clear()
+        if not pending:
+            return
+        conn = self._connect()
+        with conn:
+            conn.executemany("""
+                INSERT INTO strategy_stats (strategy, state, shape, tries, wins) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (strategy, state, shape)
+                DO UPDATE SET tries = tries + excluded.tries, wins = wins + excluded.wins
+            """, pending)
+        conn.close()
+
+    # ------------------------------------------------------------------ learning
+
+    def record(self, strategy, state, shape, success):
+        """One attempt of `strategy` that answered (hit or definite miss)"""
+        state = state or ""
+        with self.lock:
+            self.stats['attempts'] += 1
+            for key in ((strategy, state, shape), (strategy, ANY, shape), (strategy, ANY, ANY)):
+                for counts in (self.counts[key], self.pending[key]):
+                    counts[0] += 1
+                    counts[1] += 1 if success else 0
+
+    def success_rate(self, strategy, state, shape):
+        """Most specific rate with enough trials behind it; None while still unknown"""
+        state = state or ""
+        with self.lock:
+            for key in ((strategy, state, shape), (strategy, ANY, shape), (strategy, ANY, ANY)):
+                counts = self.counts.get(key)
+                if counts and counts[0] >= self.min_trials:
+                    return counts[1] / counts[0]
+        return None
+
+    def plan(self, strategies, state, shape, explore=True):
+        """
+        Reorder / prune [(name, query)] candidates (queries that are None are
+        dropped). Unknown strategies keep their default position; at least
+        one strategy is always kept.
+        """
+        candidates = [(name, query) for name, query in strategies if query]
+        with self.lock:
+            self.stats['rows'] += 1
+        if len(candidates) <= 1:
+            return candidates
+        if explore and self.explore and random.random() < self.explore:
+            with self.lock:
+                self.stats['explored'] += 1
+            return candidates
+
+        rated = []
+        for position, (name, query) in enumerate(candidates):
+            rate = self.success_rate(name, state, shape)
+            rated.append((rate, position, name, query))
+        kept = [r for r in rated if r[0] is None or r[0] >= self.skip_below]
+        if not kept:
+            kept = [max(rated, key=lambda r: r[0])]
+        # Likeliest winner first; strategies without data keep their default order among equals
+        kept.sort(key=lambda r: (-(r[0] if r[0] is not None else 0.5), r[1]))
+        with self.lock:
+            self.stats['planned'] += 1
+            self.stats['skipped'] += len(candidates) - len(kept)
+        return [(name, query) for _, _, name, query in kept]
+
+    def print_stats(self):
+        s = self.stats
+        if not s['attempts']:  # only replayed plans (e.g. after a prefetch)
+            print(f"Strategy planner:  {s['rows']} rows planned, {s['skipped']} strategies skipped ({self.path})")
+            return
+        print(f"Strategy planner:  {s['attempts'] / max(1, s['rows']):.2f} attempts/row, "
+              f"{s['skipped']} strategies skipped, {s['explored']} exploration rows ({self.path})")
+
+    def report(self):
+        """Learned rates per strategy and shape (all states)"""
+        rows = sorted((key, counts) for key, counts in self.counts.items() if key[1] == ANY and key[2] != ANY)
+        print(f"{'Strategy':14} {'Shape':16} {'Tries':>8} {'Wins':>8} {'Rate':>7}")
+        print("="*57)
+        for (strategy, _, shape), (tries, wins) in rows:
+            flag = "  (skipped)" if tries >= self.min_trials and wins / tries < self.skip_below else ""
+            print(f"{strategy:14} {shape:16} {tries:8} {wins:8} {wins / tries * 100:6.1f}%{flag}")
+
+
+if __name__ == "__main__":
+    planner = StrategyPlanner()
+    if not planner.counts:
+        print(f"⚠️ No strategy statistics yet ({planner.path})")
+    else:
+        planner.report()
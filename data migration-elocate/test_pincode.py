@@ -1,17 +1,10 @@
-import pandas as pd
-import re
 import os
+from xlsx_reader import read_columns, iter_chunks, find_column
+from normalize import normalize_frame
 
 # File paths
 INPUT_FILE = r"C:\Users\kasum\Downloads\RecyclerRegistrationGrantedList.xlsx"
 
-def extract_pincode(address):
-    """Extracts a 6-digit pincode from the address string."""
-    if pd.isna(address):
-        return None
-    match = re.search(r'\b\d{6}\b', str(address))
-    return match.group(0) if match else None
-
 def test_pincodes():
     if not os.path.exists(INPUT_FILE):
         print(f"❌ Error: Input file not found: {INPUT_FILE}")
@@ -19,31 +12,32 @@ def test_pincodes():
 
     try:
         print(f"🔍 Reading file: {INPUT_FILE}...")
-        df = pd.read_excel(INPUT_FILE)
+        columns = read_columns(INPUT_FILE)
         
         # Identify the address column (case-insensitive search)
-        address_col = next((c for c in df.columns if 'address' in c.lower()), None)
+        address_col = find_column(columns, ['address'])
+        name_col = find_column(columns, ['name'])
         
         if not address_col:
             print("❌ Error: Could not find an 'address' column in the Excel file.")
-            print(f"Columns found: {list(df.columns)}")
+            print(f"Columns found: {columns}")
             return
 
         print(f"✅ Found address column: '{address_col}'")
-        print(f"🚀 Checking {len(df)} rows for pincodes...\n")
+        print(f"🚀 Checking rows for pincodes...\n")
 
+        total = 0
         missing_count = 0
         results = []
 
-        for index, row in df.iterrows():
-            address = row[address_col]
-            pincode = extract_pincode(address)
-            
-            if not pincode:
-                missing_count += 1
-                row_num = index + 2  # Excel row number (1-indexed + header)
-                # Try to get a name or ID for context
-                name = next((row[c] for c in df.columns if 'name' in c.lower()), "N/A")
+        for chunk in iter_chunks(INPUT_FILE):
+            # PIN extraction runs over the whole chunk at once
+            normalized = normalize_frame(chunk, name_col=name_col, address_col=address_col)
+            total += len(normalized)
+            missing = normalized[normalized['pincode'].isna()]
+            missing_count += len(missing)
+
+            for row_num, name, address in zip(missing.index, missing['name'], missing['address']):
                 results.append({
                     'Row': row_num,
                     'Name': name,
@@ -54,8 +48,8 @@ def test_pincodes():
         print("\n" + "="*60)
         print("VERIFICATION SUMMARY")
         print("="*60)
-        print(f"Total Rows Checked: {len(df)}")
-        print(f"Rows with Pincode:  {len(df) - missing_count}")
+        print(f"Total Rows Checked: {total}")
+        print(f"Rows with Pincode:  {total - missing_count}")
         print(f"Rows missing Pincode: {missing_count}")
         print("="*60)
 
@@ -0,0 +1,85 @@
+"""
+Streaming row source for the CPCB registration workbooks.
+
+pd.read_excel parses the whole sheet into memory before returning. This
+module iterates the sheet with openpyxl in read-only mode instead, so the
+first rows are available immediately and memory stays flat no matter how
+large the national list is. Use iter_records() for dict rows or
+iter_chunks() for DataFrame chunks.
+"""
+from openpyxl import load_workbook
+
+CHUNK_SIZE = 5000
+
+
+def find_column(columns, possible_names):
+    """Case-insensitive column lookup by keyword (first match wins)"""
+    for name in possible_names:
+        for col in columns:
+            if name.lower() in str(col).lower():
+                return col
+    return None
+
+
+def _open_sheet(path, sheet=None):
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    worksheet = workbook[sheet] if sheet else workbook.active
+    return workbook, worksheet
+
+
+def _header(rows):
+    """
+    Consume rows up to and including the first non-empty one (the header).
+    Returns (columns, header_row_number).
+    """
+    for row_number, values in enumerate(rows, 1):
+        if any(v is not None and str(v).strip() for v in values):
+            columns = [str(v).strip() if v is not None else f"Unnamed: {i}" for i, v in enumerate(values)]
+            return columns, row_number
+    return [], 0
+
+
+def read_columns(path, sheet=None):
+    """Return only the header row"""
+    workbook, worksheet = _open_sheet(path, sheet)
+    try:
+        return _header(worksheet.iter_rows(values_only=True))[0]
+    finally:
+        workbook.close()
+
+
+def iter_records(path, nrows=None, sheet=None):
+    """
+    Lazily yield (row_number, record) pairs, where record maps header -> cell value.
+    row_number is the Excel row number, for error messages.
+    Cell values keep their openpyxl types (str, int, float, datetime, None).
+    """
+    workbook, worksheet = _open_sheet(path, sheet)
+    try:
+        rows = worksheet.iter_rows(values_only=True)
+        columns, header_row = _header(rows)
+        yielded = 0
+        for row_number, values in enumerate(rows, header_row + 1):
+            if nrows is not None and yielded >= nrows:
+                break
+            if not any(v is not None for v in values):
+                continue  # trailing blank rows
+            yield row_number, dict(zip(columns, values))
+            yielded += 1
+    finally:
+        workbook.close()
+
+
+def iter_chunks(path, chunksize=CHUNK_SIZE, nrows=None, sheet=None):
+    """Yield pandas DataFrames of at most `chunksize` rows, indexed by Excel row number"""
+    import pandas as pd
+
+    batch, index = [], []
+    for row_number, record in iter_records(path, nrows=nrows, sheet=sheet):
+        batch.append(record)
+        index.append(row_number)
+        if len(batch) >= chunksize:
+            yield pd.DataFrame(batch, index=index)
+            batch, index = [], []
+    if batch:
+        yield pd.DataFrame(batch, index=index)